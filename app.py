@@ -1,13 +1,53 @@
-from flask import Flask, request, jsonify
+from contextlib import ExitStack
+from flask import Flask, Response, g, request, jsonify
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
 
 from src.change import engine
+from src.sysml2 import model_tree
+from src.sysml2.snapshot import diff_commits, iter_commit_elements
+from src.utils.sysml_file_io import stream_sysml_text
+from src.utils import json_codec
 from src.utils.logger import initialize_logger
+from src.utils.tracing import current_trace_id, initialize_tracing, span, trace_from_headers
+
+
+class CodecJSONProvider(JSONProvider):
+    """Serializes jsonify responses and parses request bodies with the service's JSON codec."""
+
+    def dumps(self, obj, **kwargs):
+        return json_codec.dumps(obj, sort_keys=kwargs.get("sort_keys", False))
+
+    def loads(self, s, **kwargs):
+        return json_codec.loads(s)
+
 
 app = Flask(__name__)
+app.json = CodecJSONProvider(app)
 CORS(app)
 
 
+@app.before_request
+def start_trace():
+    # continue the caller's trace (traceparent or X-Trace-Id header) in a span per request
+    trace_id, parent_id = trace_from_headers(request.headers)
+    g.trace_scope = ExitStack()
+    g.trace_scope.enter_context(span(f"{request.method} {request.path}", trace_id=trace_id, parent_id=parent_id))
+
+@app.after_request
+def add_trace_header(response):
+    trace_id = current_trace_id()
+    if trace_id:
+        response.headers['X-Trace-Id'] = trace_id
+    return response
+
+@app.teardown_request
+def end_trace(exc):
+    trace_scope = g.pop('trace_scope', None)
+    if trace_scope is not None:
+        trace_scope.close()
+
+
 @app.route('/projects/<string:projectId>/branches/<string:branchId>/change', methods=['POST'])
 def change_endpoint(projectId, branchId):
     data = request.get_json()
@@ -16,10 +56,73 @@ def change_endpoint(projectId, branchId):
         return jsonify({'error': 'Invalid request. Missing change_request.'}), 400
     change_request = data['change_request']
 
-    res, code = engine.run(projectId, branchId, change_request)
+    res, code = engine.run(projectId, branchId, change_request, trace=bool(data.get('trace')))
 
     return jsonify(res), code
 
+@app.route('/projects/<string:projectId>/branches/<string:branchId>/change/plan', methods=['POST'])
+def plan_endpoint(projectId, branchId):
+    data = request.get_json()
+    
+    if not data or 'change_request' not in data:
+        return jsonify({'error': 'Invalid request. Missing change_request.'}), 400
+    change_request = data['change_request']
+
+    res, code = engine.plan(projectId, branchId, change_request)
+
+    return jsonify(res), code
+
+@app.route('/projects/<string:projectId>/branches/<string:branchId>/plans/<string:planId>/apply', methods=['POST'])
+def apply_endpoint(projectId, branchId, planId):
+    res, code = engine.apply(projectId, branchId, planId)
+
+    return jsonify(res), code
+
+@app.route('/projects/<string:projectId>/commits/<string:commitId>/children', methods=['GET'])
+def children_endpoint(projectId, commitId):
+    parent_id = request.args.get('parent') or None
+    try:
+        offset = int(request.args.get('offset', 0))
+        limit = int(request.args.get('limit', model_tree.DEFAULT_PAGE_SIZE))
+        res = model_tree.children_page(projectId, commitId, parent_id, offset, limit)
+    except ValueError as e:
+        return jsonify({'error': f'Invalid request. {e}'}), 400
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+
+    # commits are immutable, so are their pages
+    response = jsonify(res)
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+@app.route('/projects/<string:projectId>/commits/<string:commitId>/export', methods=['GET'])
+def export_endpoint(projectId, commitId):
+    try:
+        elements = iter_commit_elements(projectId, commitId)
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+
+    # stream the text while it is rendered, from elements fetched page by page
+    return Response(
+        stream_sysml_text(elements),
+        mimetype='text/plain',
+        headers={'Content-Disposition': f'attachment; filename="{commitId}.sysml"'}
+    )
+
+@app.route('/projects/<string:projectId>/commits/<string:commitId>/diff/<string:otherCommitId>', methods=['GET'])
+def diff_endpoint(projectId, commitId, otherCommitId):
+    try:
+        res = diff_commits(projectId, commitId, otherCommitId)
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 501
+
+    response = jsonify(res)
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
 if __name__ == '__main__':
     initialize_logger()
+    initialize_tracing()
     app.run(debug=True)
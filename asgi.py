@@ -0,0 +1,95 @@
+"""
+ASGI entry point of the change engine.
+
+The change endpoint is served by the async engine, so a single process can hold many
+concurrent change requests while they wait for the SysML API, the embeddings and the
+LLM. All other routes are passed to the Flask app in app.py.
+
+    uvicorn asgi:app --host 0.0.0.0 --port 8000
+"""
+import re
+from uvicorn.middleware.wsgi import WSGIMiddleware
+from werkzeug.datastructures import Headers
+
+from app import app as flask_app
+from src.change import engine
+from src.utils import json_codec
+from src.utils.logger import initialize_logger
+from src.utils.tracing import current_trace_id, initialize_tracing, span, trace_from_headers
+
+CHANGE_ROUTE = re.compile(r"^/projects/([^/]+)/branches/([^/]+)/change$")
+
+wsgi_app = WSGIMiddleware(flask_app)
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return await lifespan(receive, send)
+
+    if scope["type"] == "http" and scope["method"] == "POST":
+        match = CHANGE_ROUTE.match(scope["path"])
+        if match:
+            return await change_endpoint(scope, receive, send, *match.groups())
+
+    await wsgi_app(scope, receive, send)
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            initialize_logger()
+            initialize_tracing()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def change_endpoint(scope, receive, send, projectId, branchId):
+    """Same contract as the change_endpoint of the Flask app, served by engine.run_async."""
+    headers = Headers([(k.decode("latin-1"), v.decode("latin-1")) for k, v in scope["headers"]])
+    trace_id, parent_id = trace_from_headers(headers)
+
+    with span(f"POST {scope['path']}", trace_id=trace_id, parent_id=parent_id):
+        response_headers = [(b"x-trace-id", current_trace_id().encode("latin-1"))]
+        if "Origin" in headers:
+            response_headers.append((b"access-control-allow-origin", b"*"))
+
+        if headers.get("Content-Type", "").split(";")[0].strip() != "application/json":
+            return await send_json(send, 415, {'error': 'Invalid request. Expected a JSON body.'}, response_headers)
+        try:
+            data = json_codec.loads(await read_body(receive))
+        except ValueError:
+            data = None
+
+        if not isinstance(data, dict) or 'change_request' not in data:
+            return await send_json(send, 400, {'error': 'Invalid request. Missing change_request.'}, response_headers)
+        change_request = data['change_request']
+
+        res, code = await engine.run_async(projectId, branchId, change_request, trace=bool(data.get('trace')))
+
+        await send_json(send, code, res, response_headers)
+
+
+async def read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+async def send_json(send, status, data, headers=()):
+    body = json_codec.dumpb(data)
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("latin-1")),
+            *headers,
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
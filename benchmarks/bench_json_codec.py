@@ -0,0 +1,60 @@
+"""
+Compare the service JSON codec with the standard library on large element payloads.
+
+Usage: python -m benchmarks.bench_json_codec [element_count ...]
+"""
+import json
+import sys
+import timeit
+import uuid
+
+from src.utils import json_codec
+
+
+def make_elements(count):
+    """Synthetic element records shaped like SysML API responses."""
+    root_id = str(uuid.uuid4())
+    elements = [{"@id": root_id, "@type": "Package", "name": "Root", "ownedElement": []}]
+    for i in range(count - 1):
+        owner = elements[i // 10]
+        element_id = str(uuid.uuid4())
+        owner.setdefault("ownedElement", []).append({"@id": element_id})
+        elements.append({
+            "@id": element_id,
+            "@type": "PartUsage" if i % 3 else "PartDefinition",
+            "name": f"Part{i}",
+            "declaredName": f"Part{i}",
+            "owner": {"@id": owner["@id"]},
+            "isAbstract": False,
+            "multiplicity": None,
+            "documentation": [{"@id": str(uuid.uuid4())}],
+            "qualifiedName": f"Root::Part{i // 10}::Part{i}",
+        })
+    return elements
+
+
+def best_of(func, repeat=5):
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def bench(count):
+    elements = make_elements(count)
+    encoded = json.dumps(elements)
+
+    results = {
+        "dumps": (best_of(lambda: json.dumps(elements)), best_of(lambda: json_codec.dumpb(elements))),
+        "loads": (best_of(lambda: json.loads(encoded)), best_of(lambda: json_codec.loads(encoded))),
+        "per-element dumps": (
+            best_of(lambda: [json.dumps(e) for e in elements]),
+            best_of(lambda: [json_codec.dumps(e) for e in elements]),
+        ),
+    }
+
+    print(f"{count} elements, {len(encoded) / 1e6:.1f} MB, codec backend: {json_codec.BACKEND}")
+    for name, (stdlib, codec) in results.items():
+        print(f"  {name:<18} json {stdlib * 1000:8.1f} ms   codec {codec * 1000:8.1f} ms   {stdlib / codec:5.1f}x")
+
+
+if __name__ == "__main__":
+    for count in [int(arg) for arg in sys.argv[1:]] or [10_000, 50_000]:
+        bench(count)
@@ -0,0 +1,55 @@
+"""
+Replay the change requests recorded on a cassette and report where the time goes.
+
+Record a cassette on a freshly started service, so the vector index is built (and its
+embeddings are recorded) within the recorded requests:
+
+    SACM_CASSETTE_MODE=record SACM_CASSETTE_PATH=cassettes/slow.jsonl python app.py
+
+Then replay it without network access, optionally with the recorded latencies:
+
+Usage: python -m benchmarks.bench_replay cassette.jsonl [latency_factor]
+
+The OpenAI clients are still constructed at import, so OPENAI_API_KEY has to be set,
+though any value will do.
+"""
+import os
+import sys
+import time
+from collections import defaultdict
+
+if __name__ == "__main__":
+    os.environ["SACM_CASSETTE_MODE"] = "replay"
+    os.environ["SACM_CASSETTE_PATH"] = sys.argv[1]
+    os.environ["SACM_CASSETTE_LATENCY"] = sys.argv[2] if len(sys.argv) > 2 else "0"
+
+from src.change import engine
+from src.external.cassette import get_cassette
+
+
+def span_totals(nodes, totals=None):
+    """Sum the durations of all spans per name."""
+    totals = totals if totals is not None else defaultdict(lambda: [0, 0.0])
+    for node in nodes:
+        totals[node["name"]][0] += 1
+        totals[node["name"]][1] += node["duration_ms"] or 0
+        span_totals(node["children"], totals)
+    return totals
+
+
+def replay():
+    runs = get_cassette().runs()
+    print(f"Replaying {len(runs)} run(s) from {os.environ['SACM_CASSETTE_PATH']}")
+    for number, run in enumerate(runs, 1):
+        start = time.perf_counter()
+        result, code = engine.run(run["project_id"], run["branch_id"], run["change_request"], trace=True)
+        elapsed = time.perf_counter() - start
+
+        print(f"\n#{number} {code} in {elapsed * 1000:.1f} ms: {str(run['change_request'])[:60]}")
+        totals = span_totals(result["trace"]["spans"])
+        for name, (count, duration_ms) in sorted(totals.items(), key=lambda item: -item[1][1]):
+            print(f"  {name:<22} {count:5d}x {duration_ms:10.1f} ms")
+
+
+if __name__ == "__main__":
+    replay()
@@ -0,0 +1,101 @@
+"""
+Evaluate the context retrieval across retrieval settings and write the Pareto-optimal
+configuration that the engine loads at startup (RETRIEVAL_CONFIG). The grid covers fixed
+depths k and adaptive depths by score threshold and relative drop-off.
+
+The demo seeder models and synthetic models are indexed with the service's vector store,
+then every labelled change request (benchmarks/retrieval_cases.yaml plus generated
+requests on the synthetic models) is answered with each setting of the grid. Recall is
+the share of the elements a change touches that end up in the context, the cost is the
+number of prompt tokens of the context.
+
+Usage: python -m benchmarks.eval_retrieval [output_path] [tolerance]
+
+Embeddings are requested from OpenAI once per text; run with SACM_CASSETTE_MODE=record
+to keep them, and with SACM_CASSETTE_MODE=replay to evaluate again offline.
+"""
+import os
+import sys
+from functools import lru_cache
+from types import SimpleNamespace
+
+from token_count import TokenCount
+
+from src.context.context_manager import ContextManager
+from src.context.retrieval_config import RETRIEVAL_CONFIG_PATH, write_retrieval_config
+from src.context.retrieval_eval import (
+    choose, evaluate, load_cases, load_seed_models, pareto_front, synthetic_cases, synthetic_model,
+)
+from src.sysml2.snapshot import ModelSnapshot
+
+SYNTHETIC_SIZES = (300, 3000)
+SYNTHETIC_CASES = 20
+
+
+class CachedEmbeddings:
+    """Embeds each distinct query once, the grid repeats every request for every setting."""
+
+    def __init__(self, embeddings):
+        self.embeddings = embeddings
+        self.embed_query = lru_cache(maxsize=None)(embeddings.embed_query)
+
+    def embed_documents(self, texts):
+        return self.embeddings.embed_documents(texts)
+
+
+def main(output_path=RETRIEVAL_CONFIG_PATH, tolerance=0.02):
+    models = {name: elements for name, elements in load_seed_models().items() if len(elements) > 1}
+    cases = load_cases(models)
+    for size in SYNTHETIC_SIZES:
+        name = f"Synthetic {size}"
+        models[name] = synthetic_model(name, size)
+        cases += synthetic_cases(name, models[name], SYNTHETIC_CASES)
+    print(f"{len(cases)} cases on {len(models)} models ({', '.join(f'{n}: {len(e)}' for n, e in models.items())})")
+
+    clients = {
+        name: SimpleNamespace(
+            project_id="eval_" + name.lower().replace(" ", "_"),
+            branch_id="eval",
+            commit_id="eval",
+            snapshot=ModelSnapshot("eval", elements),
+        )
+        for name, elements in models.items()
+    }
+    # build the indexes once, then cache the query embeddings
+    for client in clients.values():
+        vector_db = ContextManager(client).vector_db
+        if not isinstance(vector_db.embeddings.embeddings, CachedEmbeddings):
+            vector_db.embeddings.embeddings = CachedEmbeddings(vector_db.embeddings.embeddings)
+
+    def retrieve(case, settings):
+        return ContextManager(clients[case.model], settings=settings).create_context(case.request)
+
+    counter = TokenCount(model_name=os.environ.get("OPENAI_API_MODEL") or "gpt-4o")
+    results = evaluate(retrieve, cases, counter.num_tokens_from_string)
+    front = pareto_front(results)
+    chosen = choose(front, tolerance)
+
+    print(f"\n{'depth':>14} {'multi':>6} {'related':>8} {'recall':>7} {'complete':>9} {'tokens':>8}")
+    for result in sorted(results, key=lambda r: r["tokens"]):
+        s = result["settings"]
+        depth = f"{s['score_threshold']}/{s['drop_off']}" if s.get("adaptive") else f"k={s['k']}"
+        marker = " *" if result is chosen else " +" if result in front else ""
+        print(f"{depth:>14} {s['multi_query']!s:>6} {s['expand_related']!s:>8} "
+              f"{result['recall']:>7.3f} {result['complete']:>9.3f} {result['tokens']:>8.0f}{marker}")
+    print("\n+ Pareto-optimal, * written to", output_path)
+
+    write_retrieval_config(chosen["settings"], output_path, evaluation={
+        "recall": chosen["recall"],
+        "complete": chosen["complete"],
+        "tokens": chosen["tokens"],
+        "cases": len(cases),
+        "tolerance": tolerance,
+        "pareto_front": front,
+    })
+
+
+if __name__ == "__main__":
+    main(
+        sys.argv[1] if len(sys.argv) > 1 else RETRIEVAL_CONFIG_PATH,
+        float(sys.argv[2]) if len(sys.argv) > 2 else 0.02,
+    )
@@ -1,5 +1,5 @@
 import os
-from typing import Dict, List, Optional, Set
+from typing import Dict, Optional, Set
 import requests
 import streamlit as st
 
@@ -11,6 +11,8 @@ st.set_page_config(page_title="Semantic-Aware Change management", layout="center
 
 SYSML_API_URL = os.environ.get("SYSML_API_URL", "http://localhost:9000")
 CHANGE_ENGINE_URL = os.environ.get("CHANGE_ENGINE_URL", "http://localhost:8000")
+TREE_PAGE_SIZE = 100
+TREE_MAX_DEPTH = 50
 
 # ----------------------------
 # REST helpers
@@ -52,13 +54,23 @@ def get_branches_for_commit(project_id: str):
 def get_commits(project_id, branch_id):
     return _safe_get(f"{SYSML_API_URL}/projects/{project_id}/branches") or []
 
-def get_model(project_id: str, commit_id: str):
-    return _safe_get(f"{SYSML_API_URL}/projects/{project_id}/commits/{commit_id}/elements") or {}
+def get_children_page(project_id: str, commit_id: str, parent_id: Optional[str] = None, offset: int = 0):
+    params = {"offset": offset, "limit": TREE_PAGE_SIZE}
+    if parent_id:
+        params["parent"] = parent_id
+    return _safe_get(f"{CHANGE_ENGINE_URL}/projects/{project_id}/commits/{commit_id}/children", params=params)
 
 def send_change_request(project_id: str, branch_id: str, description: str):
     payload = {"change_request": description}
     return _safe_post(f"{CHANGE_ENGINE_URL}/projects/{project_id}/branches/{branch_id}/change", json_body=payload) or {"status": "error"}
 
+def send_plan_request(project_id: str, branch_id: str, description: str):
+    payload = {"change_request": description}
+    return _safe_post(f"{CHANGE_ENGINE_URL}/projects/{project_id}/branches/{branch_id}/change/plan", json_body=payload)
+
+def send_apply_request(project_id: str, branch_id: str, plan_id: str):
+    return _safe_post(f"{CHANGE_ENGINE_URL}/projects/{project_id}/branches/{branch_id}/plans/{plan_id}/apply")
+
 # ----------------------------
 # UI helpers
 # ----------------------------
@@ -72,65 +84,141 @@ def update_head_commit(project_id, branch_id):
             st.session_state["head_commit"] = branch["head"]["@id"]
             break
 
-def _normalize_id(value) -> Optional[str]:
-    """Return the string '@id' from a value shaped like {'@id': ...} or a string."""
-    if value is None:
+def get_children(project_id: str, commit_id: str, parent_id: Optional[str] = None, offset: int = 0) -> dict:
+    """Return a page of owned elements, cached in the session by (immutable) commit id."""
+    pages: Dict[tuple, dict] = st.session_state.setdefault("tree_pages", {})
+    key = (commit_id, parent_id, offset)
+    if key not in pages:
+        page = get_children_page(project_id, commit_id, parent_id, offset)
+        if page is None:
+            return {"items": [], "total": 0}
+        pages[key] = page
+    return pages[key]
+
+def render_children(project_id: str, commit_id: str, parent_id: Optional[str] = None, depth: int = 0) -> None:
+    """Render the owned elements of parent_id page by page; subtrees are fetched when expanded."""
+    shown_pages: Dict[Optional[str], int] = st.session_state.setdefault("tree_shown_pages", {})
+    pages = shown_pages.get(parent_id, 1)
+
+    total = 0
+    for page_index in range(pages):
+        page = get_children(project_id, commit_id, parent_id, page_index * TREE_PAGE_SIZE)
+        for node in page.get("items", []):
+            render_node(project_id, commit_id, node, depth)
+        total = page.get("total", 0)
+
+    remaining = total - pages * TREE_PAGE_SIZE
+    if remaining > 0:
+        if st.button("\u2003" * depth + f"Show more ({remaining} remaining)", key=f"more_{parent_id}", type="tertiary"):
+            shown_pages[parent_id] = pages + 1
+            st.rerun()
+
+def render_node(project_id: str, commit_id: str, node: dict, depth: int) -> None:
+    expanded: Set[str] = st.session_state.setdefault("tree_expanded", set())
+    indent = "\u2003" * depth
+    name = (node.get("name") or "").strip() or "(unnamed)"
+    etype = (node.get("@type") or "").strip()
+    label = f"{name} ({etype})" if etype else name
+
+    if not node.get("child_count") or depth >= TREE_MAX_DEPTH:
+        st.text(f"{indent}  - {label}")
+        return
+
+    node_id = node["@id"]
+    is_open = node_id in expanded
+    if st.button(f"{indent}{'▾' if is_open else '▸'} {label}", key=f"node_{node_id}", type="tertiary"):
+        expanded.symmetric_difference_update({node_id})
+        st.rerun()
+    if is_open:
+        render_children(project_id, commit_id, node_id, depth + 1)
+
+def _owner_id(element: dict) -> Optional[str]:
+    owner = element.get("owner")
+    return owner.get("@id") if isinstance(owner, dict) else owner
+
+def patch_tree_cache(old_commit: str, new_commit: str, changes: dict) -> None:
+    """
+    Move the cached tree pages of old_commit to new_commit and patch them with the
+    created, updated and deleted elements returned by the change engine, instead of
+    fetching the model again. Listings spanning several pages are dropped, since
+    their offsets shift, and are fetched again when expanded.
+    """
+    pages: Dict[tuple, dict] = st.session_state.get("tree_pages", {})
+    listings = {
+        parent: {**page, "commit_id": new_commit, "items": [dict(item) for item in page.get("items", [])]}
+        for (commit, parent, offset), page in pages.items()
+        if commit == old_commit and offset == 0 and page.get("total", 0) <= TREE_PAGE_SIZE
+    }
+
+    def find(element_id):
+        for listing in listings.values():
+            for item in listing["items"]:
+                if item["@id"] == element_id:
+                    return item
         return None
-    if isinstance(value, dict):
-        return str(value.get("@id")) if value.get("@id") is not None else None
-    return str(value)
-
-def model_to_markdown(elements: List[dict]) -> str:
-    """Convert elements to markdown; indent owned elements under their owner (@id)."""
-    id_map: Dict[str, dict] = {}
-    order: List[str] = []
-
-    # Map elements by normalized @id, fallback to index if missing/duplicate
-    for i, elem in enumerate(elements):
-        eid = _normalize_id(elem.get("@id"))
-        if not eid or eid in id_map:
-            eid = f"__idx_{i}"
-        id_map[eid] = elem
-        order.append(eid)
-
-    # Build ownership relationships
-    children: Dict[str, List[str]] = {eid: [] for eid in id_map}
-    roots: List[str] = []
-    for eid in order:
-        owner_id = _normalize_id(id_map[eid].get("owner"))
-        if owner_id and owner_id in id_map and owner_id != eid:
-            children[owner_id].append(eid)
-        else:
-            roots.append(eid)
-
-    # DFS with cycle detection
-    lines: List[str] = []
-    visiting: Set[str] = set()
-
-    def add_line(cur_id: str, depth: int) -> None:
-        if cur_id in visiting:
-            lines.append("  " * depth + f"- [cycle detected at {cur_id}]")
-            return
-        visiting.add(cur_id)
-
-        elem = id_map[cur_id]
-        name = (elem.get("name") or "").strip() or "(unnamed)"
-        etype = (elem.get("@type") or "").strip()
-        detail = f" ({etype})" if etype else ""
-        lines.append("  " * depth + f"- {name}{detail}")
-
-        for child_id in children.get(cur_id, []):
-            add_line(child_id, depth + 1)
-
-        visiting.remove(cur_id)
-
-    for root_id in roots:
-        add_line(root_id, 0)
-
-    return "\n".join(lines)
+
+    def adjust_child_count(parent_id, delta):
+        item = find(parent_id)
+        if item is not None:
+            item["child_count"] = max(0, item.get("child_count", 0) + delta)
+
+    def remove(element_id):
+        for parent_id, listing in listings.items():
+            kept = [item for item in listing["items"] if item["@id"] != element_id]
+            if len(kept) != len(listing["items"]):
+                listing["items"] = kept
+                listing["total"] -= 1
+                adjust_child_count(parent_id, -1)
+
+    def add(element, child_count):
+        parent_id = _owner_id(element)
+        listing = listings.get(parent_id)
+        if listing is not None:
+            listing["items"].append({
+                "@id": element["@id"],
+                "@type": element.get("@type"),
+                "name": element.get("name"),
+                "child_count": child_count,
+            })
+            listing["total"] += 1
+        adjust_child_count(parent_id, 1)
+
+    for element in changes.get("deleted", []):
+        remove(element["@id"])
+    for element in changes.get("updated", []):
+        previous = find(element["@id"])
+        if previous is None:
+            listings.pop(_owner_id(element), None)  # unknown position, fetch again
+            continue
+        remove(element["@id"])
+        add(element, previous.get("child_count", 0))
+    for element in changes.get("created", []):
+        add(element, 0)
+
+    st.session_state["tree_pages"] = {(new_commit, parent, 0): listing for parent, listing in listings.items()}
+
+def refresh_after_change(project_id: str, branch_id: str, res: dict) -> None:
+    """
+    Advance to the commit returned by the change engine. The cached tree is only patched if
+    the commit directly follows the cached one and holds no changes of other requests, since
+    the returned changes cover this request only.
+    """
+    cached_commit = st.session_state.get("head_commit")
+    if (
+        res.get("commit_id")
+        and isinstance(res.get("changes"), dict)
+        and cached_commit
+        and res.get("parent_commit_id") == cached_commit
+        and not res.get("coalesced")
+    ):
+        patch_tree_cache(st.session_state["head_commit"], res["commit_id"], res["changes"])
+        st.session_state["head_commit"] = res["commit_id"]
+    else:
+        update_head_commit(project_id, branch_id)
+        clear_cache()
 
 def clear_cache():
-    for key in ("model_cache", "model_branch"):
+    for key in ("tree_pages", "tree_shown_pages"):
         if key in st.session_state:
             del st.session_state[key]
 
@@ -177,19 +265,9 @@ if selected_branch_id:
 
 st.subheader("Model")
 
-if selected_branch_id:
-    if "model_cache" not in st.session_state or st.session_state.get("model_branch") != selected_branch_id:
-        # First time or branch changed -> fetch fresh model
-        model = get_model(selected_project_id, st.session_state["head_commit"])
-        st.session_state["model_cache"] = model
-        st.session_state["model_branch"] = selected_branch_id
-    else:
-        # Use the already‑fetched model
-        model = st.session_state["model_cache"]
-
-    if model:
-        st.text(model_to_markdown(model))
-    else:
+if selected_branch_id and st.session_state.get("head_commit"):
+    render_children(selected_project_id, st.session_state["head_commit"])
+    if not get_children(selected_project_id, st.session_state["head_commit"]).get("total"):
         st.info("No model available.")
 else:
     st.info("Please select a project and a branch to view a model.")
@@ -201,7 +279,34 @@ st.markdown("---")
 st.header("Change Management")
 
 change_desc = st.text_input("Change Request", placeholder="Please desribe your desired change...", key="change_desc")
-send_clicked = st.button("Apply change", use_container_width=True)
+preview_col, send_col = st.columns(2)
+preview_clicked = preview_col.button("Preview change", use_container_width=True)
+send_clicked = send_col.button("Apply change", use_container_width=True)
+
+if preview_clicked:
+    if not selected_branch_id:
+        st.warning("Please choose a branch first.")
+    elif not change_desc.strip():
+        st.warning("Please enter a change description.")
+    else:
+        with st.spinner("Planning change..."):
+            res = send_plan_request(selected_project_id, selected_branch_id, change_desc.strip())
+            if res:
+                st.session_state["plan"] = res
+
+plan = st.session_state.get("plan")
+if plan and plan.get("plan_id"):
+    st.subheader("Planned operations")
+    st.markdown("\n".join(f"- {c.get('name')}: {c.get('args')}" for c in plan.get("tool_calls", [])) or "No operations.")
+    if st.button("Apply previewed plan", use_container_width=True):
+        with st.spinner("Applying plan..."):
+            res = send_apply_request(selected_project_id, selected_branch_id, plan["plan_id"])
+            del st.session_state["plan"]
+            if not res:
+                st.stop()  # already showed error in _safe_post
+            st.session_state["logs"] = res.get("logs", [])
+            refresh_after_change(selected_project_id, selected_branch_id, res)
+            st.rerun()
 
 if send_clicked:
     if not selected_branch_id:
@@ -224,9 +329,8 @@ if send_clicked:
                 st.session_state["output"] = tokens.get("output", [])
             st.session_state["logs"] = res.get("logs", [])
 
-            # Refresh model: update head commit, clear cache, then rerun
-            update_head_commit(selected_project_id, selected_branch_id)
-            clear_cache()
+            # Refresh model: move to the new commit and patch the cached tree, then rerun
+            refresh_after_change(selected_project_id, selected_branch_id, res)
 
             # Force UI to re-execute so the "Model" section fetches the new commit
             try:
@@ -1,85 +1,420 @@
+import asyncio
 import datetime
 import logging
+import os
+import threading
 import time
+from collections import OrderedDict
+from src.change.intent import parse_intent
+from src.change.plan_cache import plan_cache
+from src.change.router import request_features, route
 from src.context.context_manager import ContextManager
-from src.external.llm_service import create_llm_prompt, send_llm_request
+from src.external.cassette import get_cassette
+from src.external.llm_service import MODELS, count_tokens, create_llm_prompt, send_llm_request, send_llm_request_async
+from src.external.sysml2.branch import get_project_branch
+from src.sysml2.commit_queue import CommitConflictError, get_commit_queue
+from src.sysml2.projection import get_projection
 from src.sysml2.sysml_client import SysMLClient
-from src.sysml2.tooling import execute_tool, make_tools
-from src.utils.json_sanitize import sanitize
+from src.sysml2.tooling import TOOLS, TOOLS_BY_NAME, execute_tool
+from src.sysml2.validation import ChangeValidationError
+from src.utils.tracing import collect_spans, current_trace_id, span, span_tree
 logger = logging.getLogger(__name__)
 
 
-def run(project_id, branch_id, change_request):
+MAX_REPLANS = int(os.environ.get("COMMIT_MAX_REPLANS", "2"))
+# plan simple renames, deletes and added parts without retrieval and the LLM
+RULE_PATH = os.environ.get("CHANGE_RULE_PATH", "1").lower() in ("1", "true", "yes")
+
+
+class PlanNotFoundError(LookupError):
+    """Raised when a plan id is unknown, expired or belongs to another branch."""
+
+
+def _plan(project_id, branch_id, change_request, runner_logs):
+    # Initialize Project Handler
+    client = SysMLClient()
+    client.initialize(project_id, branch_id)
+
+    planned = _plan_by_rule(client, change_request, runner_logs)
+    if planned is not None:
+        return planned
+
+    # Prepare context
+    context_manager = ContextManager(client)
+    context = context_manager.create_context(change_request)
+
+    input_naive = _naive_input_tokens(client, change_request)
+
+    # process change, on the fast model if the request is simple enough
+    routing = _route(change_request, context)
+    response, input_token, output_token = send_llm_request(context=str(context), user_request=change_request, tools=TOOLS, tier=routing["tier"])
+    try:
+        _stage_tool_calls(client, response, runner_logs)
+    except ChangeValidationError as e:
+        _escalate_or_raise(e, client, routing, runner_logs)
+        response, escalated_input, escalated_output = send_llm_request(context=str(context), user_request=change_request, tools=TOOLS, tier="strong")
+        _stage_tool_calls(client, response, runner_logs)
+        input_token, output_token = input_token + escalated_input, output_token + escalated_output
+
+    tokens = {
+        "input_approach": input_token,
+        "input_naive": input_naive,
+        "output": output_token,
+    }
+    details = {"path": "llm", "intent": None, "retrieval": context_manager.retrieval, "model": routing}
+    return client, response, tokens, details
+
+
+async def _plan_async(project_id, branch_id, change_request, runner_logs):
+    """Async version of _plan; waits for the SysML API, embeddings and the LLM without holding a thread."""
+    client = SysMLClient()
+    await client.initialize_async(project_id, branch_id)
+
+    planned = _plan_by_rule(client, change_request, runner_logs)
+    if planned is not None:
+        return planned
+
+    context_manager = await ContextManager.build_async(client)
+    context = await context_manager.create_context_async(change_request)
+
+    input_naive = await _naive_input_tokens_async(client, change_request)
+
+    routing = _route(change_request, context)
+    response, input_token, output_token = await send_llm_request_async(context=str(context), user_request=change_request, tools=TOOLS, tier=routing["tier"])
+    try:
+        _stage_tool_calls(client, response, runner_logs)
+    except ChangeValidationError as e:
+        _escalate_or_raise(e, client, routing, runner_logs)
+        response, escalated_input, escalated_output = await send_llm_request_async(context=str(context), user_request=change_request, tools=TOOLS, tier="strong")
+        _stage_tool_calls(client, response, runner_logs)
+        input_token, output_token = input_token + escalated_input, output_token + escalated_output
+
+    tokens = {
+        "input_approach": input_token,
+        "input_naive": input_naive,
+        "output": output_token,
+    }
+    details = {"path": "llm", "intent": None, "retrieval": context_manager.retrieval, "model": routing}
+    return client, response, tokens, details
+
+
+def _plan_by_rule(client, change_request, runner_logs):
+    """
+    Stage the tool calls of a request the rule-based intent parser understands; returns
+    None if the LLM has to plan it, also when the parsed plan fails validation.
+    """
+    if not RULE_PATH:
+        return None
+    intent = parse_intent(change_request, client.snapshot)
+    if intent is None:
+        return None
+    try:
+        _stage_tool_calls(client, intent.tool_calls, runner_logs)
+    except ChangeValidationError as e:
+        logger.info(f"Rule-based plan is invalid, planning with the LLM: {e}")
+        runner_logs.append({
+            "message": f"Rule-based plan is invalid, planning with the LLM: {e}",
+        })
+        client.discard_change()
+        return None
+
+    logger.info(f"Planned {intent.action} without the LLM")
+    tokens = {
+        "input_approach": 0,
+        "input_naive": None,
+        "output": 0,
+    }
+    details = {"path": "rule", "intent": intent.action, "retrieval": None, "model": None}
+    return client, intent.tool_calls, tokens, details
+
+
+def _route(change_request, context):
+    """Choose the model for a request; without a configured fast model every request goes to the strong one."""
+    if "fast" not in MODELS:
+        tier, reason = "strong", "no fast model configured"
+    else:
+        tier, reason = route(request_features(change_request, context))
+    logger.info(f"Routing request to the {tier} model ({reason})")
+    return {"tier": tier, "name": MODELS[tier], "reason": reason, "escalated": False}
+
+
+def _escalate_or_raise(e, client, routing, runner_logs):
+    """Discard the invalid plan of the fast model and switch the request to the strong model."""
+    if routing["tier"] != "fast":
+        raise e
+    logger.warning(f"Plan of the fast model is invalid, escalating to the strong model: {e}")
+    runner_logs.append({
+        "message": f"Plan of the fast model is invalid, escalating to the strong model: {e}",
+    })
+    client.discard_change()
+    routing.update(tier="strong", name=MODELS["strong"], escalated=True)
+
+
+# tokens of the naive prompt with the whole model by (project, commit), without the request
+_naive_model_tokens: OrderedDict[tuple[str, str], int] = OrderedDict()
+_naive_model_tokens_lock = threading.Lock()
+NAIVE_TOKENS_CACHE_SIZE = 8
+
+def _naive_input_tokens(client, change_request):
+    """Tokens of a prompt with the whole model as context; the model is only counted once per commit."""
+    model_tokens = _cached_naive_model_tokens(client)
+    if model_tokens is None:
+        # Fetch full context for comparison with naive approach
+        context_naive = client.get_all_elements()
+        projected_naive_elements = get_projection("prompt").project_many(context_naive) # same fields as the context for better comparison
+        _, model_tokens = create_llm_prompt(str(projected_naive_elements), "")
+        with _naive_model_tokens_lock:
+            _naive_model_tokens[(client.project_id, client.commit_id)] = model_tokens
+            while len(_naive_model_tokens) > NAIVE_TOKENS_CACHE_SIZE:
+                _naive_model_tokens.popitem(last=False)
+    return model_tokens + count_tokens(change_request)
+
+async def _naive_input_tokens_async(client, change_request):
+    if _cached_naive_model_tokens(client) is None:
+        # token counting of the whole model is CPU bound, once per commit
+        return await asyncio.to_thread(_naive_input_tokens, client, change_request)
+    return _naive_input_tokens(client, change_request)
+
+def _cached_naive_model_tokens(client):
+    with _naive_model_tokens_lock:
+        return _naive_model_tokens.get((client.project_id, client.commit_id))
+
+
+def _stage_tool_calls(client, response, runner_logs):
+    for tool_call in response:
+        msg = execute_tool(TOOLS_BY_NAME, tool_call, client)
+        runner_logs.append({
+            "message": msg,
+        })
+
+    # Reject the whole plan locally instead of letting the SysML API refuse the commit
+    if client.validator.errors:
+        raise ChangeValidationError(f"{len(client.validator.errors)} invalid operation(s) in plan.")
+
+
+def _metadata(project_id, branch_id, change_request):
+    return {
+        "project_id": project_id,
+        "branch_id": branch_id,
+        "change_request": change_request,
+        "timestamp": datetime.datetime.now().isoformat()
+    }
+
+
+def _error_result(e, metadata, start_time, runner_logs):
+    processing_time = time.time() - start_time
+    error_result = {
+        "status": "error",
+        "metadata": metadata,
+        "processing_time_seconds": round(processing_time, 3),
+        "error": str(e),
+        "logs": runner_logs,
+    }
+    logger.error(f"Error processing request: {e}")
+    if isinstance(e, PlanNotFoundError):
+        return error_result, 404
+    if isinstance(e, CommitConflictError):
+        return error_result, 409
+    if isinstance(e, ChangeValidationError):
+        return error_result, 422
+    return error_result, 500
+
+
+def run(project_id, branch_id, change_request, trace=False):
+    """
+    Plan and commit a change; with trace=True the response includes the tree of spans
+    (REST, Chroma, embedding and LLM calls, tool executions, commit pushes) of this run.
+    """
+    _record_run(project_id, branch_id, change_request)
+
+    with collect_spans() as spans:
+        with span("engine.run", project_id=project_id, branch_id=branch_id):
+            result, code = _run(project_id, branch_id, change_request)
+            trace_id = current_trace_id()
+    if trace:
+        result["trace"] = {"trace_id": trace_id, "spans": span_tree(spans)}
+    return result, code
+
+
+async def run_async(project_id, branch_id, change_request, trace=False):
+    """Async version of run with the same result contract, for the ASGI server."""
+    _record_run(project_id, branch_id, change_request)
+
+    with collect_spans() as spans:
+        with span("engine.run", project_id=project_id, branch_id=branch_id):
+            result, code = await _run_async(project_id, branch_id, change_request)
+            trace_id = current_trace_id()
+    if trace:
+        result["trace"] = {"trace_id": trace_id, "spans": span_tree(spans)}
+    return result, code
+
+
+def _record_run(project_id, branch_id, change_request):
+    recorder = get_cassette()
+    if recorder is not None:
+        recorder.record_run(project_id=project_id, branch_id=branch_id, change_request=change_request)
+
+
+def _run(project_id, branch_id, change_request):
     start_time = time.time()
     logger.info(f"Starting engine on project {project_id}, branch {branch_id}")
     runner_logs = []
 
     try:
-        # Initialize Project Handler
-        client = SysMLClient()
-        client.initialize(project_id, branch_id)
+        for attempt in range(MAX_REPLANS + 1):
+            client, _, tokens, details = _plan(project_id, branch_id, change_request, runner_logs)
 
-        # Prepare context
-        context_manager = ContextManager(client)
-        context = context_manager.create_context(change_request)
+            # Push Changes, re-plan on HEAD if a concurrent commit touched the same elements
+            try:
+                changes = client.commit_and_push()
+                break
+            except CommitConflictError as e:
+                _replan_or_raise(e, attempt, branch_id, runner_logs)
 
-        # Fetch full context for comparison with naive approach
-        context_naive = client.get_all_elements()
-        sanitized_naive_elements = sanitize(context_naive) # sanitize naive baseline for better comparison
-        _, input_naive = create_llm_prompt(str(sanitized_naive_elements), change_request)
+        return _success_result(project_id, branch_id, change_request, start_time, tokens, details, client, changes, runner_logs), 200
 
-        # create tools
-        tools = make_tools(client)
-        tools_by_name = {t.name: t for t in tools}
+    except Exception as e:
+        return _error_result(e, _metadata(project_id, branch_id, change_request), start_time, runner_logs)
 
-        # process change
-        response, input_token, output_token = send_llm_request(context=str(context), user_request=change_request, tools=tools)
 
-        for tool_call in response:
-            msg = execute_tool(tools_by_name, tool_call)
-            runner_logs.append({
-                "message": msg,
-            })
+async def _run_async(project_id, branch_id, change_request):
+    start_time = time.time()
+    logger.info(f"Starting async engine on project {project_id}, branch {branch_id}")
+    runner_logs = []
+
+    try:
+        for attempt in range(MAX_REPLANS + 1):
+            client, _, tokens, details = await _plan_async(project_id, branch_id, change_request, runner_logs)
+
+            try:
+                changes = await client.commit_and_push_async()
+                break
+            except CommitConflictError as e:
+                _replan_or_raise(e, attempt, branch_id, runner_logs)
 
-        # Push Changes
-        client.commit_and_push()
+        return _success_result(project_id, branch_id, change_request, start_time, tokens, details, client, changes, runner_logs), 200
+
+    except Exception as e:
+        return _error_result(e, _metadata(project_id, branch_id, change_request), start_time, runner_logs)
+
+
+def _replan_or_raise(e, attempt, branch_id, runner_logs):
+    if attempt == MAX_REPLANS:
+        raise e
+    logger.warning(f"Commit conflict on branch {branch_id}, re-planning: {e}")
+    runner_logs.append({
+        "message": f"Commit conflict, re-planning: {e}",
+    })
+
+
+def _success_result(project_id, branch_id, change_request, start_time, tokens, details, client, changes, runner_logs):
+    # Calculate processing time
+    processing_time = time.time() - start_time
+
+    return {
+        "status": "success",
+        "metadata": _metadata(project_id, branch_id, change_request),
+        "processing_time_seconds": round(processing_time, 3),
+        "tokens": tokens,
+        **details,
+        "commit_id": client.commit_id,
+        "parent_commit_id": client.parent_commit_id,
+        "coalesced": client.coalesced,
+        "changes": changes,
+        "logs": runner_logs,
+    }
+
+
+def plan(project_id, branch_id, change_request):
+    """Plan a change without committing it; the plan can later be applied by its id."""
+    start_time = time.time()
+    logger.info(f"Planning change on project {project_id}, branch {branch_id}")
+    runner_logs = []
+
+    try:
+        client, tool_calls, tokens, details = _plan(project_id, branch_id, change_request, runner_logs)
+        client.optimize_change()
+        # applying the plan must not depend on the snapshot still being cached
+        changes = client.snapshot.preview_change(client.change)
+
+        plan_id = plan_cache.put({
+            "project_id": project_id,
+            "branch_id": branch_id,
+            "base_commit_id": client.commit_id,
+            "change_request": change_request,
+            "tool_calls": tool_calls,
+            "change": client.change,
+            "changes": changes,
+        })
 
-        # Calculate processing time
         processing_time = time.time() - start_time
 
         result = {
-            "status": "success",
-            "metadata": {
-                "project_id": project_id,
-                "branch_id": branch_id,
-                "change_request": change_request,
-                "timestamp": datetime.datetime.now().isoformat()
-            },
+            "status": "planned",
+            "metadata": _metadata(project_id, branch_id, change_request),
+            "plan_id": plan_id,
+            "base_commit_id": client.commit_id,
+            "tool_calls": tool_calls,
+            "change": client.change,
             "processing_time_seconds": round(processing_time, 3),
-            "tokens": {
-                "input_approach": input_token,
-                "input_naive": input_naive,
-                "output": output_token,
-            },
+            "tokens": tokens,
+            **details,
             "logs": runner_logs,
         }
 
         return result, 200
-    
+
     except Exception as e:
+        return _error_result(e, _metadata(project_id, branch_id, change_request), start_time, runner_logs)
+
+
+def apply(project_id, branch_id, plan_id):
+    """Commit a stored plan if the branch HEAD still matches the commit it was planned on."""
+    start_time = time.time()
+    logger.info(f"Applying plan {plan_id} on project {project_id}, branch {branch_id}")
+    runner_logs = []
+    change_request = None
+
+    try:
+        stored_plan = plan_cache.get(plan_id)
+        if stored_plan is None or (stored_plan["project_id"], stored_plan["branch_id"]) != (project_id, branch_id):
+            raise PlanNotFoundError(f"Plan {plan_id} not found for this branch.")
+        change_request = stored_plan["change_request"]
+
+        branch = get_project_branch(project_id, branch_id)
+        if branch is None:
+            raise RuntimeError(f"Branch {branch_id} not found")
+        head_commit_id = (branch.get("head") or {}).get("@id")
+        if head_commit_id != stored_plan["base_commit_id"]:
+            plan_cache.discard(plan_id)
+            raise CommitConflictError(f"HEAD moved from {stored_plan['base_commit_id']} to {head_commit_id}, plan is stale.")
+
+        queue = get_commit_queue(project_id, branch_id)
+        commit = queue.submit_change(stored_plan["base_commit_id"], stored_plan["change"])
+        plan_cache.discard(plan_id)
+
+        for tool_call in stored_plan["tool_calls"]:
+            runner_logs.append({
+                "message": f"{tool_call.get('name')} - {tool_call.get('args')}",
+            })
+
         processing_time = time.time() - start_time
-        error_result = {
-            "status": "error",
-            "metadata": {
-                "project_id": project_id,
-                "branch_id": branch_id,
-                "change_request": change_request,
-                "timestamp": datetime.datetime.now().isoformat()
-            },
+
+        result = {
+            "status": "success",
+            "metadata": _metadata(project_id, branch_id, change_request),
+            "plan_id": plan_id,
             "processing_time_seconds": round(processing_time, 3),
-            "error": str(e),
+            "commit_id": commit.commit_id,
+            "parent_commit_id": commit.parent_commit_id,
+            "coalesced": commit.coalesced,
+            "changes": stored_plan["changes"],
             "logs": runner_logs,
         }
-        logger.error(f"Error processing request: {e}")
-        return error_result, 500
-    
\ No newline at end of file
+
+        return result, 200
+
+    except Exception as e:
+        if isinstance(e, CommitConflictError):
+            plan_cache.discard(plan_id)
+        return _error_result(e, _metadata(project_id, branch_id, change_request), start_time, runner_logs)
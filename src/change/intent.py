@@ -0,0 +1,116 @@
+import re
+import threading
+import weakref
+from typing import NamedTuple
+from src.context.query_splitter import split_request
+from src.utils.tracing import traced
+
+# Rule-based parser for the most common change requests ("rename X to Y", "delete X",
+# "add part X under Y"). A parsed request is planned without retrieval and the LLM, as
+# the same tool calls the LLM would return. Anything unclear is left to the LLM.
+
+_NEW_NAME = r"(?P<name>\"[^\"]+\"|'[^']+'|[A-Za-z_][A-Za-z0-9_]*)"
+_RENAME = re.compile(rf"^rename\s+(?P<target>.+?)\s+(?:to|as|into)\s+{_NEW_NAME}$", re.IGNORECASE)
+_DELETE = re.compile(r"^(?:delete|remove)\s+(?P<target>.+?)(?:\s+from\s+(?P<owner>.+))?$", re.IGNORECASE)
+_ADD_PART = re.compile(
+    rf"^add\s+(?:an?\s+)?(?:new\s+)?part\s+(?:named\s+|called\s+)?{_NEW_NAME}\s+(?:under|to|in|into|below)\s+(?P<owner>.+)$",
+    re.IGNORECASE,
+)
+_ARTICLE = re.compile(r"^(?:the|a|an|my|our)\s+", re.IGNORECASE)
+_KIND_SUFFIX = re.compile(r"\s+(?:part|element)$", re.IGNORECASE)
+_NOT_ALPHANUMERIC = re.compile(r"[^a-z0-9]")
+
+
+class Intent(NamedTuple):
+    action: str
+    tool_calls: list
+
+
+def normalize(name):
+    """Lowercase a name without spaces and punctuation, so "water pump" matches WaterPump."""
+    return _NOT_ALPHANUMERIC.sub("", name.lower())
+
+
+# name indexes by snapshot, rebuilt when the snapshot moves to another commit
+_name_indexes = weakref.WeakKeyDictionary()
+_name_indexes_lock = threading.Lock()
+
+def name_index(snapshot):
+    """Return the elements of a snapshot by normalized name and by qualified name."""
+    with _name_indexes_lock:
+        cached = _name_indexes.get(snapshot)
+        if cached is not None and cached[0] == snapshot.commit_id:
+            return cached[1]
+    index = {}
+    for element in snapshot.elements():
+        for name in {element.get("name"), element.get("declaredName"), element.get("qualifiedName")}:
+            if name:
+                index.setdefault(normalize(name) if "::" not in name else name, []).append(element)
+    with _name_indexes_lock:
+        _name_indexes[snapshot] = (snapshot.commit_id, index)
+    return index
+
+
+def resolve(index, text):
+    """Return the elements a name in a request refers to, e.g. "the water pump" or 'Machine::WaterPump'."""
+    text = _ARTICLE.sub("", text.strip().strip("\"'"))
+    if "::" in text:
+        return _unique(index.get(text, []))
+    matches = index.get(normalize(text)) or index.get(normalize(_KIND_SUFFIX.sub("", text)), [])
+    return _unique(matches)
+
+def _unique(elements):
+    return list({e["@id"]: e for e in elements}.values())
+
+
+@traced("intent.parse")
+def parse_intent(change_request, snapshot):
+    """
+    Parse a simple change request against the elements of a snapshot.
+
+    Returns:
+        Intent | None: The action and its tool calls, or None if the request is not a
+            single rename, delete or add part, or a name does not match exactly one element.
+    """
+    request = re.sub(r"^please\s+", "", change_request.strip().rstrip(".!"), flags=re.IGNORECASE)
+    if not request or len(split_request(request)) > 1:
+        return None
+    index = name_index(snapshot)
+
+    match = _RENAME.match(request)
+    if match:
+        targets = resolve(index, match["target"])
+        if len(targets) != 1:
+            return None
+        target = targets[0]
+        return Intent("rename", [{
+            "name": "update",
+            "args": {"element_id": target["@id"], "attrs": {"@type": target["@type"], "name": match["name"].strip("\"'")}},
+        }])
+
+    match = _ADD_PART.match(request)
+    if match:
+        owners = resolve(index, match["owner"])
+        name = match["name"].strip("\"'")
+        if len(owners) != 1 or any(c.get("name") == name for c in snapshot.children(owners[0]["@id"])):
+            return None
+        return Intent("add_part", [{
+            "name": "create",
+            "args": {"attrs": {"@type": "PartUsage", "name": name, "owner": {"@id": owners[0]["@id"]}}},
+        }])
+
+    match = _DELETE.match(request)
+    if match:
+        targets = resolve(index, match["target"])
+        if match["owner"]:
+            owner_ids = {e["@id"] for e in resolve(index, match["owner"])}
+            targets = [t for t in targets if snapshot.owner_id(t["@id"]) in owner_ids]
+        if len(targets) != 1:
+            return None
+        target = targets[0]
+        if snapshot.child_count(target["@id"]):
+            # remove the owned elements with it instead of leaving them without owner
+            return Intent("delete", [{"name": "delete_many", "args": {"selector": {"subtree": target["@id"]}}}])
+        return Intent("delete", [{"name": "delete", "args": {"element_id": target["@id"], "type": target["@type"]}}])
+
+    return None
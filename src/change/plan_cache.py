@@ -0,0 +1,51 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+PLAN_CACHE_SIZE = int(os.environ.get("PLAN_CACHE_SIZE", "128"))
+PLAN_TTL_SECONDS = float(os.environ.get("PLAN_TTL_SECONDS", "900"))
+
+
+class PlanCache:
+    """
+    Bounded store for planned but not yet applied changes.
+
+    Plans are evicted least-recently-stored first once max_size is reached, and
+    expire ttl seconds after they were stored.
+    """
+
+    def __init__(self, max_size=PLAN_CACHE_SIZE, ttl=PLAN_TTL_SECONDS):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._plans = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, plan: dict) -> str:
+        """Store a plan and return its new plan id."""
+        plan_id = uuid.uuid4().hex
+        with self._lock:
+            self._plans[plan_id] = (time.monotonic(), {**plan, "plan_id": plan_id})
+            while len(self._plans) > self.max_size:
+                self._plans.popitem(last=False)
+        return plan_id
+
+    def get(self, plan_id: str):
+        """Return the plan stored under plan_id, or None if it is unknown or expired."""
+        with self._lock:
+            entry = self._plans.get(plan_id)
+            if entry is None:
+                return None
+            stored_at, plan = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self._plans[plan_id]
+                return None
+            return plan
+
+    def discard(self, plan_id: str) -> None:
+        with self._lock:
+            self._plans.pop(plan_id, None)
+
+
+plan_cache = PlanCache()
@@ -13,6 +13,7 @@ YOUR TASK
 RULES
 - Think step-by-step but output only the final JSON (no commentary, no markdown).  
 - Use only the tools provided; do not invent new ones.  
+- If the same change applies to several elements, use one `create_many`, `update_many` or `delete_many` call with a selector instead of one call per element.  
 - If the request cannot be fulfilled, output a single call to `__error__` with a brief `message` argument.  
 - Maintain any existing element IDs. 
 - Touch only the model parts relevant to the request.  
@@ -0,0 +1,59 @@
+import os
+import re
+from typing import NamedTuple
+from src.context.query_splitter import ACTION_VERBS, split_request
+
+# Local routing of change requests to the fast or the strong model (OPENAI_API_MODEL_FAST and
+# OPENAI_API_MODEL). A request goes to the fast model only if it is a single, local edit.
+
+FAST_MAX_TARGETS = int(os.environ.get("ROUTER_FAST_MAX_TARGETS", "2"))
+FAST_MAX_CONTEXT = int(os.environ.get("ROUTER_FAST_MAX_CONTEXT", "40"))
+
+# Verbs of edits that rewire the model instead of touching a single element
+STRUCTURAL_VERBS = (
+    "move", "replace", "connect", "disconnect", "restructure", "reorganize", "split",
+    "merge", "nest", "group", "swap", "duplicate", "copy",
+)
+
+_VERB_PATTERN = re.compile(rf"\b(?:{'|'.join(ACTION_VERBS + STRUCTURAL_VERBS)})\b", re.IGNORECASE)
+_STRUCTURAL_PATTERN = re.compile(rf"\b(?:{'|'.join(STRUCTURAL_VERBS)})\b", re.IGNORECASE)
+# quoted names and CamelCase identifiers such as WaterPump
+_TARGET_PATTERN = re.compile(r"\"([^\"]+)\"|'([^']+)'|\b([A-Z][a-z0-9]+(?:[A-Z][A-Za-z0-9]*)+)\b")
+
+
+class RequestFeatures(NamedTuple):
+    sub_requests: int
+    verbs: int
+    targets: int
+    context_elements: int
+    structural: bool
+
+
+def request_features(change_request, context):
+    """Extract the routing features of a change request and the context retrieved for it."""
+    targets = {next(group for group in match.groups() if group) for match in _TARGET_PATTERN.finditer(change_request)}
+    return RequestFeatures(
+        sub_requests=len(split_request(change_request)),
+        verbs=len(_VERB_PATTERN.findall(change_request)),
+        targets=len(targets),
+        context_elements=len(context),
+        structural=bool(_STRUCTURAL_PATTERN.search(change_request)),
+    )
+
+
+def route(features):
+    """
+    Choose the model tier for a request.
+
+    Returns:
+        tuple[str, str]: "fast" or "strong", and the reason for the choice.
+    """
+    if features.structural:
+        return "strong", "structural edit"
+    if features.sub_requests > 1 or features.verbs > 1:
+        return "strong", "compound request"
+    if features.targets > FAST_MAX_TARGETS:
+        return "strong", f"{features.targets} target elements"
+    if features.context_elements > FAST_MAX_CONTEXT:
+        return "strong", f"{features.context_elements} context elements"
+    return "fast", "single local edit"
@@ -1,38 +1,239 @@
-import json
+import asyncio
 import logging
-from src.context.vector_store import VectorDB
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from src.context.query_splitter import split_request
+from src.context.retrieval_config import get_retrieval_config, validate_retrieval_config
+from src.context.retrieval_depth import select_hits
+from src.context.vector_store import VectorDB, element_of, merge_round_robin
+from src.sysml2.commit_queue import add_commit_listener
+from src.sysml2.snapshot import peek_snapshot
+from src.sysml2.snapshot_store import get_snapshot_store
 from src.sysml2.sysml_client import SysMLClient
+from src.utils.json_codec import dumps
+from src.utils.logger import payload
+from src.utils.tracing import bind_context, traced
 logger = logging.getLogger(__name__)
 
+# if set, overrides the multi_query setting of the retrieval config
+MULTI_QUERY = os.environ.get("CONTEXT_MULTI_QUERY")
+
+
+# One vector index per branch, shared between requests. _indexed_commits records
+# the commit each index currently reflects, so it is only rebuilt when that differs.
+# The lock of an index is held while it is synced and searched, so a search always
+# sees the index of the searching request's commit. Async requests run these steps on
+# one thread per branch, so requests waiting for the lock do not hold a thread each.
+_vector_dbs: dict[tuple[str, str], VectorDB] = {}
+_indexed_commits: dict[tuple[str, str], str] = {}
+_index_locks: dict[tuple[str, str], threading.Lock] = {}
+_index_executors: dict[tuple[str, str], ThreadPoolExecutor] = {}
+_registry_lock = threading.Lock()
+
+def _branch_index(project_id, branch_id):
+    key = (project_id, branch_id)
+    with _registry_lock:
+        if key not in _vector_dbs:
+            _vector_dbs[key] = VectorDB(collection_name=f"sysml_model_{project_id}_{branch_id}")
+            _index_locks[key] = threading.Lock()
+        return _vector_dbs[key], _index_locks[key]
+
+def _branch_executor(project_id, branch_id):
+    """Return the thread that runs the lock-bound index steps of async requests on a branch."""
+    key = (project_id, branch_id)
+    with _registry_lock:
+        if key not in _index_executors:
+            _index_executors[key] = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"index-{branch_id}")
+        return _index_executors[key]
+
+async def _on_branch_executor(project_id, branch_id, func, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_branch_executor(project_id, branch_id), bind_context(partial(func, *args)))
+
+def _with_descendants(snapshot, created, updated):
+    """
+    Return the records to re-embed for a change: the created and updated elements, and
+    everything owned by an updated element, since the owner path in their text may change.
+    """
+    records = {e["@id"]: e for e in created + updated}
+    if snapshot is None:
+        return list(records.values())
+    stack = [e["@id"] for e in updated]
+    while stack:
+        for child in snapshot.children(stack.pop()):
+            if child["@id"] not in records:
+                records[child["@id"]] = child
+                stack.append(child["@id"])
+    return list(records.values())
+
+def _write_through(project_id, base_commit_id, commit_id, delta):
+    """Apply a pushed change set to the vector index at its base commit instead of rebuilding it."""
+    if delta is None:
+        return
+    with _registry_lock:
+        keys = [key for key in _vector_dbs if key[0] == project_id]
+    for key in keys:
+        vector_db, lock = _branch_index(*key)
+        with lock:
+            if _indexed_commits.get(key) != base_commit_id:
+                continue
+            snapshot = peek_snapshot(project_id, commit_id)
+            vector_db.remove_elements([e["@id"] for e in delta["deleted"]])
+            vector_db.add_elements(_with_descendants(snapshot, delta["created"], delta["updated"]), snapshot)
+            _indexed_commits[key] = commit_id
+        logger.debug("Index of branch %s written through to commit %s", key[1], commit_id)
+
+add_commit_listener(_write_through)
+
+def _stored_diff(project_id, base_commit_id, commit_id):
+    """Return the diff between two commits if both are in the snapshot store, otherwise None."""
+    store = get_snapshot_store()
+    if store is None or base_commit_id is None:
+        return None
+    if not (store.has_commit(project_id, base_commit_id) and store.has_commit(project_id, commit_id)):
+        return None
+    try:
+        return store.diff(project_id, base_commit_id, commit_id)
+    except (LookupError, OSError):
+        logger.warning(f"Could not diff commits {base_commit_id} and {commit_id}", exc_info=True)
+        return None
+
 
 class ContextManager:
 
-    def __init__(self, client: SysMLClient):
+    def __init__(self, client: SysMLClient, multi_query=None, settings=None):
+        """
+        Args:
+            multi_query: Split compound requests into sub-queries, overrides the settings.
+            settings: Retrieval settings, see retrieval_config.DEFAULTS; defaults to the
+                process-wide retrieval config.
+        """
         self.client = client
-        self.vector_db = VectorDB()
-        self.vector_db.remove_all_elements() # for poc remove all elemnts here
-        elements = client.get_all_elements()
-        self.vector_db.add_elements(elements)
+        self.settings = validate_retrieval_config(settings) if settings is not None else dict(get_retrieval_config())
+        # depth and scores of the last retrieval, reported with the change result
+        self.retrieval = None
+        if multi_query is None and settings is None and MULTI_QUERY is not None:
+            multi_query = MULTI_QUERY.lower() in ("1", "true", "yes")
+        if multi_query is not None:
+            self.settings["multi_query"] = multi_query
+        self.multi_query = self.settings["multi_query"]
+        self._index_key = (client.project_id, client.branch_id)
+        self.vector_db, self._index_lock = _branch_index(*self._index_key)
+        with self._index_lock:
+            self._sync_index()
 
+    def _sync_index(self):
+        """Bring the branch index to the client's commit; the caller holds the index lock."""
+        indexed_commit_id = _indexed_commits.get(self._index_key)
+        if indexed_commit_id != self.client.commit_id:
+            # sync from the indexed commit if the snapshot store can diff it, else rebuild
+            diff = _stored_diff(self.client.project_id, indexed_commit_id, self.client.commit_id)
+            snapshot = self.client.snapshot
+            if diff is not None:
+                self.vector_db.remove_elements([e["@id"] for e in diff["deleted"]])
+                self.vector_db.add_elements(_with_descendants(snapshot, diff["created"], diff["updated"]), snapshot)
+            else:
+                self.vector_db.remove_all_elements()
+                self.vector_db.add_elements(snapshot.elements(), snapshot)
+            _indexed_commits[self._index_key] = self.client.commit_id
+
+    @traced("context.create")
     def create_context(self, query):
-        logger.debug(f"Context request: {query}")
+        logger.debug("Context request: %s", payload(query))
+
+        # 1) Embed the request, and its sub-queries for compound requests
+        vectors = self.vector_db.embed_prompts(self._prompts(query))
+        return self._search(vectors)
+
+    @classmethod
+    async def build_async(cls, client: SysMLClient, multi_query=None, settings=None):
+        """Create a context manager on the branch's index thread, since syncing the index blocks on its lock."""
+        return await _on_branch_executor(client.project_id, client.branch_id, cls, client, multi_query, settings)
+
+    @traced("context.create")
+    async def create_context_async(self, query):
+        """Async version of create_context; the query embeddings are awaited, the search runs on the branch's index thread."""
+        logger.debug("Context request: %s", payload(query))
+
+        vectors = await self.vector_db.embed_prompts_async(self._prompts(query))
+        return await _on_branch_executor(*self._index_key, self._search, vectors)
+
+    def _prompts(self, query):
+        """The query, followed by its sub-queries if it is a compound request."""
+        sub_queries = split_request(query) if self.multi_query else [query]
+        if len(sub_queries) > 1:
+            logger.debug("Split context request into %s", sub_queries)
+            return [query] + sub_queries
+        return [query]
+
+    def _search(self, vectors):
+        """
+        Search the index with the query vectors and enrich the hits. The index lock is held
+        throughout, so the index cannot move to another commit between sync and lookups.
+        """
+        with self._index_lock:
+            self._sync_index()
+            # 2) Fetch the best scored elements, or the most relevant diverse ones per sub-query
+            if len(vectors) > 1 and not self.settings["adaptive"]:
+                docs = self._unscored(self.vector_db.mmr_search(vectors, self.settings["k"]))
+            else:
+                docs = self._select(self.vector_db.scored_search(vectors, self._fetch_k()))
+            return self._enrich(docs)
+
+    def _fetch_k(self):
+        return self.settings["max_k"] if self.settings["adaptive"] else self.settings["k"]
+
+    def _select(self, scored_lists):
+        """
+        Cut each list of (document, score) pairs to the adaptive depth, merge them and record
+        the kept scores in self.retrieval. With fixed depth, the lists are merged as fetched.
+        """
+        s = self.settings
+        if s["adaptive"]:
+            scored_lists = [
+                select_hits(hits, s["min_k"], s["max_k"], s["score_threshold"], s["drop_off"])
+                for hits in scored_lists
+            ]
+        scores = {}
+        for hits in scored_lists:
+            for doc, score in hits:
+                scores[doc.id] = max(score, scores.get(doc.id, score))
+        docs = merge_round_robin([[doc for doc, _ in hits] for hits in scored_lists], max(map(len, scored_lists), default=0))
+        self._record_retrieval(docs, scores)
+        return docs
+
+    def _unscored(self, docs):
+        # maximal marginal relevance search of the fixed depth multi query has no scores
+        self._record_retrieval(docs, {})
+        return docs
 
-        # 1) Fetch top-N elements from vector DB
-        docs = self.vector_db.query(query, 5)
+    def _record_retrieval(self, docs, scores):
+        self.retrieval = {
+            "mode": "adaptive" if self.settings["adaptive"] else "fixed",
+            "k": len(docs),
+            "hits": [
+                {"id": doc.id, "score": round(scores[doc.id], 4) if doc.id in scores else None}
+                for doc in docs
+            ],
+        }
+        logger.debug("Retrieved %d documents (%s)", len(docs), self.retrieval["mode"])
 
-        # 2) Parse base elements (JSON) from page_content
+    def _enrich(self, docs):
+        # 3) Parse base elements (JSON) from the document metadata
         base_elements = []
         for doc in docs:
             try:
-                base_elements.append(json.loads(doc.page_content))
+                base_elements.append(element_of(doc))
             except Exception:
-                logger.warning("Failed to parse document page_content as JSON.", exc_info=True)
+                logger.warning("Failed to parse element of document as JSON.", exc_info=True)
 
-        # 3) Collect related elements (children + owner) for each base element
+        # 4) Collect related elements (children + owner) for each base element
         seen_ids = {e.get("@id") for e in base_elements if isinstance(e, dict)}
         enriched = list(base_elements)
 
-        for elem in base_elements:
+        for elem in base_elements if self.settings["expand_related"] else []:
             elem_id = elem.get("@id") if isinstance(elem, dict) else None
             if not elem_id:
                 continue
@@ -40,7 +241,7 @@ class ContextManager:
             try:
                 related = self.vector_db.related_elements(elem_id) or []
             except Exception:
-                logger.exception(f"Failed to fetch related elements for {elem_id}")
+                logger.exception("Failed to fetch related elements for %s", elem_id)
                 related = []
 
             for r in related:
@@ -49,9 +250,9 @@ class ContextManager:
                     enriched.append(r)
                     seen_ids.add(rid)
 
-        # 4) Convert back to JSON strings
-        context = [json.dumps(e) for e in enriched]
+        # 5) Convert back to JSON strings
+        context = [dumps(e) for e in enriched]
 
-        logger.debug(f"Created Context: {context}")
+        logger.debug("Created context of %d elements: %s", len(context), payload(context))
         return context
     
\ No newline at end of file
@@ -0,0 +1,71 @@
+import os
+
+# Written as the header lines of the text, not as attributes
+HEADER_FIELDS = ("@id", "@type", "name", "declaredName", "owner")
+MAX_VALUE_LENGTH = int(os.environ.get("EMBED_MAX_VALUE_LENGTH", "200"))
+
+
+def element_name(element):
+    return element.get("declaredName") or element.get("name")
+
+
+class OwnerPaths:
+    """Qualified owner paths ('Vehicle::Powertrain') of the elements of a snapshot, memoized."""
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self._paths = {}
+
+    def __call__(self, element_id):
+        """Return the names of the owners of an element from the root down, joined with '::'."""
+        # collect owners up to the first one with a known path, owners missing in the snapshot end the path
+        chain = []
+        owner_id = self.snapshot.owner_id(element_id)
+        while owner_id in self.snapshot and owner_id not in self._paths and owner_id not in chain:
+            chain.append(owner_id)
+            owner_id = self.snapshot.owner_id(owner_id)
+        path = self._paths.get(owner_id, "")
+
+        for owner_id in reversed(chain):
+            name = element_name(self.snapshot.get(owner_id)) or "<unnamed>"
+            path = f"{path}::{name}" if path else name
+            self._paths[owner_id] = path
+        return path
+
+
+class DocumentComposer:
+    """
+    Composes the text that is embedded for an element.
+
+    Instead of the element JSON, the text holds the type, the name, the owner path
+    and the scalar attributes, e.g. of the element's embedding projection:
+
+        PartUsage engine
+        in Vehicle::Powertrain
+        isAbstract: false
+    """
+
+    def __init__(self, attributes=None, max_value_length=MAX_VALUE_LENGTH):
+        self.attributes = attributes    # None: all scalar attributes of the (projected) element
+        self.max_value_length = max_value_length
+
+    def compose(self, element, owner_path=""):
+        lines = [" ".join(filter(None, [element.get("@type"), element_name(element)]))]
+        if owner_path:
+            lines.append(f"in {owner_path}")
+
+        attributes = []
+        keys = self.attributes if self.attributes is not None else [k for k in element if k not in HEADER_FIELDS]
+        for key in keys:
+            value = element.get(key)
+            if value is None or value == "" or isinstance(value, (dict, list)):
+                continue
+            if isinstance(value, bool):
+                value = str(value).lower()
+            value = str(value)
+            if len(value) > self.max_value_length:
+                value = value[:self.max_value_length] + "…"
+            attributes.append(f"{key}: {value}")
+        if attributes:
+            lines.append("; ".join(attributes))
+        return "\n".join(lines)
@@ -0,0 +1,27 @@
+import re
+
+# Verbs that start a new change within a compound request
+ACTION_VERBS = (
+    "add", "create", "insert", "remove", "delete", "drop", "rename", "move",
+    "change", "update", "set", "replace", "connect", "disconnect",
+)
+
+_VERBS = "|".join(ACTION_VERBS)
+_SPLIT_PATTERN = re.compile(
+    rf"\s*(?:[;\n]+|\.\s+|,?\s+(?:and\s+then|and\s+also|then|and|also)\s+(?=(?:{_VERBS})\b)|,\s*(?=(?:{_VERBS})\b))\s*",
+    re.IGNORECASE,
+)
+
+
+def split_request(request: str) -> list[str]:
+    """
+    Split a compound change request into one sub-query per requested change.
+
+    A new sub-query starts at ';', a sentence end, or a conjunction/comma that is
+    followed by an action verb, e.g. "add a grinder to the bean subsystem and remove
+    the water filter" yields two sub-queries. Simple requests are returned unchanged
+    as a single-item list.
+    """
+    parts = [part.strip(" .") for part in _SPLIT_PATTERN.split(request)]
+    parts = [part for part in parts if part]
+    return parts or [request]
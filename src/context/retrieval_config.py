@@ -0,0 +1,72 @@
+import logging
+import os
+import threading
+from src.utils.json_codec import dumps, loads
+logger = logging.getLogger(__name__)
+
+# Written by the retrieval evaluation (python -m benchmarks.eval_retrieval), read at startup
+RETRIEVAL_CONFIG_PATH = os.environ.get("RETRIEVAL_CONFIG", "./config/retrieval.json")
+
+# k: documents fetched per (sub-)query, multi_query: split compound requests,
+# expand_related: add the owner and children of each hit.
+# adaptive: instead of k, keep between min_k and max_k hits per (sub-)query whose relevance
+# score is at least score_threshold and within drop_off of the best score
+DEFAULTS = {
+    "k": 5,
+    "multi_query": False,
+    "expand_related": True,
+    "adaptive": False,
+    "min_k": 1,
+    "max_k": 20,
+    "score_threshold": 0.3,
+    "drop_off": 0.25,
+}
+
+
+def validate_retrieval_config(config):
+    """Return the retrieval settings of config merged over DEFAULTS; raises ValueError if one is invalid."""
+    settings = dict(DEFAULTS)
+    settings.update({key: config[key] for key in DEFAULTS if key in config})
+    for key in ("k", "min_k", "max_k"):
+        if not isinstance(settings[key], int) or isinstance(settings[key], bool) or settings[key] < 1:
+            raise ValueError(f"{key} must be a positive integer, got {settings[key]!r}")
+    if settings["max_k"] < settings["min_k"]:
+        raise ValueError(f"max_k must not be below min_k, got {settings['max_k']} < {settings['min_k']}")
+    for key in ("multi_query", "expand_related", "adaptive"):
+        if not isinstance(settings[key], bool):
+            raise ValueError(f"{key} must be a boolean, got {settings[key]!r}")
+    for key in ("score_threshold", "drop_off"):
+        if not isinstance(settings[key], (int, float)) or isinstance(settings[key], bool) or not 0 <= settings[key] <= 1:
+            raise ValueError(f"{key} must be a number between 0 and 1, got {settings[key]!r}")
+    return settings
+
+def load_retrieval_config(path=RETRIEVAL_CONFIG_PATH):
+    """Read the retrieval settings from a JSON file, falling back to DEFAULTS if it is missing or invalid."""
+    try:
+        with open(path, "rb") as f:
+            return validate_retrieval_config(loads(f.read()))
+    except FileNotFoundError:
+        return dict(DEFAULTS)
+    except ValueError:
+        logger.warning("Ignoring invalid retrieval config %s", path, exc_info=True)
+        return dict(DEFAULTS)
+
+def write_retrieval_config(settings, path=RETRIEVAL_CONFIG_PATH, **extra):
+    """Write validated retrieval settings, with extra entries such as evaluation results, to a JSON file."""
+    document = {**validate_retrieval_config(settings), **extra}
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(dumps(document) + "\n")
+
+
+_config = None
+_config_lock = threading.Lock()
+
+def get_retrieval_config():
+    """Return the process-wide retrieval settings, loaded once from RETRIEVAL_CONFIG_PATH."""
+    global _config
+    with _config_lock:
+        if _config is None:
+            _config = load_retrieval_config()
+            logger.info("Retrieval settings: %s", _config)
+        return _config
@@ -0,0 +1,24 @@
+# Adaptive retrieval depth: how many of the scored hits of a similarity search go into the
+# context. Scores are relevance scores in [0, 1], higher is more similar.
+
+
+def select_hits(scored_hits, min_k=1, max_k=20, score_threshold=0.0, drop_off=1.0):
+    """
+    Cut a list of (hit, score) pairs, best first, to the hits that clear the cutoffs.
+
+    The first min_k hits are always kept. After that, hits are kept while their score is
+    at least score_threshold and within drop_off (relative) of the best score, up to max_k.
+
+    Returns:
+        list: The kept (hit, score) pairs, best first.
+    """
+    scored_hits = sorted(scored_hits, key=lambda pair: pair[1], reverse=True)
+    if not scored_hits:
+        return []
+    floor = max(score_threshold, scored_hits[0][1] * (1 - drop_off))
+    selected = []
+    for hit, score in scored_hits[:max_k]:
+        if len(selected) >= min_k and score < floor:
+            break
+        selected.append((hit, score))
+    return selected
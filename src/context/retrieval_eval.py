@@ -0,0 +1,201 @@
+import itertools
+import random
+import uuid
+from typing import NamedTuple
+import yaml
+from src.utils.json_codec import loads
+
+# Offline evaluation of the context retrieval: which retrieval settings put the elements a
+# change touches into the context, and at which prompt size. Used by benchmarks/eval_retrieval.py.
+
+SEED_DATA_PATH = "demo/seeder/data.yaml"
+CASES_PATH = "benchmarks/retrieval_cases.yaml"
+
+SETTINGS_GRID = [
+    {"k": k, "multi_query": multi_query, "expand_related": expand_related}
+    for k, multi_query, expand_related in itertools.product(
+        (1, 2, 3, 5, 8, 12, 20), (False, True), (True, False)
+    )
+] + [
+    {"adaptive": True, "multi_query": multi_query, "expand_related": True,
+     "min_k": 1, "max_k": 20, "score_threshold": threshold, "drop_off": drop_off}
+    for multi_query, threshold, drop_off in itertools.product(
+        (False, True), (0.2, 0.3, 0.4, 0.5), (0.1, 0.25, 0.5)
+    )
+]
+
+# ids are derived from the model name and the qualified name, so they are stable between runs
+_ID_NAMESPACE = uuid.UUID("6f1c3a52-8f0e-4f61-9d0a-3b9e2f7c5d10")
+
+
+class EvalCase(NamedTuple):
+    model: str
+    request: str
+    required_ids: frozenset
+
+
+def element_id(model_name, qualified_name):
+    return str(uuid.uuid5(_ID_NAMESPACE, f"{model_name}/{qualified_name}"))
+
+
+def build_model(model_name, tree):
+    """Flatten a seeder element tree (name, type, children) into element records owner-first."""
+    elements = []
+    stack = [(node, None) for node in reversed(tree)]
+    while stack:
+        node, owner = stack.pop()
+        qualified_name = f"{owner['qualifiedName']}::{node['name']}" if owner else node["name"]
+        element = {
+            "@id": element_id(model_name, qualified_name),
+            "@type": node["type"],
+            "name": node["name"],
+            "declaredName": node["name"],
+            "qualifiedName": qualified_name,
+        }
+        if owner:
+            element["owner"] = {"@id": owner["@id"]}
+        elements.append(element)
+        stack.extend((child, element) for child in reversed(node.get("children", [])))
+    return elements
+
+def load_seed_models(path=SEED_DATA_PATH):
+    """Return the elements of the main branch of every project in the demo seeder data by project name."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = yaml.safe_load(f) or {}
+    models = {}
+    for project in data.get("projects", []):
+        for branch in project["branches"]:
+            if branch["name"] == "main":
+                models[project["name"]] = build_model(project["name"], branch.get("elements", []))
+    return models
+
+
+_QUALIFIERS = (
+    "Main", "Backup", "Front", "Rear", "Left", "Right", "Upper", "Lower", "Inlet", "Outlet",
+    "Primary", "Secondary", "Auxiliary", "Thermal", "Hydraulic", "Electric", "Manual", "Smart",
+)
+_COMPONENTS = (
+    "Pump", "Valve", "Sensor", "Controller", "Motor", "Battery", "Display", "Filter", "Heater",
+    "Fan", "Switch", "Relay", "Actuator", "Bearing", "Gearbox", "Housing", "Bracket", "Cable",
+    "Connector", "Regulator", "Tank", "Nozzle", "Camera", "Antenna", "Fuse", "Spring", "Seal",
+)
+_SUBSYSTEMS = (
+    "Cooling", "Power", "Drive", "Steering", "Braking", "Sensing", "Navigation", "Comfort",
+    "Lighting", "Safety", "Communication", "Storage", "Dosing", "Cleaning", "Packaging",
+)
+
+def synthetic_model(model_name, size, fanout=6, seed=0):
+    """
+    Generate a model of about size elements: a root part with subsystems, each holding
+    nested parts with distinct names built from a component vocabulary.
+    """
+    rng = random.Random(seed)
+    short = [f"{q}{c}" for q in _QUALIFIERS for c in _COMPONENTS]
+    long = [f"{s}{q}{c}" for s in _SUBSYSTEMS for q in _QUALIFIERS for c in _COMPONENTS]
+    rng.shuffle(short)
+    rng.shuffle(long)
+    names = itertools.chain(short, long, (f"Part{i}" for i in itertools.count()))
+
+    root = {"name": model_name.replace(" ", ""), "type": "PartDefinition", "children": []}
+    frontier = []
+    for subsystem in _SUBSYSTEMS[:max(1, min(len(_SUBSYSTEMS), size // 20))]:
+        node = {"name": f"{subsystem}Subsystem", "type": "PartDefinition", "children": []}
+        root["children"].append(node)
+        frontier.append(node)
+
+    count = 1 + len(frontier)
+    while count < size:
+        owner = frontier[rng.randrange(len(frontier))]
+        if len(owner["children"]) >= fanout:
+            frontier.remove(owner)
+            continue
+        node = {"name": next(names), "type": rng.choice(("PartDefinition", "PartUsage")), "children": []}
+        owner["children"].append(node)
+        frontier.append(node)
+        count += 1
+    return build_model(model_name, [root])
+
+def synthetic_cases(model_name, elements, count, seed=0):
+    """Rename, delete and add-part requests on random elements, labelled with the elements they touch."""
+    rng = random.Random(seed)
+    by_id = {e["@id"]: e for e in elements}
+    candidates = [e for e in elements if e.get("owner")]
+    cases = []
+    for element in rng.sample(candidates, min(count, len(candidates))):
+        owner = by_id[element["owner"]["@id"]]
+        template = rng.randrange(3)
+        if template == 0:
+            request = f"Rename {element['name']} to {element['name']}Mk2"
+        elif template == 1:
+            request = f"Delete the {element['name']} from the {owner['name']}"
+        else:
+            request = f"Add a {rng.choice(_COMPONENTS).lower()} to {element['name']}"
+        cases.append(EvalCase(model_name, request, frozenset([element["@id"]])))
+    return cases
+
+
+def resolve(elements, name):
+    """Return the id of the element with the given qualified name, or the only element with that name."""
+    matches = [e["@id"] for e in elements if e.get("qualifiedName") == name]
+    if not matches:
+        matches = [e["@id"] for e in elements if e.get("name") == name]
+    if len(matches) != 1:
+        raise ValueError(f"{name!r} matches {len(matches)} elements")
+    return matches[0]
+
+def load_cases(models, path=CASES_PATH):
+    """Read labelled change requests (model, request, required element names) and resolve the names to ids."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = yaml.safe_load(f) or {}
+    cases = []
+    for case in data.get("cases", []):
+        elements = models[case["model"]]
+        required = frozenset(resolve(elements, name) for name in case["required"])
+        cases.append(EvalCase(case["model"], case["request"], required))
+    return cases
+
+
+def context_ids(context):
+    """Element ids in a context as built by ContextManager.create_context (JSON strings)."""
+    return {loads(entry).get("@id") for entry in context}
+
+def evaluate(retrieve, cases, count_tokens, settings_grid=SETTINGS_GRID):
+    """
+    Measure recall of the required element ids and the context size for each setting.
+
+    Args:
+        retrieve: Callable(case, settings) returning the context for the case's request.
+        count_tokens: Callable(text) returning the number of tokens of the context text.
+
+    Returns:
+        list[dict]: Per setting the mean recall, the share of cases with full recall
+            and the mean number of context tokens.
+    """
+    results = []
+    for settings in settings_grid:
+        recalls, tokens = [], []
+        for case in cases:
+            context = retrieve(case, settings)
+            found = context_ids(context) & case.required_ids
+            recalls.append(len(found) / len(case.required_ids))
+            tokens.append(count_tokens(str(context)))
+        results.append({
+            "settings": dict(settings),
+            "recall": round(sum(recalls) / len(recalls), 4),
+            "complete": round(sum(r == 1 for r in recalls) / len(recalls), 4),
+            "tokens": round(sum(tokens) / len(tokens), 1),
+        })
+    return results
+
+def pareto_front(results):
+    """Results that no other result beats in recall without using more tokens, by ascending tokens."""
+    front = []
+    for result in sorted(results, key=lambda r: (r["tokens"], -r["recall"])):
+        if not front or result["recall"] > front[-1]["recall"]:
+            front.append(result)
+    return front
+
+def choose(front, tolerance=0.02):
+    """The cheapest point of the front whose recall is within tolerance of the best recall."""
+    best = max(r["recall"] for r in front)
+    return next(r for r in front if r["recall"] >= best - tolerance)
@@ -1,48 +1,192 @@
-import json
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from itertools import repeat
 from langchain_chroma import Chroma
 from langchain_openai import OpenAIEmbeddings
 from langchain_core.documents import Document
-from src.utils.json_sanitize import sanitize
+from langchain_core.embeddings import Embeddings
+from src.context.document_composer import DocumentComposer, OwnerPaths
+from src.external import cassette
+from src.sysml2.projection import get_projection
+from src.utils.json_codec import dumps, loads
+from src.utils.tracing import bind_context, span, traced
+
+RETRIEVAL_WORKERS = int(os.environ.get("RETRIEVAL_WORKERS", "4"))
+
+# shared by all indexes, similarity searches are I/O and native code bound
+_search_pool = ThreadPoolExecutor(max_workers=RETRIEVAL_WORKERS, thread_name_prefix="retrieval")
+
+
+def element_of(doc):
+    """Return the element record stored with a document."""
+    return loads(doc.metadata["element"])
+
+
+def merge_round_robin(result_lists, amount_of_elements):
+    """Merge ranked result lists so every list contributes its best hits first, deduplicated by id."""
+    merged, seen_keys = [], set()
+    for rank in range(amount_of_elements):
+        for results in result_lists:
+            if rank >= len(results):
+                continue
+            key = results[rank].id or results[rank].metadata.get("element")
+            if key not in seen_keys:
+                seen_keys.add(key)
+                merged.append(results[rank])
+    return merged
+
+
+class TracedEmbeddings(Embeddings):
+    """
+    Times each embedding call of the wrapped model in a span, including those made by Chroma,
+    and records or replays the vectors if a cassette is active.
+    """
+
+    def __init__(self, embeddings):
+        self.embeddings = embeddings
+
+    def embed_documents(self, texts):
+        with span("embedding.documents", texts=len(texts)):
+            recorder = cassette.get_cassette()
+            if recorder is None:
+                return self.embeddings.embed_documents(texts)
+            return recorder.embed(texts, lambda: self.embeddings.embed_documents(texts))
+
+    def embed_query(self, text):
+        with span("embedding.query"):
+            recorder = cassette.get_cassette()
+            if recorder is None:
+                return self.embeddings.embed_query(text)
+            return recorder.embed([text], lambda: [self.embeddings.embed_query(text)])[0]
+
+    async def aembed_documents(self, texts):
+        if cassette.get_cassette() is not None:
+            return await asyncio.to_thread(self.embed_documents, texts)
+        with span("embedding.documents", texts=len(texts)):
+            return await self.embeddings.aembed_documents(texts)
+
+    async def aembed_query(self, text):
+        if cassette.get_cassette() is not None:
+            return await asyncio.to_thread(self.embed_query, text)
+        with span("embedding.query"):
+            return await self.embeddings.aembed_query(text)
 
 
 class VectorDB:
 
-    def __init__(self):
-        embeddings = OpenAIEmbeddings(model="text-embedding-3-large")
+    def __init__(self, collection_name="sysml_model", composer=None):
+        self.composer = composer or DocumentComposer()
+        embeddings = TracedEmbeddings(OpenAIEmbeddings(model="text-embedding-3-large"))
+        self.embeddings = embeddings
 
         self.vector_store = Chroma(
-            collection_name="sysml_model",
+            collection_name=collection_name,
             embedding_function=embeddings,
             persist_directory="./db"
         )
 
-    def add_elements(self, elements):
-        """Add the elements to the vector store, where each element is treated as a document."""
-        sanitized_elements = sanitize(elements) # store important data only, remove empty fields
+    def add_elements(self, elements, snapshot=None):
+        """
+        Add or replace the elements in the vector store, where each element is treated as a document.
+
+        The embedded text is composed from the embedding projection of each element, the
+        owner path is taken from the snapshot if given. The prompt projection of the
+        element is kept in the 'element' metadata.
+        """
         if elements:
+            embedding, prompt = get_projection("embedding"), get_projection("prompt")
+            owner_paths = OwnerPaths(snapshot) if snapshot is not None else None
             documents = []
-            for element in sanitized_elements:
+            for element in elements:
+                owner_path = owner_paths(element["@id"]) if owner_paths else ""
                 doc = Document(
-                    page_content=json.dumps(element),
+                    page_content=self.composer.compose(embedding.project(element), owner_path),
                     id=element["@id"],
-                    metadata={"owner_id": element.get("owner", {}).get("@id")}
+                    metadata={
+                        "owner_id": (element.get("owner") or {}).get("@id"),
+                        "element": dumps(prompt.project(element)),
+                    }
                 )
                 documents.append(doc)
 
-            self.vector_store.add_documents(documents=documents)
+            with span("chroma.add", documents=len(documents)):
+                self.vector_store.add_documents(documents=documents)
+
+    def remove_elements(self, element_ids):
+        """Remove the documents of the given elements from the vector store."""
+        if element_ids:
+            element_ids = list(element_ids)
+            with span("chroma.delete", documents=len(element_ids)):
+                self.vector_store.delete(ids=element_ids)
 
     def remove_all_elements(self):
-        documents = self.vector_store.get()
-        if documents["ids"]:
-            self.vector_store.delete(ids=documents["ids"])
+        with span("chroma.clear"):
+            documents = self.vector_store.get()
+            if documents["ids"]:
+                self.vector_store.delete(ids=documents["ids"])
 
     def query(self, prompt, amount_of_elements=5):
-        results = self.vector_store.similarity_search(
-            prompt,
-            k=amount_of_elements,
-        )
+        with span("chroma.query", k=amount_of_elements):
+            results = self.vector_store.similarity_search(
+                prompt,
+                k=amount_of_elements,
+            )
         return results
 
+    def embed_prompts(self, prompts):
+        """Embed the prompts of a query; several prompts are embedded in a single batch."""
+        prompts = list(prompts)
+        if len(prompts) == 1:
+            return [self.embeddings.embed_query(prompts[0])]
+        return self.embeddings.embed_documents(prompts)
+
+    async def embed_prompts_async(self, prompts):
+        """Async version of embed_prompts."""
+        prompts = list(prompts)
+        if len(prompts) == 1:
+            return [await self.embeddings.aembed_query(prompts[0])]
+        return await self.embeddings.aembed_documents(prompts)
+
+    def scored_search(self, vectors, amount_of_elements=20):
+        """
+        Run one similarity search per query vector, concurrently if there are several.
+
+        Returns:
+            list[list[tuple]]: Per vector the (document, relevance score) pairs, best first,
+                with scores in [0, 1].
+        """
+        if len(vectors) == 1:
+            return [self._scored_search(vectors[0], amount_of_elements)]
+        return list(_search_pool.map(bind_context(self._scored_search), vectors, repeat(amount_of_elements)))
+
+    def _scored_search(self, vector, amount_of_elements):
+        with span("chroma.scored_query", k=amount_of_elements):
+            results = self.vector_store.similarity_search_by_vector_with_relevance_scores(vector, k=amount_of_elements)
+        # Chroma returns distances, map them to relevance scores like similarity_search_with_relevance_scores
+        relevance = self.vector_store._select_relevance_score_fn()
+        return [(doc, relevance(distance)) for doc, distance in results]
+
+    def mmr_search(self, vectors, amount_of_elements=5, fetch_k=20):
+        """
+        Run one search per query vector concurrently and merge the hits.
+
+        Each search uses maximal marginal relevance to avoid near-duplicate hits, and the
+        result lists are merged round-robin so every vector contributes its best hits
+        first. Documents are deduplicated by id.
+        """
+        result_lists = list(_search_pool.map(
+            bind_context(self._mmr_search), vectors, repeat(amount_of_elements), repeat(fetch_k)
+        ))
+        return merge_round_robin(result_lists, amount_of_elements)
+
+    def _mmr_search(self, vector, amount_of_elements, fetch_k):
+        with span("chroma.mmr_search", k=amount_of_elements, fetch_k=fetch_k):
+            return self.vector_store.max_marginal_relevance_search_by_vector(
+                vector, k=amount_of_elements, fetch_k=fetch_k
+            )
+
+    @traced("chroma.related")
     def related_elements(self, element_id: str):
         """
         Returns a single list of dicts:
@@ -53,8 +197,8 @@ class VectorDB:
         """
         # Fetch children via metadata filter
         children_res = self.vector_store.get(where={"owner_id": element_id})
-        children_docs = children_res.get("documents") or []
-        children = [json.loads(d) for d in children_docs if d]
+        children_metadatas = children_res.get("metadatas") or []
+        children = [loads(m["element"]) for m in children_metadatas if m and m.get("element")]
 
         # Fetch the given element to get its owner_id from metadata
         given_res = self.vector_store.get(ids=[element_id])
@@ -66,9 +210,9 @@ class VectorDB:
         owner = None
         if owner_id:
             owner_res = self.vector_store.get(ids=[owner_id])
-            owner_doc = (owner_res.get("documents") or [None])[0]
-            if owner_doc:
-                owner = json.loads(owner_doc)
+            owner_metadata = (owner_res.get("metadatas") or [None])[0]
+            if owner_metadata and owner_metadata.get("element"):
+                owner = loads(owner_metadata["element"])
 
         # Combine and deduplicate by @id (safety)
         combined = children[:]
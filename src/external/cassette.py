@@ -0,0 +1,197 @@
+import base64
+import hashlib
+import logging
+import os
+import threading
+import time
+from array import array
+import requests
+from src.utils.json_codec import dumps, loads
+logger = logging.getLogger(__name__)
+
+# off: call the services; record: call them and append every interaction to the cassette;
+# replay: serve the interactions from the cassette without network access
+CASSETTE_MODE = os.environ.get("SACM_CASSETTE_MODE", "off").lower()
+CASSETTE_PATH = os.environ.get("SACM_CASSETTE_PATH", "./cassettes/cassette.jsonl")
+# In replay mode, sleep for the recorded latency times this factor (0: no delay)
+CASSETTE_LATENCY = float(os.environ.get("SACM_CASSETTE_LATENCY", "0"))
+
+MODES = ("off", "record", "replay")
+
+
+class CassetteMissError(LookupError):
+    """Raised in replay mode for an interaction that is not on the cassette."""
+
+
+def request_key(*parts):
+    """Hash of the parts of a request that have to match for a recorded response to be served."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def encode_vector(vector):
+    return base64.b64encode(array("f", vector).tobytes()).decode("ascii")
+
+def decode_vector(data):
+    return array("f", base64.b64decode(data)).tolist()
+
+
+def encode_response(response):
+    entry = {"status": response.status_code, "content_type": response.headers.get("Content-Type")}
+    if response.headers.get("Link"):
+        # next page of paged listings
+        entry["link"] = response.headers["Link"]
+    try:
+        entry["text"] = response.content.decode("utf-8")
+    except UnicodeDecodeError:
+        entry["content_b64"] = base64.b64encode(response.content).decode("ascii")
+    return entry
+
+def decode_response(entry, url):
+    response = requests.Response()
+    response.status_code = entry["status"]
+    response.url = url
+    if entry.get("content_type"):
+        response.headers["Content-Type"] = entry["content_type"]
+    if entry.get("link"):
+        response.headers["Link"] = entry["link"]
+    response.encoding = "utf-8"
+    response._content = entry["text"].encode("utf-8") if "text" in entry else base64.b64decode(entry["content_b64"])
+    return response
+
+
+class Cassette:
+    """
+    A JSON lines file of the external interactions of recorded requests.
+
+    Each line holds the kind of interaction ('rest', 'llm', 'embedding' or 'run'), the
+    key of the request, the response and the latency. During replay a request is served
+    the first unused entry with the same key, or if there is none, the first unused entry
+    of its group (e.g. a commit POST whose body holds freshly generated element ids).
+    When all entries of a key are used, the last one is served again. Embedding vectors
+    are stored per text and can be served any number of times.
+    """
+
+    def __init__(self, path, mode, latency=0.0):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode {mode!r}, expected one of {MODES}")
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self._lock = threading.Lock()
+        self._entries = {}      # key or group -> entries in recorded order
+        self._vectors = {}      # text key -> encoded vector
+        self._runs = []
+        if mode == "replay":
+            self._load()
+        else:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def _load(self):
+        with open(self.path, "rb") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = loads(line)
+                if entry["kind"] == "embedding":
+                    self._vectors[entry["key"]] = entry["vector"]
+                elif entry["kind"] == "run":
+                    self._runs.append(entry["request"])
+                else:
+                    self._entries.setdefault(entry["key"], []).append(entry)
+                    if entry.get("group"):
+                        self._entries.setdefault(entry["group"], []).append(entry)
+        logger.info("Loaded cassette %s with %d interactions", self.path, sum(len(e) for e in self._entries.values()))
+
+    def _append(self, entries):
+        lines = "".join(dumps(entry) + "\n" for entry in entries)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+    def _take(self, key, group):
+        with self._lock:
+            for index in (key, group):
+                entries = self._entries.get(index)
+                if not entries:
+                    continue
+                for entry in entries:
+                    if not entry.get("_used"):
+                        entry["_used"] = True
+                        return entry
+                if index == key:
+                    return entries[-1]
+        return None
+
+    def call(self, kind, key, call, encode, decode, group=None, request=None):
+        """
+        Record or replay one interaction.
+
+        Args:
+            call: Performs the live interaction, only invoked in record mode.
+            encode: Converts the result of call into a JSON serializable response.
+            decode: Restores the result from a recorded response.
+            group: Fallback key if no entry matches the key exactly.
+            request: Description of the request stored with the entry for debugging.
+        """
+        if self.mode == "record":
+            start = time.perf_counter()
+            result = call()
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self._append([{
+                "kind": kind,
+                "key": key,
+                "group": group,
+                "request": request,
+                "response": encode(result),
+                "elapsed_ms": round(elapsed_ms, 3),
+            }])
+            return result
+
+        entry = self._take(key, group)
+        if entry is None:
+            raise CassetteMissError(f"No recorded {kind} interaction for {request or key} in {self.path}")
+        if self.latency > 0:
+            time.sleep(entry["elapsed_ms"] * self.latency / 1000)
+        return decode(entry["response"])
+
+    def embed(self, texts, call):
+        """Record or replay the embedding vectors of a batch of texts."""
+        keys = [request_key("embedding", text) for text in texts]
+        if self.mode == "record":
+            vectors = call()
+            self._append([
+                {"kind": "embedding", "key": key, "vector": encode_vector(vector)}
+                for key, vector in zip(keys, vectors)
+            ])
+            return vectors
+
+        missing = [text for key, text in zip(keys, texts) if key not in self._vectors]
+        if missing:
+            raise CassetteMissError(f"No recorded embedding for {len(missing)} text(s), e.g. {missing[0][:80]!r}")
+        return [decode_vector(self._vectors[key]) for key in keys]
+
+    def record_run(self, **request):
+        """Store the arguments of an engine run so the run can be replayed, e.g. by a benchmark."""
+        if self.mode == "record":
+            self._append([{"kind": "run", "key": None, "request": request}])
+
+    def runs(self):
+        return list(self._runs)
+
+
+_cassette = None
+_cassette_lock = threading.Lock()
+
+def get_cassette():
+    """Return the process-wide cassette, or None if SACM_CASSETTE_MODE is off."""
+    global _cassette
+    if CASSETTE_MODE == "off":
+        return None
+    with _cassette_lock:
+        if _cassette is None:
+            _cassette = Cassette(CASSETTE_PATH, CASSETTE_MODE, CASSETTE_LATENCY)
+            logger.info("Cassette %s in %s mode", CASSETTE_PATH, CASSETTE_MODE)
+        return _cassette
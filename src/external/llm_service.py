@@ -1,42 +1,102 @@
+import asyncio
 import logging
 import os
+import threading
 from dotenv import load_dotenv
 from token_count import TokenCount
 from langchain.chat_models import init_chat_model
 from src.change.prompt import prompt_template
+from src.external import cassette
 from src.sysml2 import sysml_types
+from src.utils.logger import payload
+from src.utils.tracing import span
 logger = logging.getLogger(__name__)
 
 
 # Load environment variables from .env file
 load_dotenv()
 OPENAI_API_MODEL = os.environ.get("OPENAI_API_MODEL")
+# optional smaller model for simple requests, see src.change.router
+OPENAI_API_MODEL_FAST = os.environ.get("OPENAI_API_MODEL_FAST")
 
-# Set up model and counter
-model = init_chat_model(OPENAI_API_MODEL, model_provider="openai")
+# Model names by tier
+MODELS = {"strong": OPENAI_API_MODEL}
+if OPENAI_API_MODEL_FAST:
+    MODELS["fast"] = OPENAI_API_MODEL_FAST
+
+# Set up models and counter
+chat_models = {tier: init_chat_model(name, model_provider="openai") for tier, name in MODELS.items()}
+model = chat_models["strong"]
 tc = TokenCount(model_name=OPENAI_API_MODEL)
 
+# Bound models per tier and tool set, so the tool schemas are converted only once per process
+_bound_models = {}
+_bound_models_lock = threading.Lock()
+
 
 def create_llm_prompt(context, user_request):
     prompt = prompt_template.format(types=sysml_types.sysml_types, context=context, user_request=user_request)
     input_token = tc.num_tokens_from_string(prompt)
     return prompt, input_token
 
-def send_llm_request(context, user_request, tools):
+def count_tokens(text):
+    return tc.num_tokens_from_string(text)
+
+def bind_tools(tools, tier="strong"):
+    """Return the model of the tier bound to the given tools, binding each tool set once per process."""
+    key = (tier, *(t.name for t in tools))
+    with _bound_models_lock:
+        if key not in _bound_models:
+            _bound_models[key] = chat_models[tier].bind_tools(tools, tool_choice="any") # force the llm to use at least one tool
+        return _bound_models[key]
+
+def send_llm_request(context, user_request, tools, tier="strong"):
     # prepare request
-    model_with_tools = model.bind_tools(tools, tool_choice="any") # force the llm to use at least one tool
+    model_with_tools = bind_tools(tools, tier)
     prompt, input_token = create_llm_prompt(context, user_request)
     logger.debug("Sending LLM REST request")
-    logger.debug(f"  Context: {context}")
-    logger.debug(f"  User-Request: {user_request}")
-    logger.debug(f"  Tools: {tools}")
-    logger.debug(f"  Prompt: {prompt}")
+    logger.debug("  Context: %s", payload(context))
+    logger.debug("  User-Request: %s", payload(user_request))
+    logger.debug("  Tools: %s", payload([t.name for t in tools]))
+    logger.debug("  Model: %s", MODELS[tier])
+    logger.debug("  Prompt: %s (%d tokens)", payload(prompt), input_token)
 
     # send request
-    response = model_with_tools.invoke(prompt).tool_calls
+    with span("llm.request", model=MODELS[tier], input_tokens=input_token) as request_span:
+        recorder = cassette.get_cassette()
+        if recorder is None:
+            response = model_with_tools.invoke(prompt).tool_calls
+        else:
+            response = recorder.call(
+                "llm", cassette.request_key(MODELS[tier], prompt, *[t.name for t in tools]),
+                lambda: model_with_tools.invoke(prompt).tool_calls,
+                encode=list, decode=list, group="llm", request=user_request,
+            )
+
+        # postprocess result
+        logger.debug("  Response: %s", payload(response))
+        output_token = tc.num_tokens_from_string(str(response)) # convert dict to str
+        request_span.set(output_tokens=output_token, tool_calls=len(response))
+
+    return response, input_token, output_token
+
+async def send_llm_request_async(context, user_request, tools, tier="strong"):
+    """Async version of send_llm_request; the model call does not hold a thread while waiting."""
+    if cassette.get_cassette() is not None:
+        return await asyncio.to_thread(send_llm_request, context, user_request, tools, tier)
+
+    model_with_tools = bind_tools(tools, tier)
+    # token counting of large prompts is CPU bound
+    prompt, input_token = await asyncio.to_thread(create_llm_prompt, context, user_request)
+    logger.debug("Sending async LLM REST request")
+    logger.debug("  User-Request: %s", payload(user_request))
+    logger.debug("  Prompt: %s (%d tokens)", payload(prompt), input_token)
+
+    with span("llm.request", model=MODELS[tier], input_tokens=input_token) as request_span:
+        response = (await model_with_tools.ainvoke(prompt)).tool_calls
 
-    # postprocess result
-    logger.debug(f"  Response: {response}")
-    output_token = tc.num_tokens_from_string(str(response)) # convert dict to str
+        logger.debug("  Response: %s", payload(response))
+        output_token = tc.num_tokens_from_string(str(response)) # convert dict to str
+        request_span.set(output_tokens=output_token, tool_calls=len(response))
 
     return response, input_token, output_token
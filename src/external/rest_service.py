@@ -1,22 +1,145 @@
+import asyncio
+import gzip
 import logging
 import os
+from typing import NamedTuple
+import httpx
 import requests
+from src.external import cassette
+from src.utils.json_codec import dumpb
+from src.utils.logger import payload
+from src.utils.tracing import span
 logger = logging.getLogger(__name__)
 
 TARGET_URL = os.environ.get('SYSML_API_URL', "http://localhost:9000")
+REQUEST_TIMEOUT = float(os.environ.get('SYSML_API_TIMEOUT', "300"))
+# gzip request bodies, only for servers that accept Content-Encoding: gzip
+GZIP_REQUESTS = os.environ.get('SYSML_API_GZIP', "false").lower() in ("1", "true", "yes")
+GZIP_LEVEL = 6
+# connections of the async client, shared by all requests of the event loop
+ASYNC_MAX_CONNECTIONS = int(os.environ.get('SYSML_API_MAX_CONNECTIONS', "100"))
 
-def send_request(method, endpoint, body=None):
+# cleared when the server rejects a gzip body, later bodies are sent uncompressed
+_gzip_accepted = True
+
+
+class EncodedBody(NamedTuple):
+    data: bytes
+    compressed: bool
+
+
+def encode_body(body, compress=GZIP_REQUESTS) -> EncodedBody:
+    """Serialize a JSON body ahead of sending it, gzip-compressed if requested and accepted."""
+    data = dumpb(body)
+    if compress and _gzip_accepted:
+        return EncodedBody(gzip.compress(data, compresslevel=GZIP_LEVEL), True)
+    return EncodedBody(data, False)
+
+def send_request(method, endpoint, body=None, compress=GZIP_REQUESTS, timeout=REQUEST_TIMEOUT):
+    global _gzip_accepted
     url = f'{TARGET_URL}{endpoint}'
 
-    logger.debug(f'Sending {method} request to {url} with body: {body}')
-    response = requests.request(
-        method=method, 
-        headers={"Content-Type": "application/json"},
-        url=url, 
-        json=body
-    )
+    if body is not None and not isinstance(body, EncodedBody):
+        logger.debug('Sending %s request to %s with body: %s', method, url, payload(body))
+        body = encode_body(body, compress)
+    else:
+        logger.debug('Sending %s request to %s', method, url)
+
+    headers = {"Content-Type": "application/json"}
+    if body is not None and body.compressed:
+        headers["Content-Encoding"] = "gzip"
+    def perform():
+        return requests.request(
+            method=method,
+            headers=headers,
+            url=url,
+            data=body.data if body is not None else None,
+            timeout=timeout
+        )
+
+    with span("sysml.request", method=method, endpoint=endpoint) as request_span:
+        recorder = cassette.get_cassette()
+        if recorder is None:
+            response = perform()
+        else:
+            # match on the plain body, gzip output differs between runs
+            data = b"" if body is None else gzip.decompress(body.data) if body.compressed else body.data
+            response = recorder.call(
+                "rest", cassette.request_key(method, endpoint, data), perform,
+                encode=cassette.encode_response,
+                decode=lambda entry: cassette.decode_response(entry, url),
+                group=f"{method} {endpoint}",
+                request=f"{method} {endpoint}",
+            )
+        request_span.set(
+            status=response.status_code,
+            request_bytes=len(body.data) if body is not None else 0,
+            response_bytes=len(response.content),
+        )
+
+    if response.status_code == 415 and body is not None and body.compressed:
+        logger.warning('Server rejected gzip request body for %s, sending uncompressed', url)
+        _gzip_accepted = False
+        return send_request(method, endpoint, EncodedBody(gzip.decompress(body.data), False), timeout=timeout)
+
+    if response.status_code != 200:
+        logger.error('Request to %s failed with status code %s: %s', url, response.status_code, payload(response.text))
+
+    return response
+
+
+_async_client = None
+_async_client_loop = None
+
+def get_async_client() -> httpx.AsyncClient:
+    """Return the pooled async client of the running event loop."""
+    global _async_client, _async_client_loop
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_client_loop is not loop:
+        _async_client = httpx.AsyncClient(
+            base_url=TARGET_URL,
+            timeout=REQUEST_TIMEOUT,
+            limits=httpx.Limits(max_connections=ASYNC_MAX_CONNECTIONS),
+        )
+        _async_client_loop = loop
+    return _async_client
+
+async def send_request_async(method, endpoint, body=None, compress=GZIP_REQUESTS, timeout=REQUEST_TIMEOUT):
+    """Async version of send_request; the response has the same status_code, content and text."""
+    global _gzip_accepted
+    if cassette.get_cassette() is not None:
+        # recording and replaying is for offline profiling, it goes through the sync path
+        return await asyncio.to_thread(send_request, method, endpoint, body, compress, timeout)
+
+    if body is not None and not isinstance(body, EncodedBody):
+        logger.debug('Sending async %s request to %s with body: %s', method, endpoint, payload(body))
+        body = encode_body(body, compress)
+    else:
+        logger.debug('Sending async %s request to %s', method, endpoint)
+
+    headers = {"Content-Type": "application/json"}
+    if body is not None and body.compressed:
+        headers["Content-Encoding"] = "gzip"
+    with span("sysml.request", method=method, endpoint=endpoint) as request_span:
+        response = await get_async_client().request(
+            method,
+            endpoint,
+            headers=headers,
+            content=body.data if body is not None else None,
+            timeout=timeout
+        )
+        request_span.set(
+            status=response.status_code,
+            request_bytes=len(body.data) if body is not None else 0,
+            response_bytes=len(response.content),
+        )
+
+    if response.status_code == 415 and body is not None and body.compressed:
+        logger.warning('Server rejected gzip request body for %s, sending uncompressed', endpoint)
+        _gzip_accepted = False
+        return await send_request_async(method, endpoint, EncodedBody(gzip.decompress(body.data), False), timeout=timeout)
 
     if response.status_code != 200:
-        logger.error(f'Request to {url} failed with status code {response.status_code}: {response.text}')
+        logger.error('Request to %s failed with status code %s: %s', endpoint, response.status_code, payload(response.text))
 
     return response
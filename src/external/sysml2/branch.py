@@ -1,4 +1,5 @@
-from src.external.rest_service import send_request
+from src.external.rest_service import send_request, send_request_async
+from src.utils.json_codec import loads
 
 
 def get_project_branches(project_id):
@@ -6,7 +7,7 @@ def get_project_branches(project_id):
     response = send_request("GET", branches_get_url)
 
     if response.status_code == 200:
-        branches = response.json()
+        branches = loads(response.content)
         return branches
     else:
         print("Problem in fetching branches")
@@ -16,8 +17,18 @@ def get_project_branch(project_id, branch_id):
     response = send_request("GET", branch_get_url)
 
     if response.status_code == 200:
-        branch = response.json()
+        branch = loads(response.content)
+        return branch
+    else:
+        print("Problem in fetching branches")
+        
+
+async def get_project_branch_async(project_id, branch_id):
+    branch_get_url = f"/projects/{project_id}/branches/{branch_id}"
+    response = await send_request_async("GET", branch_get_url)
+
+    if response.status_code == 200:
+        branch = loads(response.content)
         return branch
     else:
         print("Problem in fetching branches")
-        
\ No newline at end of file
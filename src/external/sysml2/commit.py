@@ -1,20 +1,31 @@
 import logging
-from src.external.rest_service import send_request
+from src.external.rest_service import GZIP_REQUESTS, EncodedBody, encode_body, send_request
+from src.utils.json_codec import loads
+from src.utils.tracing import traced
 logger = logging.getLogger(__name__)
 
-def push_commit(project_id, change):
-    commit_post_url = f"/projects/{project_id}/commits"
+def encode_commit(change, compress=GZIP_REQUESTS) -> EncodedBody:
+    """Encode the body of a commit ahead of pushing it, e.g. on a worker thread."""
     commit_body = {
         "@type": "Commit",
         "change": change
     }
-    logger.debug(f"Creating commit {commit_body}")
+    return encode_body(commit_body, compress)
+
+@traced("sysml.push_commit")
+def push_commit(project_id, change, branch_id=None):
+    """Push a list of DataVersions, or a body from encode_commit, as one commit."""
+    commit_post_url = f"/projects/{project_id}/commits"
+    if branch_id:
+        commit_post_url += f"?branchId={branch_id}"
+    commit_body = change if isinstance(change, EncodedBody) else encode_commit(change)
+    logger.debug("Creating commit with %d bytes body", len(commit_body.data))
     response = send_request("POST", commit_post_url, commit_body)
-    
+
     if response.status_code == 200:
-        commit_response_json = response.json()
+        commit_response_json = loads(response.content)
         return commit_response_json.get('@id')
     else:
-        print(f"Problem in creating commit {change} for project {project_id}")
+        print(f"Problem in creating commit for project {project_id}")
         print(response)
         return None
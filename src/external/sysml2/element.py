@@ -1,4 +1,9 @@
-from src.external.rest_service import send_request
+import os
+from urllib.parse import urlsplit
+from src.external.rest_service import TARGET_URL, send_request, send_request_async
+from src.utils.json_codec import loads
+
+ELEMENT_PAGE_SIZE = int(os.environ.get("SYSML_API_PAGE_SIZE", "1000"))
 
 
 def get_project_elements(project_id, commit_id):
@@ -6,21 +11,64 @@ def get_project_elements(project_id, commit_id):
     response = send_request("GET", elements_get_url)
     
     if response.status_code == 200:
-        elements_response_json = response.json()
+        elements_response_json = loads(response.content)
         return elements_response_json
     else:
         print(f"Problem in fetching elements for project {project_id} with commit {commit_id}")
         print(response)
         return None
     
+def iter_project_elements(project_id, commit_id, page_size=ELEMENT_PAGE_SIZE):
+    """
+    Return an iterator over the elements of a commit that fetches them page by page,
+    following the 'next' links of the responses, or None if the first page fails.
+    """
+    elements_get_url = f"/projects/{project_id}/commits/{commit_id}/elements?page[size]={page_size}"
+    response = send_request("GET", elements_get_url)
+
+    if response.status_code != 200:
+        print(f"Problem in fetching elements for project {project_id} with commit {commit_id}")
+        print(response)
+        return None
+    return _iter_pages(response)
+
+def _iter_pages(response):
+    while True:
+        yield from loads(response.content)
+        next_url = response.links.get("next", {}).get("url")
+        if not next_url:
+            return
+        response = send_request("GET", _endpoint_of(next_url))
+        if response.status_code != 200:
+            raise RuntimeError(f"Failed to fetch page {next_url} of elements")
+
+def _endpoint_of(url):
+    """Return a link of the SysML API relative to TARGET_URL, as send_request expects it."""
+    if url.startswith(TARGET_URL):
+        return url[len(TARGET_URL):]
+    parts = urlsplit(url)
+    return f"{parts.path}?{parts.query}" if parts.query else parts.path
+
 def get_project_element(project_id, commit_id, element_id):
     element_get_url = f"/projects/{project_id}/commits/{commit_id}/elements/{element_id}"
     response = send_request("GET", element_get_url)
     
     if response.status_code == 200:
-        elements_response_json = response.json()
+        elements_response_json = loads(response.content)
         return elements_response_json
     else:
         print(f"Problem in fetching elements for project {project_id} with commit {commit_id}")
         print(response)
-        return None
\ No newline at end of file
+        return None
+
+async def get_project_elements_async(project_id, commit_id):
+    elements_get_url = f"/projects/{project_id}/commits/{commit_id}/elements"
+    response = await send_request_async("GET", elements_get_url)
+
+    if response.status_code == 200:
+        elements_response_json = loads(response.content)
+        return elements_response_json
+    else:
+        print(f"Problem in fetching elements for project {project_id} with commit {commit_id}")
+        print(response)
+        return None
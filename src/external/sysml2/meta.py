@@ -1,4 +1,5 @@
 from src.external.rest_service import send_request
+from src.utils.json_codec import loads
 
 
 def get_datatypes():
@@ -6,7 +7,7 @@ def get_datatypes():
     response = send_request("GET", meta_datatype_get_url)
 
     if response.status_code == 200:
-        commit_response_json = response.json()
+        commit_response_json = loads(response.content)
         return commit_response_json
     else:
         print(f"Problem in fetching meta datatypes")
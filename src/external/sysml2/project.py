@@ -1,12 +1,13 @@
 import pprint
-from src.external.rest_service import send_request
+from src.external.rest_service import send_request, send_request_async
+from src.utils.json_codec import loads
 
 
 def get_all_projects():
     response = send_request("GET", "/projects")
 
     if response.status_code == 200:
-        projects = response.json()
+        projects = loads(response.content)
         return projects
     else:
         pprint("Problem in fetching projects")
@@ -16,7 +17,7 @@ def get_project(project_id):
     response = send_request("GET", project_get_url)
 
     if response.status_code == 200:
-        project = response.json()
+        project = loads(response.content)
         return project
     else:
         print("Problem in fetching project")
@@ -31,7 +32,17 @@ def create_project(project_name, project_description):
     response = send_request("POST", "/projects", project_data)
 
     if response.status_code == 200:
-        project = response.json()
+        project = loads(response.content)
         return project
     else:
-        print("Problem in creating the project")
\ No newline at end of file
+        print("Problem in creating the project")
+
+async def get_project_async(project_id):
+    project_get_url = f"/projects/{project_id}"
+    response = await send_request_async("GET", project_get_url)
+
+    if response.status_code == 200:
+        project = loads(response.content)
+        return project
+    else:
+        print("Problem in fetching project")
@@ -0,0 +1,84 @@
+import logging
+from src.sysml2.snapshot import ModelSnapshot, owner_of
+logger = logging.getLogger(__name__)
+
+
+def _data_version(element_id, payload):
+    return {"@type": "DataVersion", "payload": payload, "identity": {"@id": element_id}}
+
+
+def _is_noop(payload, element):
+    return element is not None and all(element.get(k) == v for k, v in payload.items())
+
+
+def _depth(snapshot: ModelSnapshot, element_id):
+    depth, seen = 0, {element_id}
+    while (element_id := snapshot.owner_id(element_id)) is not None and element_id not in seen:
+        seen.add(element_id)
+        depth += 1
+    return depth
+
+
+def optimize_change(change, snapshot: ModelSnapshot):
+    """
+    Collapse a list of staged DataVersions into an equivalent, smaller change set.
+
+    Operations on the same identity are folded: updates are merged, a create followed
+    by a delete cancels out, repeated deletes and deletes of elements that do not
+    exist are dropped, and updates that match the snapshot are removed. The result is
+    ordered by ownership: deletes of elements that are created again, creates with
+    owners before owned elements, updates, then deletes with owned elements before
+    their owners.
+
+    Args:
+        change: Staged DataVersions, applied in order.
+        snapshot: Snapshot of the commit the change is based on.
+
+    Returns:
+        list: The optimized DataVersions; applying them to the snapshot gives the same model.
+    """
+    # element id -> (deleted the element of the snapshot, payload to write or None)
+    folded = {}
+    for data_version in change:
+        element_id = (data_version.get("identity") or {}).get("@id")
+        payload = data_version.get("payload")
+        if not element_id:
+            raise ValueError("Cannot optimize a DataVersion without identity.")
+
+        deleted, current = folded.get(element_id, (False, None))
+        if payload is None:
+            folded[element_id] = (deleted or element_id in snapshot, None)
+        elif current is not None:
+            folded[element_id] = (deleted, {**current, **payload})
+        else:
+            folded[element_id] = (deleted, dict(payload))
+
+    replaced, creates, updates, deletes = [], {}, [], []
+    for element_id, (deleted, payload) in folded.items():
+        deleted = deleted and element_id in snapshot
+        if payload is None:
+            if deleted:
+                deletes.append(element_id)
+        elif element_id in snapshot and not deleted:
+            if not _is_noop(payload, snapshot.get(element_id)):
+                updates.append(_data_version(element_id, payload))
+        else:
+            # a new element, or an existing one deleted and created again with the same id
+            if deleted:
+                replaced.append(_data_version(element_id, None))
+            creates[element_id] = payload
+
+    # creates: owners before owned elements, otherwise in staging order
+    ordered, visited = [], set()
+    for element_id in creates:
+        pending = []
+        while element_id in creates and element_id not in visited:
+            visited.add(element_id)
+            pending.append(_data_version(element_id, creates[element_id]))
+            element_id = owner_of(creates[element_id])
+        ordered.extend(reversed(pending))
+
+    deletes.sort(key=lambda element_id: _depth(snapshot, element_id), reverse=True)
+    optimized = replaced + ordered + updates + [_data_version(element_id, None) for element_id in deletes]
+    logger.debug("Optimized change set from %d to %d operations", len(change), len(optimized))
+    return optimized
@@ -0,0 +1,288 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+from src.external.sysml2.branch import get_project_branch
+from src.sysml2.commit_upload import PartialUploadError, upload_change
+from src.sysml2.snapshot import apply_commit
+logger = logging.getLogger(__name__)
+
+COALESCE_WINDOW_SECONDS = float(os.environ.get("COMMIT_COALESCE_WINDOW", "0.05"))
+HISTORY_SIZE = 64
+
+
+class CommitConflictError(Exception):
+    """Raised when staged changes touch elements changed since their base commit."""
+
+
+def change_footprint(change):
+    """Return the element ids written and referenced (as owner) by a list of DataVersions."""
+    written, referenced = set(), set()
+    for data_version in change:
+        identity = data_version.get("identity") or {}
+        if identity.get("@id"):
+            written.add(identity["@id"])
+        owner = (data_version.get("payload") or {}).get("owner")
+        if isinstance(owner, dict) and owner.get("@id"):
+            referenced.add(owner["@id"])
+    return written, referenced
+
+
+_commit_listeners = []
+
+def add_commit_listener(listener):
+    """
+    Register a callable(project_id, base_commit_id, commit_id, delta) that is invoked
+    after each pushed commit. delta holds the created, updated and deleted element
+    records, or is None if the cached snapshot could not be advanced.
+    """
+    _commit_listeners.append(listener)
+
+
+def _overlaps(written, referenced, other_written, other_referenced):
+    return bool(written & (other_written | other_referenced) or referenced & other_written)
+
+
+class CommitResult(NamedTuple):
+    """
+    The commit holding a submitted change. parent_commit_id is the HEAD the commit
+    was pushed on, coalesced is set if the commit also holds changes of other requests.
+    """
+    commit_id: str
+    parent_commit_id: str
+    coalesced: bool
+
+
+class _Ticket:
+
+    def __init__(self, base_commit_id, change, progress=None, write_through=True, future=None):
+        self.base_commit_id = base_commit_id
+        self.change = change
+        self.progress = progress
+        self.write_through = write_through
+        self.written, self.referenced = change_footprint(change)
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+        # set for async submitters, resolved on their event loop
+        self.future = future
+
+    def resolve(self, result=None, error=None):
+        self.result = result
+        self.error = error
+        self.done.set()
+        if self.future is not None:
+            self.future.get_loop().call_soon_threadsafe(self._resolve_future)
+
+    def _resolve_future(self):
+        if self.future.done():
+            return
+        if self.error:
+            self.future.set_exception(self.error)
+        else:
+            self.future.set_result(self.result)
+
+
+class CommitQueue:
+    """
+    Serializes and coalesces commits on a single branch.
+
+    Commits are pushed by one worker thread per queue. Requests that are submitted
+    within the coalescing window are merged into one commit. Pushed commits are
+    written through to the snapshot cache and the listeners on a second thread, in
+    commit order, so slow listeners do not hold back the next batch.
+    Each request carries the commit its changes were planned on; it is only
+    accepted if every commit since then (known from this queue's own history)
+    left its elements untouched, and if it does not overlap with a request
+    accepted earlier in the same batch. Rejected requests get a
+    CommitConflictError and are expected to re-plan on the new HEAD.
+    """
+
+    def __init__(self, project_id, branch_id, window=COALESCE_WINDOW_SECONDS):
+        self.project_id = project_id
+        self.branch_id = branch_id
+        self.window = window
+        self._lock = threading.Lock()
+        self._pending = []
+        self._wakeup = threading.Condition(self._lock)
+        self._worker = None
+        self._write_through_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"write-through-{branch_id}")
+        # commit id -> (previous commit id, written ids, referenced ids)
+        self._history = OrderedDict()
+
+    def submit(self, base_commit_id, change, progress=None, write_through=True):
+        """Queue staged changes and block until they are committed; returns the new commit id."""
+        return self.submit_change(base_commit_id, change, progress, write_through).commit_id
+
+    def submit_change(self, base_commit_id, change, progress=None, write_through=True) -> CommitResult:
+        """
+        Queue staged changes and block until they are committed.
+
+        Large change sets are pushed in chunks, progress(done_operations, total_operations,
+        commit_id) is invoked after each one. Operation counts cover the whole coalesced batch.
+        With write_through disabled, e.g. for the chunks of a bulk import, the commit is not
+        applied to the cached snapshot and the listeners are not notified, unless it is
+        coalesced with a request that needs it.
+
+        Returns:
+            CommitResult: The new commit, the HEAD it was pushed on and whether it is shared
+                with other requests. An empty change returns the base commit unchanged.
+        """
+        if not change:
+            return CommitResult(base_commit_id, base_commit_id, False)
+
+        ticket = _Ticket(base_commit_id, change, progress, write_through)
+        self._enqueue(ticket)
+        ticket.done.wait()
+        if ticket.error:
+            raise ticket.error
+        return ticket.result
+
+    async def submit_change_async(self, base_commit_id, change, progress=None, write_through=True) -> CommitResult:
+        """Async version of submit_change; waits for the commit on the event loop instead of a thread."""
+        if not change:
+            return CommitResult(base_commit_id, base_commit_id, False)
+
+        ticket = _Ticket(base_commit_id, change, progress, write_through, asyncio.get_running_loop().create_future())
+        self._enqueue(ticket)
+        return await ticket.future
+
+    def _enqueue(self, ticket):
+        with self._lock:
+            self._pending.append(ticket)
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._run, name=f"commit-queue-{self.branch_id}", daemon=True
+                )
+                self._worker.start()
+            self._wakeup.notify()
+
+    def _run(self):
+        """Worker loop: wait for a request, collect the requests of one window and push them."""
+        while True:
+            with self._lock:
+                while not self._pending:
+                    self._wakeup.wait()
+            time.sleep(self.window)
+            with self._lock:
+                batch, self._pending = self._pending, []
+            try:
+                pushed = self._flush(batch)
+            except Exception as e:
+                logger.exception("Failed to flush commit queue for branch %s", self.branch_id)
+                for ticket in batch:
+                    if not ticket.done.is_set():
+                        ticket.resolve(error=e)
+                continue
+            # the requests already returned, cache and index updates must not hold back the next batch
+            if pushed is not None:
+                self._write_through_executor.submit(self._write_through, *pushed)
+
+    def _flush(self, batch):
+        """
+        Check and push a batch and resolve its tickets.
+
+        Returns:
+            tuple | None: (HEAD before the push, new commit id, pushed change set) to write
+                through, or None if nothing was pushed or no request needs the write-through.
+        """
+        head = self._fetch_head()
+        accepted = []
+        written, referenced = set(), set()
+
+        for ticket in batch:
+            reason = self._conflict_reason(ticket, head)
+            if reason is None and _overlaps(ticket.written, ticket.referenced, written, referenced):
+                reason = "overlaps with a concurrent change"
+            if reason:
+                logger.info("Rejecting staged change based on %s: %s", ticket.base_commit_id, reason)
+                ticket.resolve(error=CommitConflictError(reason))
+                continue
+            accepted.append(ticket)
+            written |= ticket.written
+            referenced |= ticket.referenced
+
+        if not accepted:
+            return None
+
+        merged = [data_version for ticket in accepted for data_version in ticket.change]
+        logger.info("Pushing %d coalesced change(s) with %d operations on HEAD(%s)", len(accepted), len(merged), head)
+
+        def progress(done, total, commit_id):
+            logger.debug("Pushed %d/%d operations on branch %s", done, total, self.branch_id)
+            for ticket in accepted:
+                if ticket.progress is not None:
+                    ticket.progress(done, total, commit_id)
+
+        try:
+            commit_ids = upload_change(self.project_id, self.branch_id, merged, progress=progress)
+        except PartialUploadError as e:
+            # chunks that made it moved HEAD, later requests must see them as touched
+            self._record(head, e.commit_ids, written, referenced)
+            raise
+        if not commit_ids:
+            raise RuntimeError(f"Failed to push commit on branch {self.branch_id}")
+        self._record(head, commit_ids, written, referenced)
+        commit_id = commit_ids[-1]
+
+        result = CommitResult(commit_id, head, len(accepted) > 1)
+        for ticket in accepted:
+            ticket.resolve(result)
+        if not any(ticket.write_through for ticket in accepted):
+            return None
+        return head, commit_id, merged
+
+    def _record(self, head, commit_ids, written, referenced):
+        """Add the pushed commits, one per chunk, to the history with the batch footprint."""
+        previous = head
+        for commit_id in commit_ids:
+            self._history[commit_id] = (previous, written, referenced)
+            previous = commit_id
+        while len(self._history) > HISTORY_SIZE:
+            self._history.popitem(last=False)
+
+    def _write_through(self, base_commit_id, commit_id, change):
+        """Apply the pushed change set to the cached snapshot and notify the listeners."""
+        try:
+            delta = apply_commit(self.project_id, base_commit_id, commit_id, change)
+            for listener in _commit_listeners:
+                listener(self.project_id, base_commit_id, commit_id, delta)
+        except Exception:
+            logger.exception("Write-through of commit %s failed", commit_id)
+
+    def _conflict_reason(self, ticket, head):
+        """Walk back from HEAD to the ticket's base commit and check every commit in between."""
+        commit_id = head
+        for _ in range(HISTORY_SIZE):
+            if commit_id == ticket.base_commit_id:
+                return None
+            entry = self._history.get(commit_id)
+            if entry is None:
+                return f"HEAD moved to {head} by an unknown commit"
+            previous, written, referenced = entry
+            if _overlaps(ticket.written, ticket.referenced, written, referenced):
+                return f"elements were changed by commit {commit_id}"
+            commit_id = previous
+        return f"base commit {ticket.base_commit_id} is too old"
+
+    def _fetch_head(self):
+        branch = get_project_branch(self.project_id, self.branch_id)
+        if branch is None:
+            raise RuntimeError(f"Branch {self.branch_id} not found")
+        return (branch.get("head") or {}).get("@id")
+
+
+_queues: dict[tuple[str, str], CommitQueue] = {}
+_queues_lock = threading.Lock()
+
+def get_commit_queue(project_id, branch_id) -> CommitQueue:
+    """Return the process-wide commit queue for a branch."""
+    with _queues_lock:
+        key = (project_id, branch_id)
+        if key not in _queues:
+            _queues[key] = CommitQueue(project_id, branch_id)
+        return _queues[key]
@@ -0,0 +1,105 @@
+import logging
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from src.external.sysml2.commit import encode_commit, push_commit
+from src.sysml2.snapshot import owner_of
+logger = logging.getLogger(__name__)
+
+CHUNK_OPERATIONS = int(os.environ.get("COMMIT_CHUNK_OPERATIONS", "5000"))
+ENCODE_WORKERS = int(os.environ.get("COMMIT_ENCODE_WORKERS", "2"))
+
+
+class PartialUploadError(RuntimeError):
+    """Raised when a chunk fails after earlier chunks were committed; commit_ids lists those."""
+
+    def __init__(self, message, commit_ids):
+        super().__init__(message)
+        self.commit_ids = commit_ids
+
+
+def order_by_ownership(change):
+    """
+    Move DataVersions behind the DataVersion that creates their owner, keeping the order otherwise.
+
+    Already ordered change sets, like those of the change optimizer or the file
+    importer, are returned unchanged.
+    """
+    # elements that are written by a DataVersion not emitted yet
+    unwritten = {dv["identity"]["@id"] for dv in change if dv.get("payload") is not None}
+    ordered, deferred = [], {}     # owner id -> DataVersions waiting for it
+
+    def emit(data_version):
+        stack = [data_version]
+        while stack:
+            data_version = stack.pop()
+            ordered.append(data_version)
+            if data_version.get("payload") is not None:
+                element_id = data_version["identity"]["@id"]
+                unwritten.discard(element_id)
+                stack.extend(reversed(deferred.pop(element_id, [])))
+
+    for data_version in change:
+        owner_id = owner_of(data_version.get("payload") or {})
+        if owner_id in unwritten and owner_id != data_version["identity"]["@id"]:
+            deferred.setdefault(owner_id, []).append(data_version)
+        else:
+            emit(data_version)
+    for waiting in deferred.values():
+        ordered.extend(waiting)
+    return ordered
+
+def split_change(change, max_operations=CHUNK_OPERATIONS):
+    """Split a change set into ordered chunks; owners are created in the same or an earlier chunk."""
+    ordered = order_by_ownership(change)
+    return [ordered[i:i + max_operations] for i in range(0, len(ordered), max(1, max_operations))]
+
+def upload_change(project_id, branch_id, change, max_operations=None, progress=None):
+    """
+    Push a change set as one commit, or as a chain of commits if it has more than max_operations.
+
+    Chunk bodies are encoded (and gzip-compressed if enabled) on up to ENCODE_WORKERS
+    threads ahead of the upload, while the chunks are pushed one after the other since
+    each commit builds on the previous one.
+
+    Args:
+        max_operations: Operations per commit, defaults to COMMIT_CHUNK_OPERATIONS.
+        progress: Optional callable(done_operations, total_operations, commit_id),
+            invoked after each pushed chunk.
+
+    Returns:
+        list: The commit ids in order; the last one is the new HEAD.
+
+    Raises:
+        PartialUploadError: If a chunk could not be pushed.
+    """
+    chunks = split_change(change, max_operations or CHUNK_OPERATIONS)
+    if len(chunks) > 1:
+        logger.info("Uploading %d operations in %d chunks", len(change), len(chunks))
+
+    commit_ids, done = [], 0
+    with ThreadPoolExecutor(max_workers=ENCODE_WORKERS, thread_name_prefix="commit-encode") as pool:
+        def encode(chunk):
+            return len(chunk), pool.submit(encode_commit, chunk)
+
+        # bounded read-ahead keeps at most ENCODE_WORKERS + 1 encoded bodies in memory
+        remaining = iter(chunks)
+        encoding = deque(encode(chunk) for chunk in islice(remaining, ENCODE_WORKERS + 1))
+        while encoding:
+            size, body = encoding.popleft()
+            next_chunk = next(remaining, None)
+            if next_chunk is not None:
+                encoding.append(encode(next_chunk))
+
+            commit_id = push_commit(project_id, body.result(), branch_id)
+            if commit_id is None:
+                for _, pending in encoding:
+                    pending.cancel()
+                raise PartialUploadError(
+                    f"Failed to push chunk {len(commit_ids) + 1} of {len(chunks)} on branch {branch_id}", commit_ids)
+            commit_ids.append(commit_id)
+            done += size
+            if progress is not None:
+                progress(done, len(change), commit_id)
+    return commit_ids
@@ -1,5 +1,6 @@
 from typing import Callable
 from src.sysml2.sysml_client import SysMLClient
+from src.sysml2.selector import render_attrs
 
 
 class BaseHandler:
@@ -10,8 +11,22 @@ class BaseHandler:
     def update(self, client: SysMLClient, element_id: str, **attrs) -> None:
         raise NotImplementedError
     
-    def delete(self, client: SysMLClient, element_id: str) -> None:
+    def delete(self, client: SysMLClient, element_id: str, sysml_type: str | None = None) -> None:
         raise NotImplementedError
+
+    def create_many(self, client: SysMLClient, items: list[dict]) -> None:
+        """Create one element per attribute dict."""
+        for attrs in items:
+            self.create(client, **attrs)
+
+    def update_many(self, client: SysMLClient, element_ids: list[str], **attrs) -> None:
+        """Apply the same attributes to several elements; {name} and {id} refer to each element."""
+        for element_id in element_ids:
+            self.update(client, element_id, **render_attrs(attrs, client.snapshot.get(element_id)))
+
+    def delete_many(self, client: SysMLClient, element_ids: list[str], sysml_type: str | None = None) -> None:
+        for element_id in element_ids:
+            self.delete(client, element_id, sysml_type)
     
 TYPE_HANDLERS: dict[str, BaseHandler] = {}
 
@@ -14,6 +14,7 @@ class GenericHandler(BaseHandler):
         if not sysml_type:
             raise ValueError("Missing '@type' for generic create.")
 
+        client.validator.check_create(attrs)
         client.create(**attrs)
 
     def update(self, client: SysMLClient, element_id: str, **attrs) -> None:
@@ -24,10 +25,12 @@ class GenericHandler(BaseHandler):
         if not sysml_type:
             raise ValueError("Missing '@type' for generic update.")
         
+        client.validator.check_update(element_id, attrs)
         client.update(element_id, **attrs)
 
-    def delete(self, client: SysMLClient, element_id: str) -> None:
-        """Generic delete operation"""
+    def delete(self, client: SysMLClient, element_id: str, sysml_type: str | None = None) -> None:
+        """Generic delete operation, checks the element type if one is given"""
         logger.debug(f"Call delete of GenericHandler.")
         
+        client.validator.check_delete(element_id, sysml_type or getattr(self, "sysml_type", None))
         client.delete(element_id)
\ No newline at end of file
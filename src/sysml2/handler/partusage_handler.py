@@ -15,4 +15,5 @@ class PartDefinitionHandler(GenericHandler):
         if not sysml_type:
             raise ValueError("Missing '@type' for partusage create.")
 
+        client.validator.check_create(attrs)
         client.create(**attrs)
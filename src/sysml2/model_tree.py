@@ -0,0 +1,46 @@
+from src.sysml2.projection import CONSUMER_FIELDS, Projection
+from src.sysml2.snapshot import load_snapshot
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# the tree only shows identity and name fields, which every type declares, so it needs no schema
+_ui_projection = Projection(CONSUMER_FIELDS["ui"])
+
+
+def tree_node(snapshot, element):
+    """Compact record of an element for tree views."""
+    return {
+        **_ui_projection.project(element),
+        "child_count": snapshot.child_count(element["@id"]),
+    }
+
+
+def children_page(project_id, commit_id, parent_id=None, offset=0, limit=DEFAULT_PAGE_SIZE):
+    """
+    Return one page of the elements directly owned by parent_id in a commit.
+
+    The roots are returned if no parent is given. Pages are served from the cached
+    ownership index of the commit's snapshot, so the full model is only fetched
+    once per commit.
+
+    Raises:
+        ValueError: If offset or limit are out of range.
+        LookupError: If the commit or the parent element does not exist.
+    """
+    if offset < 0 or not 0 < limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"Invalid page: offset must be >= 0 and limit between 1 and {MAX_PAGE_SIZE}.")
+
+    snapshot = load_snapshot(project_id, commit_id)
+    if parent_id is not None and parent_id not in snapshot:
+        raise LookupError(f"Element {parent_id} not found in commit {commit_id}")
+
+    children = snapshot.children(parent_id)
+    return {
+        "commit_id": commit_id,
+        "parent": parent_id,
+        "offset": offset,
+        "limit": limit,
+        "total": len(children),
+        "items": [tree_node(snapshot, child) for child in children[offset:offset + limit]],
+    }
@@ -0,0 +1,78 @@
+import logging
+import threading
+from src.sysml2.validation import get_schema_validator
+logger = logging.getLogger(__name__)
+
+EMPTY_VALUES = [None, "", [], {}, ()]
+IDENTITY_FIELDS = ("@id", "@type")
+CORE_FIELDS = IDENTITY_FIELDS + ("name", "declaredName", "declaredShortName", "owner")
+
+# Fields each consumer needs; derived fields like ownedRelationship, elementId or
+# qualifiedName are left out. Per type, only fields declared in /meta/datatypes are kept.
+CONSUMER_FIELDS = {
+    "embedding": CORE_FIELDS + ("isAbstract", "isVariation", "isReference", "direction", "body", "value"),
+    "prompt": CORE_FIELDS + (
+        "isAbstract", "isVariation", "isReference", "isComposite", "direction", "body", "language",
+        "value", "definition", "source", "target", "multiplicity",
+    ),
+    "ui": IDENTITY_FIELDS + ("name", "declaredName"),
+}
+# Additional fields per consumer and @type
+TYPE_FIELDS = {
+    "prompt": {
+        "ConnectionUsage": ("connectionDefinition", "connectorEnd"),
+        "FeatureTyping": ("type", "typedFeature"),
+        "Subclassification": ("superclassifier", "subclassifier"),
+    },
+}
+
+
+class Projection:
+    """
+    Extracts the fields one consumer needs from element records in a single pass.
+
+    The field list of each @type is compiled on first use from the consumer's allowlist
+    and, if properties is given, restricted to the properties the type declares.
+    Empty values are dropped.
+    """
+
+    def __init__(self, fields, type_fields=None, properties=None):
+        self.fields = tuple(fields)
+        self.type_fields = type_fields or {}
+        self._properties = properties   # callable(@type) -> declared property names, or None if unknown
+        self._compiled = {}
+
+    def fields_for(self, sysml_type):
+        fields = self._compiled.get(sysml_type)
+        if fields is None:
+            allowed = self.fields + tuple(self.type_fields.get(sysml_type, ()))
+            declared = self._properties(sysml_type) if self._properties and sysml_type else None
+            if declared is not None:
+                allowed = tuple(f for f in allowed if f in declared or f in IDENTITY_FIELDS)
+            fields = self._compiled[sysml_type] = tuple(dict.fromkeys(allowed))
+        return fields
+
+    def project(self, element):
+        return {
+            field: element[field]
+            for field in self.fields_for(element.get("@type"))
+            if field in element and element[field] not in EMPTY_VALUES
+        }
+
+    def project_many(self, elements):
+        return [self.project(element) for element in elements]
+
+
+_projections: dict[str, Projection] = {}
+_projections_lock = threading.Lock()
+
+def get_projection(consumer) -> Projection:
+    """Return the process-wide projection for 'embedding', 'prompt' or 'ui', compiled against /meta/datatypes."""
+    with _projections_lock:
+        if consumer not in _projections:
+            _projections[consumer] = Projection(
+                CONSUMER_FIELDS[consumer],
+                TYPE_FIELDS.get(consumer),
+                get_schema_validator().properties,
+            )
+        return _projections[consumer]
@@ -0,0 +1,90 @@
+import fnmatch
+import logging
+import os
+from src.sysml2.snapshot import ModelSnapshot
+from src.sysml2.validation import ChangeValidationError
+logger = logging.getLogger(__name__)
+
+# Upper bound for one bulk operation, so a too broad selector cannot wipe the model
+MAX_SELECTION = int(os.environ.get("BULK_MAX_ELEMENTS", "500"))
+
+SELECTOR_KEYS = ("ids", "subtree", "type", "name")
+
+
+def element_name(element):
+    return element.get("declaredName") or element.get("name")
+
+
+def _subtree(snapshot: ModelSnapshot, root_id):
+    """Yield an element and everything it owns, owners before owned elements."""
+    stack = [snapshot.get(root_id)]
+    while stack:
+        element = stack.pop()
+        yield element
+        stack.extend(reversed(snapshot.children(element["@id"])))
+
+
+def select(snapshot: ModelSnapshot, selector, max_selection=MAX_SELECTION):
+    """
+    Expand a selector into the matching element records of a snapshot.
+
+    A selector is a dict with either 'ids' (list of element ids) or 'subtree' (id of an
+    element, which is selected with everything it owns), optionally narrowed by 'type'
+    (exact @type) and 'name' (case-insensitive glob such as '*Sensor*'). Without ids or
+    subtree, 'type' and 'name' filter the whole model.
+
+    Returns:
+        list: Element records, owners before owned elements.
+
+    Raises:
+        ChangeValidationError: If the selector is malformed, references unknown elements,
+            matches nothing or more than max_selection elements.
+    """
+    if not isinstance(selector, dict) or not any(selector.get(k) for k in SELECTOR_KEYS):
+        raise ChangeValidationError(f"Selector needs one of {', '.join(SELECTOR_KEYS)}, got {selector!r}.")
+    unknown_keys = set(selector) - set(SELECTOR_KEYS)
+    if unknown_keys:
+        raise ChangeValidationError(f"Unknown selector keys: {', '.join(sorted(unknown_keys))}.")
+    if selector.get("ids") and selector.get("subtree"):
+        raise ChangeValidationError("Selector can have either ids or subtree, not both.")
+
+    if selector.get("ids"):
+        missing = [i for i in selector["ids"] if i not in snapshot]
+        if missing:
+            raise ChangeValidationError(f"Selected elements do not exist: {', '.join(missing)}.")
+        candidates = [snapshot.get(i) for i in dict.fromkeys(selector["ids"])]
+    elif selector.get("subtree"):
+        if selector["subtree"] not in snapshot:
+            raise ChangeValidationError(f"Subtree root {selector['subtree']} does not exist.")
+        candidates = _subtree(snapshot, selector["subtree"])
+    else:
+        candidates = snapshot.elements()
+
+    sysml_type = selector.get("type")
+    pattern = (selector.get("name") or "").lower()
+    selection = [
+        e for e in candidates
+        if (not sysml_type or e.get("@type") == sysml_type)
+        and (not pattern or fnmatch.fnmatchcase((element_name(e) or "").lower(), pattern))
+    ]
+
+    if not selection:
+        raise ChangeValidationError(f"Selector {selector} matched no elements.")
+    if len(selection) > max_selection:
+        raise ChangeValidationError(f"Selector {selector} matched {len(selection)} elements, at most {max_selection} are allowed.")
+    logger.debug("Selector %s matched %d elements", selector, len(selection))
+    return selection
+
+
+def render_attrs(attrs, element):
+    """Replace the placeholders {name} and {id} in string attribute values with the element's values."""
+    if element is None:
+        return dict(attrs)
+    values = {"{name}": element_name(element) or "", "{id}": element["@id"]}
+    rendered = {}
+    for key, value in attrs.items():
+        if isinstance(value, str):
+            for placeholder, replacement in values.items():
+                value = value.replace(placeholder, replacement)
+        rendered[key] = value
+    return rendered
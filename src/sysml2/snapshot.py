@@ -0,0 +1,329 @@
+import asyncio
+import logging
+import os
+import threading
+from collections import OrderedDict
+from src.external.sysml2.element import get_project_elements, get_project_elements_async, iter_project_elements
+from src.sysml2.snapshot_store import get_snapshot_store, record_delta, record_snapshot, wait_for_store
+logger = logging.getLogger(__name__)
+
+CACHE_SIZE = int(os.environ.get("SNAPSHOT_CACHE_SIZE", "8"))
+# commits layered over a snapshot before the layers are merged
+MAX_OVERLAY_DEPTH = int(os.environ.get("SNAPSHOT_MAX_OVERLAY_DEPTH", "16"))
+
+
+def owner_of(element):
+    """Return the owner id of an element record, if any."""
+    owner = element.get("owner")
+    if isinstance(owner, dict):
+        return owner.get("@id")
+    return owner
+
+
+class ModelSnapshot:
+    """
+    In-memory view of all elements of a commit, indexed by id and by owner.
+
+    The snapshot can be advanced to a following commit with apply_change, which
+    costs O(changes) instead of fetching and indexing the whole model again. Cached
+    snapshots are shared between requests and never modified; advance layers the
+    change over them instead.
+    """
+
+    def __init__(self, commit_id, elements):
+        self.commit_id = commit_id
+        self._elements = {}     # element id -> record, None if deleted in this layer
+        self._children = {}     # owner id (None for roots) -> ordered dict of child ids
+        self._base = None       # snapshot this layer reads unchanged elements and child lists from
+        self._depth = 0
+        self._size = 0
+        self._lock = threading.Lock()
+        for element in elements or []:
+            self._insert(dict(element))
+        self._size = len(self._elements)    # ids listed twice are only kept once
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, element_id):
+        return self._lookup(element_id) is not None
+
+    def get(self, element_id):
+        return self._lookup(element_id)
+
+    def elements(self):
+        """Return all element records as a list."""
+        if self._base is None:
+            return list(self._elements.values())
+        records = {}
+        for layer in reversed(self._layers()):
+            records.update(layer._elements)
+        return [record for record in records.values() if record is not None]
+
+    def owner_id(self, element_id):
+        element = self._lookup(element_id)
+        return owner_of(element) if element else None
+
+    def children(self, element_id=None):
+        """Return the records directly owned by an element, or the roots if no id is given."""
+        child_ids = list(self._bucket(element_id))
+        return [element for element in map(self._lookup, child_ids) if element is not None]
+
+    def roots(self):
+        return self.children(None)
+
+    def child_count(self, element_id=None):
+        return len(self._bucket(element_id))
+
+    def advance(self, change, commit_id):
+        """
+        Return a snapshot of commit_id with the change applied, and its delta (see apply_change).
+
+        The new snapshot only holds the changed records and the child lists of their owners,
+        everything else is read from this snapshot, which stays unchanged. Every
+        MAX_OVERLAY_DEPTH commits the layers are merged, so lookups stay cheap.
+        """
+        base = self._squashed() if self._depth >= MAX_OVERLAY_DEPTH else self
+        snapshot = ModelSnapshot(base.commit_id, None)
+        snapshot._base, snapshot._depth, snapshot._size = base, base._depth + 1, len(base)
+        delta = snapshot.apply_change(change, commit_id)
+        return snapshot, delta
+
+    def apply_change(self, change, commit_id):
+        """
+        Apply a list of DataVersions and move the snapshot to the given commit.
+
+        Returns:
+            dict: The resulting element records under 'created', 'updated' and 'deleted'.
+
+        Raises:
+            ValueError: If a DataVersion has no identity, since the element could not be tracked.
+        """
+        delta = {"created": [], "updated": [], "deleted": []}
+        with self._lock:
+            for data_version in change:
+                element_id = (data_version.get("identity") or {}).get("@id")
+                if not element_id:
+                    raise ValueError("Cannot apply a DataVersion without identity to the snapshot.")
+                payload = data_version.get("payload")
+
+                if payload is None:
+                    element = self._remove(element_id)
+                    if element is not None:
+                        delta["deleted"].append(element)
+                elif self._lookup(element_id) is not None:
+                    element = {**self._remove(element_id), **payload, "@id": element_id}
+                    self._insert(element)
+                    delta["updated"].append(element)
+                else:
+                    element = {**payload, "@id": element_id}
+                    self._insert(element)
+                    delta["created"].append(element)
+
+            self.commit_id = commit_id
+        return delta
+
+    def preview_change(self, change):
+        """Return the delta apply_change would produce, without modifying the snapshot."""
+        delta = {"created": [], "updated": [], "deleted": []}
+        overlay = {}    # element id -> record after the operations so far, None if deleted
+        for data_version in change:
+            element_id = (data_version.get("identity") or {}).get("@id")
+            payload = data_version.get("payload")
+            current = overlay[element_id] if element_id in overlay else self._lookup(element_id)
+
+            if payload is None:
+                if current is not None:
+                    delta["deleted"].append(current)
+                overlay[element_id] = None
+            elif current is not None:
+                overlay[element_id] = {**current, **payload, "@id": element_id}
+                delta["updated"].append(overlay[element_id])
+            else:
+                overlay[element_id] = {**payload, "@id": element_id}
+                delta["created"].append(overlay[element_id])
+        return delta
+
+    def _layers(self):
+        """Return this snapshot and the snapshots below it, top first."""
+        layers, layer = [], self
+        while layer is not None:
+            layers.append(layer)
+            layer = layer._base
+        return layers
+
+    def _lookup(self, element_id):
+        layer = self
+        while layer is not None:
+            if element_id in layer._elements:
+                return layer._elements[element_id]
+            layer = layer._base
+        return None
+
+    def _bucket(self, owner_id):
+        layer = self
+        while layer is not None:
+            bucket = layer._children.get(owner_id)
+            if bucket is not None:
+                return bucket
+            layer = layer._base
+        return {}
+
+    def _own_bucket(self, owner_id):
+        """Return the child list of an owner in this layer, copying it from the base on first write."""
+        bucket = self._children.get(owner_id)
+        if bucket is None:
+            bucket = self._children[owner_id] = dict(self._base._bucket(owner_id)) if self._base else {}
+        return bucket
+
+    def _squashed(self):
+        """
+        Return a snapshot of the same commit with all layers above the bottom one merged
+        into a single layer; once the changes make up half of the model, a flat snapshot.
+        """
+        layers = self._layers()
+        bottom = layers.pop()
+        merged = ModelSnapshot(self.commit_id, None)
+        for layer in reversed(layers):
+            merged._elements.update(layer._elements)
+            merged._children.update(layer._children)
+        if len(merged._elements) * 2 > len(bottom):
+            return ModelSnapshot(self.commit_id, self.elements())
+        merged._base, merged._depth, merged._size = bottom, 1, len(self)
+        return merged
+
+    def _insert(self, element):
+        element_id = element["@id"]
+        self._elements[element_id] = element
+        self._own_bucket(owner_of(element))[element_id] = None
+        self._size += 1
+
+    def _remove(self, element_id):
+        element = self._lookup(element_id)
+        if element is not None:
+            if self._base is None:
+                del self._elements[element_id]
+            else:
+                self._elements[element_id] = None
+            self._own_bucket(owner_of(element)).pop(element_id, None)
+            self._size -= 1
+        return element
+
+
+_snapshots: OrderedDict[tuple[str, str], ModelSnapshot] = OrderedDict()
+_snapshots_lock = threading.Lock()
+
+def get_snapshot(project_id, commit_id, loader) -> ModelSnapshot:
+    """Return the cached snapshot of a commit, loading the elements with loader() on a miss."""
+    key = (project_id, commit_id)
+    with _snapshots_lock:
+        snapshot = _snapshots.get(key)
+        if snapshot is not None:
+            _snapshots.move_to_end(key)
+            return snapshot
+
+    logger.debug("Loading snapshot of commit %s", commit_id)
+    return _cache_snapshot(key, ModelSnapshot(commit_id, loader()))
+
+def _cache_snapshot(key, snapshot):
+    with _snapshots_lock:
+        _snapshots[key] = snapshot
+        while len(_snapshots) > CACHE_SIZE:
+            _snapshots.popitem(last=False)
+    return snapshot
+
+def peek_snapshot(project_id, commit_id) -> ModelSnapshot | None:
+    """Return the cached snapshot of a commit without loading it."""
+    with _snapshots_lock:
+        return _snapshots.get((project_id, commit_id))
+
+def load_snapshot(project_id, commit_id) -> ModelSnapshot:
+    """Return the cached snapshot of a commit, fetching its elements from the SysML API on a miss."""
+    def loader():
+        elements = get_project_elements(project_id, commit_id)
+        if elements is None:
+            raise LookupError(f"Elements of commit {commit_id} in project {project_id} not found")
+        record_snapshot(project_id, commit_id, elements)
+        return elements
+
+    return get_snapshot(project_id, commit_id, loader)
+
+def iter_commit_elements(project_id, commit_id):
+    """
+    Return an iterator over the elements of a commit without loading its snapshot: from the
+    cached snapshot if there is one, else from the snapshot store if the commit is recorded,
+    else page by page from the SysML API.
+
+    Raises:
+        LookupError: If the elements of the commit cannot be fetched.
+    """
+    snapshot = peek_snapshot(project_id, commit_id)
+    if snapshot is not None:
+        return iter(snapshot.elements())
+    store = get_snapshot_store()
+    if store is not None and store.has_commit(project_id, commit_id):
+        return store.iter_elements(project_id, commit_id)
+    elements = iter_project_elements(project_id, commit_id)
+    if elements is None:
+        raise LookupError(f"Elements of commit {commit_id} in project {project_id} not found")
+    return elements
+
+async def load_snapshot_async(project_id, commit_id) -> ModelSnapshot:
+    """Async version of load_snapshot; the elements are indexed on a worker thread."""
+    snapshot = peek_snapshot(project_id, commit_id)
+    if snapshot is not None:
+        return snapshot
+
+    logger.debug("Loading snapshot of commit %s", commit_id)
+    elements = await get_project_elements_async(project_id, commit_id)
+    if elements is None:
+        raise LookupError(f"Elements of commit {commit_id} in project {project_id} not found")
+    record_snapshot(project_id, commit_id, elements)
+    snapshot = await asyncio.to_thread(ModelSnapshot, commit_id, elements)
+    return _cache_snapshot((project_id, commit_id), snapshot)
+
+def apply_commit(project_id, base_commit_id, commit_id, change):
+    """
+    Cache a snapshot of commit_id, derived from the cached snapshot of base_commit_id by
+    layering the pushed change over it. The base snapshot stays unchanged, since
+    other requests may still read it.
+
+    Returns:
+        dict | None: The created, updated and deleted records, or None if no snapshot
+            of the base commit was cached or the change could not be applied.
+    """
+    base = peek_snapshot(project_id, base_commit_id)
+    if base is None:
+        return None
+
+    try:
+        snapshot, delta = base.advance(change, commit_id)
+    except ValueError:
+        logger.warning("Not caching commit %s, change set is not trackable", commit_id, exc_info=True)
+        return None
+
+    _cache_snapshot((project_id, commit_id), snapshot)
+    record_delta(project_id, base_commit_id, commit_id, delta)
+    return delta
+
+def diff_commits(project_id, base_commit_id, commit_id):
+    """
+    Return the element-level diff between two commits from the snapshot store.
+
+    Commits that are not in the store yet are loaded and recorded first.
+
+    Raises:
+        RuntimeError: If the snapshot store is disabled.
+        LookupError: If the elements of a commit cannot be fetched.
+    """
+    store = get_snapshot_store()
+    if store is None:
+        raise RuntimeError("Snapshot store is disabled, set SNAPSHOT_STORE_DIR.")
+
+    for c in (base_commit_id, commit_id):
+        if not store.has_commit(project_id, c):
+            snapshot = load_snapshot(project_id, c)
+            wait_for_store()
+            if not store.has_commit(project_id, c):
+                store.put_snapshot(project_id, c, snapshot.elements())
+    return store.diff(project_id, base_commit_id, commit_id)
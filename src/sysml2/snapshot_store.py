@@ -0,0 +1,306 @@
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from src.utils.json_codec import dumpb, loads
+logger = logging.getLogger(__name__)
+
+# disabled unless set; recorded commits are kept until the directory is cleared
+SNAPSHOT_STORE_DIR = os.environ.get("SNAPSHOT_STORE_DIR", "")
+# trees kept in memory for incremental puts, one per cached snapshot
+TREE_CACHE_SIZE = int(os.environ.get("SNAPSHOT_CACHE_SIZE", "8"))
+
+
+def _encode(obj) -> bytes:
+    return dumpb(obj, sort_keys=True)
+
+
+def _owner_id(element):
+    owner = element.get("owner")
+    return owner.get("@id") if isinstance(owner, dict) else owner
+
+
+class _Tree:
+    """Element hashes, placement and node hashes of a recorded commit, kept for incremental puts."""
+
+    def __init__(self):
+        self.element_hash = {}   # element id -> hash of the element record
+        self.owner = {}          # element id -> declared owner id
+        self.parent_of = {}      # element id -> parent in the tree (None for roots)
+        self.children = {None: set()}   # parent id -> child ids
+        self.node_hash = {}      # element id (None for the root) -> hash of the tree node
+
+    def copy(self):
+        clone = _Tree()
+        clone.element_hash = dict(self.element_hash)
+        clone.owner = dict(self.owner)
+        clone.parent_of = dict(self.parent_of)
+        clone.children = {parent_id: set(child_ids) for parent_id, child_ids in self.children.items()}
+        clone.node_hash = dict(self.node_hash)
+        return clone
+
+    def placement(self, element_id):
+        """Elements whose owner is not part of the commit are placed at the root."""
+        owner_id = self.owner.get(element_id)
+        return owner_id if owner_id in self.element_hash else None
+
+    def place(self, element_id):
+        """Move an element below its current placement, or out of the tree if it was removed."""
+        if element_id in self.parent_of:
+            self.children[self.parent_of.pop(element_id)].discard(element_id)
+        if element_id in self.element_hash:
+            parent_id = self.placement(element_id)
+            self.parent_of[element_id] = parent_id
+            self.children.setdefault(parent_id, set()).add(element_id)
+
+    def path(self, element_id):
+        """Return the element and its parents up to and including the root (None)."""
+        nodes = [element_id]
+        while element_id is not None and len(nodes) <= len(self.parent_of):
+            element_id = self.parent_of.get(element_id)
+            nodes.append(element_id)
+        return nodes
+
+
+class SnapshotStore:
+    """
+    Disk-backed, content-addressed store of commit snapshots.
+
+    Every element record is stored once under the SHA-256 of its canonical JSON.
+    The ownership tree of a commit is stored as Merkle nodes, where each node
+    references its element hash and the ids and node hashes of its children, and
+    a commit manifest references the root node. Consecutive commits share all
+    unchanged elements and subtrees, so a commit only adds the changed elements
+    and the nodes on their paths to the root. Two commits are diffed by walking
+    both trees and skipping subtrees with equal hashes.
+
+    Layout: objects/<hash[:2]>/<hash[2:]> and commits/<project id>/<commit id>.
+    """
+
+    def __init__(self, root=SNAPSHOT_STORE_DIR, tree_cache_size=TREE_CACHE_SIZE):
+        self.root = root
+        self.tree_cache_size = tree_cache_size
+        self._trees: OrderedDict[tuple[str, str], _Tree] = OrderedDict()
+        self._lock = threading.Lock()
+
+    # ---- objects and manifests ----
+
+    def _object_path(self, digest):
+        return os.path.join(self.root, "objects", digest[:2], digest[2:])
+
+    def _manifest_path(self, project_id, commit_id):
+        return os.path.join(self.root, "commits", project_id, commit_id)
+
+    def _write(self, path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+    def _put_object(self, obj) -> str:
+        data = _encode(obj)
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            self._write(path, data)
+        return digest
+
+    def _get_object(self, digest):
+        with open(self._object_path(digest), "rb") as f:
+            return loads(f.read())
+
+    def has_commit(self, project_id, commit_id) -> bool:
+        return os.path.exists(self._manifest_path(project_id, commit_id))
+
+    def root_hash(self, project_id, commit_id) -> str:
+        """Return the root node hash of a recorded commit."""
+        try:
+            with open(self._manifest_path(project_id, commit_id), "rb") as f:
+                return loads(f.read())["root"]
+        except FileNotFoundError:
+            raise LookupError(f"Commit {commit_id} of project {project_id} is not in the snapshot store")
+
+    # ---- recording ----
+
+    def is_tracked(self, project_id, commit_id) -> bool:
+        """Whether the commit can be advanced incrementally with apply_delta."""
+        with self._lock:
+            return (project_id, commit_id) in self._trees
+
+    def put_snapshot(self, project_id, commit_id, elements) -> str:
+        """Record all elements of a commit and return the root node hash."""
+        tree = _Tree()
+        for element in elements:
+            element_id = element["@id"]
+            tree.element_hash[element_id] = self._put_object(element)
+            tree.owner[element_id] = _owner_id(element)
+        for element_id in tree.element_hash:
+            tree.place(element_id)
+        return self._commit_tree(project_id, commit_id, tree, set(tree.element_hash))
+
+    def apply_delta(self, project_id, base_commit_id, commit_id, delta) -> str | None:
+        """
+        Record a commit from its created, updated and deleted records relative to the base commit.
+
+        Only the changed elements and the nodes on their paths to the root are hashed and
+        written. The base commit stays tracked, so it can be advanced again. Returns the new
+        root hash, or None if the base commit is not tracked.
+        """
+        with self._lock:
+            base_tree = self._trees.get((project_id, base_commit_id))
+        if base_tree is None:
+            return None
+        tree = base_tree.copy()
+
+        touched = set()
+        for element in delta["deleted"]:
+            element_id = element["@id"]
+            if element_id not in tree.element_hash:
+                continue
+            touched.add(tree.parent_of.get(element_id))
+            del tree.element_hash[element_id], tree.owner[element_id]
+            tree.node_hash.pop(element_id, None)
+            tree.place(element_id)
+            # owned elements of a deleted element move to the root
+            for child_id in list(tree.children.pop(element_id, ())):
+                tree.parent_of.pop(child_id)
+                tree.place(child_id)
+                touched.add(child_id)
+
+        for element in delta["created"] + delta["updated"]:
+            element_id = element["@id"]
+            is_new = element_id not in tree.element_hash
+            tree.element_hash[element_id] = self._put_object(element)
+            tree.owner[element_id] = _owner_id(element)
+            touched.add(tree.parent_of.get(element_id))
+            tree.place(element_id)
+            touched.add(element_id)
+            if is_new:
+                # roots that are owned by the new element move below it
+                for root_id in [r for r in tree.children[None] if tree.owner.get(r) == element_id]:
+                    tree.place(root_id)
+                    touched.add(root_id)
+
+        return self._commit_tree(project_id, commit_id, tree, touched)
+
+    def _commit_tree(self, project_id, commit_id, tree, touched) -> str:
+        """Rehash the touched nodes and their ancestors deepest first and write the manifest."""
+        paths = [tree.path(t) for t in touched if t is None or t in tree.element_hash]
+        depth = {}
+        for path in paths:
+            for level, node_id in enumerate(reversed(path)):
+                depth[node_id] = level
+        depth[None] = 0
+
+        for node_id in sorted(depth, key=depth.get, reverse=True):
+            node = {
+                "id": node_id,
+                "element": tree.element_hash.get(node_id),
+                "children": sorted([c, tree.node_hash[c]] for c in tree.children.get(node_id, ())),
+            }
+            tree.node_hash[node_id] = self._put_object(node)
+
+        root = tree.node_hash[None]
+        self._write(self._manifest_path(project_id, commit_id), _encode({"root": root}))
+        with self._lock:
+            self._trees[(project_id, commit_id)] = tree
+            while len(self._trees) > self.tree_cache_size:
+                self._trees.popitem(last=False)
+        return root
+
+    # ---- reading ----
+
+    def iter_elements(self, project_id, commit_id):
+        """Yield the element records of a recorded commit, owners before owned elements."""
+        stack = [self.root_hash(project_id, commit_id)]
+        while stack:
+            node = self._get_object(stack.pop())
+            if node["element"] is not None:
+                yield self._get_object(node["element"])
+            stack.extend(child_hash for _, child_hash in reversed(node["children"]))
+
+    def diff(self, project_id, base_commit_id, commit_id):
+        """
+        Return the element-level difference between two recorded commits.
+
+        Subtrees with equal node hashes are skipped, so the cost is proportional to the
+        changed subtrees. Moved elements are reported as updated.
+
+        Returns:
+            dict: Element records under 'created', 'updated' (new record) and 'deleted' (old record).
+        """
+        removed = {}    # element id -> (element hash, parent id)
+        added = {}
+        changed = {}
+
+        def collect(node_hash, parent_id, target):
+            stack = [(node_hash, parent_id)]
+            while stack:
+                node_hash, parent_id = stack.pop()
+                node = self._get_object(node_hash)
+                target[node["id"]] = (node["element"], parent_id)
+                stack.extend((child_hash, node["id"]) for _, child_hash in node["children"])
+
+        stack = [(self.root_hash(project_id, base_commit_id), self.root_hash(project_id, commit_id), None)]
+        while stack:
+            old_hash, new_hash, parent_id = stack.pop()
+            if old_hash == new_hash:
+                continue
+            old, new = self._get_object(old_hash), self._get_object(new_hash)
+            if new["id"] is not None and old["element"] != new["element"]:
+                changed[new["id"]] = new["element"]
+
+            old_children, new_children = dict(old["children"]), dict(new["children"])
+            for child_id, child_hash in new_children.items():
+                if child_id in old_children:
+                    stack.append((old_children[child_id], child_hash, new["id"]))
+                else:
+                    collect(child_hash, new["id"], added)
+            for child_id, child_hash in old_children.items():
+                if child_id not in new_children:
+                    collect(child_hash, old["id"], removed)
+
+        for element_id in set(added) & set(removed):
+            if added[element_id] != removed[element_id]:
+                changed[element_id] = added[element_id][0]
+            del added[element_id], removed[element_id]
+
+        return {
+            "created": [self._get_object(element_hash) for element_hash, _ in added.values()],
+            "updated": [self._get_object(element_hash) for element_hash in changed.values()],
+            "deleted": [self._get_object(element_hash) for element_hash, _ in removed.values()],
+        }
+
+
+_store = SnapshotStore(SNAPSHOT_STORE_DIR) if SNAPSHOT_STORE_DIR else None
+# recording runs in order on one background thread, off the request path
+_store_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="snapshot-store")
+
+def get_snapshot_store() -> SnapshotStore | None:
+    """Return the process-wide snapshot store, or None if SNAPSHOT_STORE_DIR is empty."""
+    return _store
+
+def _record(method, *args):
+    try:
+        return method(*args)
+    except Exception:
+        logger.exception("Failed to record snapshot in the snapshot store")
+
+def record_snapshot(project_id, commit_id, elements):
+    """Record a loaded snapshot in the background; elements must not be mutated afterwards."""
+    if _store is not None and not _store.is_tracked(project_id, commit_id):
+        return _store_pool.submit(_record, _store.put_snapshot, project_id, commit_id, elements)
+    return None
+
+def record_delta(project_id, base_commit_id, commit_id, delta):
+    """Record a written-through commit in the background from its change records."""
+    if _store is not None and delta is not None:
+        return _store_pool.submit(_record, _store.apply_delta, project_id, base_commit_id, commit_id, delta)
+    return None
+
+def wait_for_store():
+    """Block until all snapshots submitted so far are recorded."""
+    _store_pool.submit(lambda: None).result()
@@ -1,9 +1,14 @@
+import asyncio
 import logging
-from src.external.sysml2.branch import get_project_branch, get_project_branches
-from src.external.sysml2.commit import push_commit
-from src.external.sysml2.element import get_project_element, get_project_elements
-from src.external.sysml2.meta import get_datatypes
-from src.external.sysml2.project import get_project
+import uuid
+from src.external.sysml2.branch import get_project_branch, get_project_branch_async, get_project_branches
+from src.external.sysml2.element import get_project_element
+from src.external.sysml2.project import get_project, get_project_async
+from src.sysml2.change_optimizer import optimize_change
+from src.sysml2.commit_queue import get_commit_queue
+from src.sysml2.snapshot import ModelSnapshot, load_snapshot, load_snapshot_async
+from src.sysml2.validation import ChangeValidator, get_schema_validator
+from src.utils.logger import payload
 logger = logging.getLogger(__name__)
 
 class SysMLClient:
@@ -18,40 +23,72 @@ class SysMLClient:
         return "Check successfull", 200
 
     def initialize(self, project_id, branch_id):
+        project = get_project(project_id)
+        branch = get_project_branch(project_id, branch_id)
+        self._setup(project_id, project, branch_id, branch, get_schema_validator())
+
+    async def initialize_async(self, project_id, branch_id):
+        """Async version of initialize that fetches the project, the branch and the snapshot of HEAD."""
+        project, branch = await asyncio.gather(
+            get_project_async(project_id),
+            get_project_branch_async(project_id, branch_id),
+        )
+        # fetched once per process, later calls return at once
+        schema_validator = await asyncio.to_thread(get_schema_validator)
+        self._setup(project_id, project, branch_id, branch, schema_validator)
+        self._snapshot = await load_snapshot_async(project_id, self.commit_id)
+
+    def _setup(self, project_id, project, branch_id, branch, schema_validator):
         # project
         self.project_id = project_id
-        project = get_project(project_id)
         self.project_name = project["name"]
         # branch
         self.branch_id = branch_id
-        branch = get_project_branch(project_id, branch_id)
         self.commit_id = branch["head"]["@id"]
+        # set by commit_and_push: HEAD the commit was pushed on, and whether it holds other requests' changes
+        self.parent_commit_id = None
+        self.coalesced = False
         # staging
         self.change = []
-        # fetch available data types
-        datatypes = get_datatypes()
-        self.datatypes = [datatype["title"] for datatype in datatypes["$defs"].values()]
+        self._snapshot = None
+        # available data types, compiled once per process into validators
+        self.datatypes = schema_validator.types
+        self.validator = ChangeValidator(self, schema_validator)
 
         logger.info(f"Working on project {self.project_name}({self.project_id}) on branch main({self.branch_id}) on HEAD({self.commit_id})")
 
+    @property
+    def snapshot(self) -> ModelSnapshot:
+        """Cached snapshot of the current commit, shared between requests."""
+        if self._snapshot is None or self._snapshot.commit_id != self.commit_id:
+            self._snapshot = load_snapshot(self.project_id, self.commit_id)
+        return self._snapshot
+
     def get_all_elements(self):
-        elements = get_project_elements(self.project_id, self.commit_id)
-        return elements
+        return self.snapshot.elements()
 
     def create(self, **attrs):
-        """Create a new element and add it to the model."""
-        logger.debug(f"Creating new element with attributes {attrs}")
+        """Create a new element and add it to the model.
+
+        The element id is assigned locally (or taken from '@id') so that the staged
+        change can be written through to the cached snapshot after the commit.
+        """
+        element_id = attrs.pop("@id", None) or str(uuid.uuid4())
+        logger.debug("Creating new element(%s) with attributes %s", element_id, payload(attrs))
         create_element = {
             "@type": "DataVersion",
             "payload": {
                 **attrs
+            },
+            "identity": {
+                "@id": element_id
             }
         }
         self.change.append(create_element)
 
     def update(self, element_id, **attrs):
         """Update an existing element in the model."""
-        logger.debug(f"Updating element({element_id}) with attributes {attrs}")
+        logger.debug("Updating element(%s) with attributes %s", element_id, payload(attrs))
         update_element = {
             "@type": "DataVersion",
             "payload": {
@@ -64,7 +101,7 @@ class SysMLClient:
         self.change.append(update_element)
 
     def delete(self, element_id):
-        logger.debug(f"Deleting the element({element_id})")
+        logger.debug("Deleting the element(%s)", element_id)
         delete_element = {
             "@type": "DataVersion",
             "payload":None,     # no payload removes the element
@@ -74,9 +111,61 @@ class SysMLClient:
         }
         self.change.append(delete_element)
 
-    def commit_and_push(self):
-        commit_id = push_commit(self.project_id, self.change)
-        self.commit_id = commit_id
+    def discard_change(self):
+        """Drop the staged operations and their validation state, e.g. to stage another plan."""
+        self.change = []
+        self.validator = ChangeValidator(self, self.validator.schema)
+
+    def optimize_change(self):
+        """Collapse the staged change set against the snapshot; see change_optimizer.optimize_change."""
+        self.change = optimize_change(self.change, self.snapshot)
+        return self.change
+
+    def commit_and_push(self, with_delta=True, progress=None):
+        """Commit the staged changes through the branch commit queue.
+
+        The staged change set is optimized against the snapshot first, unless with_delta
+        is disabled.
+
+        Args:
+            with_delta: Optimize the change set and compute the changed element records
+                against the snapshot, and write the commit through to the cached snapshot.
+                Bulk imports disable this to avoid loading and caching a snapshot per chunk.
+            progress: Optional callable(done_operations, total_operations, commit_id)
+                for change sets that are pushed in chunks.
+
+        Returns:
+            dict | None: The created, updated and deleted element records of this commit.
+
+        Raises:
+            CommitConflictError: If the staged changes conflict with changes committed
+                since HEAD was read in initialize; the request has to be re-planned.
+        """
+        delta = self._prepare_commit(with_delta)
+        queue = get_commit_queue(self.project_id, self.branch_id)
+        self._committed(queue.submit_change(self.commit_id, self.change, progress, write_through=with_delta))
+        return delta
+
+    async def commit_and_push_async(self, with_delta=True, progress=None):
+        """
+        Async version of commit_and_push.
+
+        The commit is awaited on the event loop while the branch commit queue pushes it,
+        so waiting requests do not hold a thread.
+        """
+        delta = self._prepare_commit(with_delta)
+        queue = get_commit_queue(self.project_id, self.branch_id)
+        self._committed(await queue.submit_change_async(self.commit_id, self.change, progress, write_through=with_delta))
+        return delta
+
+    def _prepare_commit(self, with_delta):
+        if not with_delta:
+            return None
+        self.optimize_change()
+        return self.snapshot.preview_change(self.change)
+
+    def _committed(self, result):
+        self.commit_id, self.parent_commit_id, self.coalesced = result
         self.change = []
 
     def get_element(self, element_id):
@@ -1,78 +1,166 @@
 import logging
+from itertools import groupby
+from langchain_core.runnables import RunnableConfig
 from langchain_core.tools import StructuredTool
 from src.sysml2.sysml_client import SysMLClient
 from src.sysml2.handler.base_handler import TYPE_HANDLERS, BaseHandler
 from src.sysml2.handler.generic_handler import GenericHandler
+from src.sysml2.selector import render_attrs, select
+from src.sysml2.validation import ChangeValidationError
+from src.utils.logger import payload
+from src.utils.tracing import span
 logger = logging.getLogger(__name__)
 
 
+# Handlers are stateless, so unregistered types share one generic handler
+_GENERIC_HANDLER = GenericHandler()
+
 def _choose_handler(sysml_type: str) -> BaseHandler:
-    return TYPE_HANDLERS.get(sysml_type, GenericHandler())
-
-def make_tools(client: SysMLClient):
-    def create(**attrs):
-        """Create a new element with a given set of attributes for the model.
-        
-        Args:
-            **attrs: dictionary of element attributes
-        """
-        attrs = attrs["attrs"]
-        type = attrs.get("@type")
-        handler = _choose_handler(type)
-        return handler.create(client, **attrs)
-    
-    def update(element_id, **attrs):
-        """Update the attributes of an existing element.
-
-        Args:
-            element_id: id of the existing element.
-            **attrs: dictionary of updated element attributes, always including @type
-        """
-        attrs = attrs["attrs"]
-        type = attrs.get("@type")
-        handler = _choose_handler(type)
-        return handler.update(client, element_id, **attrs)
+    return TYPE_HANDLERS.get(sysml_type, _GENERIC_HANDLER)
+
+def _client(config: RunnableConfig) -> SysMLClient:
+    """Return the per-request client passed to the tool invocation."""
+    return config["configurable"]["client"]
+
+def create(config: RunnableConfig, **attrs):
+    """Create a new element with a given set of attributes for the model.
     
-    def delete(element_id, type):
-        """Remove an existing element from the model.
-
-        Args:
-            element_id: ID of the element to be removed.
-            type: the @type attribute of the element to be deleted.
-        
-        """
-        handler = _choose_handler(type)
-        return handler.delete(client, element_id)
+    Args:
+        **attrs: dictionary of element attributes
+    """
+    attrs = attrs["attrs"]
+    type = attrs.get("@type")
+    handler = _choose_handler(type)
+    return handler.create(_client(config), **attrs)
+
+def update(element_id, config: RunnableConfig, **attrs):
+    """Update the attributes of an existing element.
+
+    Args:
+        element_id: id of the existing element.
+        **attrs: dictionary of updated element attributes, always including @type
+    """
+    attrs = attrs["attrs"]
+    type = attrs.get("@type")
+    handler = _choose_handler(type)
+    return handler.update(_client(config), element_id, **attrs)
+
+def delete(element_id, type, config: RunnableConfig):
+    """Remove an existing element from the model.
+
+    Args:
+        element_id: ID of the element to be removed.
+        type: the @type attribute of the element to be deleted.
     
-    return [
-        StructuredTool.from_function(func=create),
-        StructuredTool.from_function(func=update),
-        StructuredTool.from_function(func=delete)
-    ]
+    """
+    handler = _choose_handler(type)
+    return handler.delete(_client(config), element_id, type)
+
+def _select(client: SysMLClient, selector):
+    """Expand a selector against the client's snapshot; a bad selector fails the plan like any invalid operation."""
+    try:
+        return select(client.snapshot, selector)
+    except ChangeValidationError as e:
+        client.validator.errors.append(str(e))
+        raise
 
-def execute_tool(tools_by_name, tool_call):
+def _by_type(records):
+    """Group consecutive records by @type, keeping their order."""
+    return groupby(records, key=lambda r: r.get("@type"))
+
+def create_many(items: list[dict], config: RunnableConfig, owners: dict | None = None):
+    """Create several elements in one call.
+
+    Args:
+        items: list of attribute dictionaries, one per element, each including @type
+        owners: optional selector; every item is then created below each selected element,
+            and {name} in a string attribute is replaced by the owner's name
+    """
+    client = _client(config)
+    if owners:
+        items = [
+            render_attrs({**attrs, "owner": {"@id": owner["@id"]}}, owner)
+            for owner in _select(client, owners) for attrs in items
+        ]
+    for sysml_type, group in _by_type(items):
+        _choose_handler(sysml_type).create_many(client, list(group))
+
+def update_many(selector: dict, attrs: dict, config: RunnableConfig):
+    """Update all elements matched by a selector with the same attributes.
+
+    Args:
+        selector: {"ids": [...]}, {"subtree": element_id} or a filter {"type": ..., "name": "*glob*"};
+            type and name can also narrow ids or subtree
+        attrs: attributes to set on every element; {name} and {id} in a string are
+            replaced by the element's current name and id, e.g. {"name": "{name}_v2"}
+    """
+    client = _client(config)
+    for sysml_type, group in _by_type(_select(client, selector)):
+        handler = _choose_handler(sysml_type)
+        handler.update_many(client, [e["@id"] for e in group], **{"@type": sysml_type, **attrs})
+
+def delete_many(selector: dict, config: RunnableConfig):
+    """Remove all elements matched by a selector.
+
+    Args:
+        selector: {"ids": [...]}, {"subtree": element_id} (the element and everything it owns)
+            or a filter {"type": ..., "name": "*glob*"}; type and name can also narrow ids or subtree
+    """
+    client = _client(config)
+    # owned elements before their owners
+    for sysml_type, group in _by_type(reversed(_select(client, selector))):
+        _choose_handler(sysml_type).delete_many(client, [e["@id"] for e in group], sysml_type)
+
+# Built once per process; the client is passed per call through the RunnableConfig
+TOOLS = [
+    StructuredTool.from_function(func=create),
+    StructuredTool.from_function(func=update),
+    StructuredTool.from_function(func=delete),
+    StructuredTool.from_function(func=create_many),
+    StructuredTool.from_function(func=update_many),
+    StructuredTool.from_function(func=delete_many),
+]
+TOOLS_BY_NAME = {t.name: t for t in TOOLS}
+
+def execute_tool(tools_by_name, tool_call, client: SysMLClient):
+    """
+    Run one tool call of the model against the client and return a log message.
+
+    Unknown tools and calls that fail, e.g. on malformed arguments, are recorded in
+    the client's validation errors like rejected operations, so the plan fails.
+    """
     tool_name = tool_call.get("name")
     tool_args = tool_call.get("args", {})
-    logger.info(f"Function Call for {tool_name} - {tool_args}")
+    logger.info("Function Call for %s - %s", tool_name, payload(tool_args))
 
     # check tool
-    selected_tool = tools_by_name[tool_name]
+    selected_tool = tools_by_name.get(tool_name)
     if not selected_tool:
         logger.error(f"Unknown tool: {tool_name}")
+        client.validator.errors.append(f"Unknown tool {tool_name} - {tool_args}")
         return f"Error: Tool {tool_name} not found."
 
-    # Preprocess tool args
+    # Preprocess tool args into new dicts, the logged ones are formatted later by the log listener
     if tool_name == "create" and "attrs" not in tool_args:
         tool_args = {"attrs": tool_args}
     elif tool_name == "update":
         if "attrs" not in tool_args:
             tool_args = {"attrs": tool_args}
         if "element_id" in tool_args["attrs"]:
-            tool_args["element_id"] = tool_args["attrs"].pop("element_id")
+            attrs = dict(tool_args["attrs"])
+            tool_args = {**tool_args, "element_id": attrs.pop("element_id"), "attrs": attrs}
 
-    try:
-        selected_tool.invoke(tool_args)
-        return f"{tool_name} - {tool_args}"
-    except Exception as e:
-        logger.error(f"Error invoking tool {tool_name}: {e}")
-        return f"Error: Toolcall malfunction for {tool_name} - {tool_args}"
+    with span("tool.execute", tool=tool_name, staged_before=len(client.change)) as tool_span:
+        try:
+            selected_tool.invoke(tool_args, config={"configurable": {"client": client}})
+            tool_span.set(outcome="ok", staged_after=len(client.change))
+            return f"{tool_name} - {tool_args}"
+        except ChangeValidationError as e:
+            logger.warning(f"Rejected tool call {tool_name}: {e}")
+            tool_span.set(outcome="rejected")
+            return f"Error: {e}"
+        except Exception as e:
+            logger.error(f"Error invoking tool {tool_name}: {e}")
+            client.validator.errors.append(f"Invalid call of {tool_name} - {tool_args}: {e}")
+            tool_span.set(outcome="error", error_type=type(e).__name__)
+            return f"Error: Toolcall malfunction for {tool_name} - {tool_args}"
@@ -0,0 +1,155 @@
+import logging
+import threading
+from jsonschema import Draft202012Validator
+from referencing import Registry, Resource
+from referencing.jsonschema import DRAFT202012
+from src.external.sysml2.meta import get_datatypes
+from src.sysml2.snapshot import owner_of
+logger = logging.getLogger(__name__)
+
+
+class ChangeValidationError(ValueError):
+    """Raised when a staged operation does not match the datatype schemas or the model."""
+
+
+class SchemaValidator:
+    """
+    Validators for element payloads, compiled from the /meta/datatypes JSON schema.
+
+    Payloads of tool calls only carry the attributes to set, so the per-type schemas
+    are compiled without their 'required' lists. Unknown attributes and wrongly
+    typed values are still rejected.
+    """
+
+    def __init__(self, datatypes):
+        self._root = datatypes
+        self._definitions = {
+            definition["title"]: definition
+            for definition in datatypes.get("$defs", {}).values()
+            if definition.get("title")
+        }
+        resource = Resource.from_contents(datatypes, default_specification=DRAFT202012)
+        self._registry = Registry().with_resource(datatypes.get("$id", ""), resource).crawl()
+        self._validators = {}
+        self._lock = threading.Lock()
+
+    @property
+    def types(self):
+        return list(self._definitions)
+
+    def properties(self, sysml_type):
+        """Return the property names declared for a type, or None if the type is unknown."""
+        definition = self._definitions.get(sysml_type)
+        return set(definition.get("properties", {})) if definition is not None else None
+
+    def _validator(self, sysml_type):
+        validator = self._validators.get(sysml_type)
+        if validator is None:
+            with self._lock:
+                schema = {k: v for k, v in self._definitions[sysml_type].items() if k not in ("required", "$id")}
+                schema["$defs"] = self._root.get("$defs", {})
+                validator = Draft202012Validator(schema, registry=self._registry)
+                self._validators[sysml_type] = validator
+        return validator
+
+    def check_payload(self, attrs):
+        """Return a list of error messages for the given element attributes."""
+        sysml_type = attrs.get("@type")
+        if not sysml_type:
+            return ["Missing '@type'."]
+        if sysml_type not in self._definitions:
+            return [f"Unknown type '{sysml_type}'."]
+        return [error.message for error in self._validator(sysml_type).iter_errors(attrs)]
+
+
+_schema_validator = None
+_schema_validator_lock = threading.Lock()
+
+def get_schema_validator() -> SchemaValidator:
+    """Return the process-wide schema validator, fetching /meta/datatypes on first use."""
+    global _schema_validator
+    with _schema_validator_lock:
+        if _schema_validator is None:
+            datatypes = get_datatypes()
+            if datatypes is None:
+                raise RuntimeError("Failed to fetch meta datatypes.")
+            _schema_validator = SchemaValidator(datatypes)
+        return _schema_validator
+
+
+class ChangeValidator:
+    """
+    Validates operations before they are staged on a SysMLClient.
+
+    Payloads are checked against the datatype schemas; element and owner ids are
+    checked against the snapshot of the client's commit together with the
+    creates and deletes staged so far. Every failure is kept in 'errors'.
+    """
+
+    def __init__(self, client, schema: SchemaValidator):
+        self.client = client
+        self.schema = schema
+        self.errors = []
+        self._staged_created = {}
+        self._staged_deleted = set()
+        self._synced = 0
+
+    def check_create(self, attrs):
+        problems = self.schema.check_payload(attrs)
+        problems += self._check_owner(attrs)
+        self._raise_if(problems, "create", attrs)
+
+    def check_update(self, element_id, attrs):
+        problems = self.schema.check_payload(attrs)
+        problems += self._check_element(element_id, attrs.get("@type"))
+        problems += self._check_owner(attrs)
+        self._raise_if(problems, "update", attrs)
+
+    def check_delete(self, element_id, sysml_type=None):
+        problems = self._check_element(element_id, sysml_type)
+        self._raise_if(problems, "delete", {"element_id": element_id})
+
+    def _raise_if(self, problems, operation, attrs):
+        if problems:
+            message = f"Invalid {operation} {attrs}: {' '.join(problems)}"
+            self.errors.append(message)
+            raise ChangeValidationError(message)
+
+    def _sync(self):
+        """Track creates and deletes staged since the last check."""
+        change = self.client.change
+        for data_version in change[self._synced:]:
+            element_id = (data_version.get("identity") or {}).get("@id")
+            payload = data_version.get("payload")
+            if payload is None:
+                self._staged_deleted.add(element_id)
+            elif element_id not in self.client.snapshot:
+                self._staged_created[element_id] = payload.get("@type")
+        self._synced = len(change)
+
+    def _lookup_type(self, element_id):
+        """Return (exists, @type) of an element in the snapshot or the staged creates."""
+        self._sync()
+        if not element_id or element_id in self._staged_deleted:
+            return False, None
+        if element_id in self._staged_created:
+            return True, self._staged_created[element_id]
+        element = self.client.snapshot.get(element_id)
+        if element is None:
+            return False, None
+        return True, element.get("@type")
+
+    def _check_element(self, element_id, sysml_type):
+        exists, actual_type = self._lookup_type(element_id)
+        if not exists:
+            return [f"Unknown element '{element_id}'."]
+        if sysml_type and actual_type and sysml_type != actual_type:
+            return [f"Element '{element_id}' is a {actual_type}, not a {sysml_type}."]
+        return []
+
+    def _check_owner(self, attrs):
+        owner_id = owner_of(attrs)
+        if owner_id is None:
+            return []
+        exists, _ = self._lookup_type(owner_id)
+        return [] if exists else [f"Unknown owner '{owner_id}'."]
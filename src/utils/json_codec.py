@@ -0,0 +1,40 @@
+import json
+import logging
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:     # optional dependency
+    orjson = None
+
+# JSON encoding and decoding for the whole service: orjson if installed, the standard
+# library otherwise. Both produce the same compact UTF-8 output, so stored documents
+# and content hashes do not depend on the backend.
+BACKEND = "orjson" if orjson is not None else "json"
+
+
+def _stdlib_dumps(obj, sort_keys):
+    return json.dumps(obj, sort_keys=sort_keys, separators=(",", ":"), ensure_ascii=False)
+
+
+def dumpb(obj, sort_keys=False) -> bytes:
+    """Serialize obj to UTF-8 encoded JSON bytes."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS if sort_keys else 0)
+        except TypeError:
+            # e.g. non-string keys or integers beyond 64 bit, which the stdlib handles
+            logger.debug("orjson could not serialize object, falling back to json", exc_info=True)
+    return _stdlib_dumps(obj, sort_keys).encode("utf-8")
+
+def dumps(obj, sort_keys=False) -> str:
+    """Serialize obj to a JSON string."""
+    if orjson is not None:
+        return dumpb(obj, sort_keys).decode("utf-8")
+    return _stdlib_dumps(obj, sort_keys)
+
+def loads(data):
+    """Deserialize JSON from str, bytes or bytearray."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
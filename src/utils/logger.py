@@ -1,10 +1,73 @@
+import atexit
 import logging
-from logging.handlers import TimedRotatingFileHandler
+import os
+import queue
+import random
+import reprlib
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
+
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "DEBUG").upper()
+# Logged payloads (prompts, contexts, request bodies) are cut to this many characters
+MAX_PAYLOAD_LENGTH = int(os.environ.get("LOG_MAX_PAYLOAD", "2000"))
+# Fraction of logged payloads that are rendered at all, the others are replaced by a marker
+PAYLOAD_SAMPLE_RATE = float(os.environ.get("LOG_PAYLOAD_SAMPLE_RATE", "1.0"))
+
+_repr = reprlib.Repr()
+_repr.maxlevel = 4
+_repr.maxdict = _repr.maxlist = _repr.maxtuple = _repr.maxset = 20
+_repr.maxstring = _repr.maxother = 120
+
+
+class _Payload:
+    """Renders a logged object only when the record is emitted, capped in length and sampled."""
+
+    __slots__ = ("obj",)
+
+    def __init__(self, obj):
+        self.obj = obj
+
+    def __str__(self):
+        if PAYLOAD_SAMPLE_RATE < 1 and random.random() >= PAYLOAD_SAMPLE_RATE:
+            return "<payload not sampled>"
+        text = self.obj if isinstance(self.obj, str) else _repr.repr(self.obj)
+        if len(text) > MAX_PAYLOAD_LENGTH:
+            return f"{text[:MAX_PAYLOAD_LENGTH]}... [{len(text)} chars]"
+        return text
+
+def payload(obj):
+    """Wrap a large object for lazy %-style logging, e.g. logger.debug("Prompt: %s", payload(prompt))."""
+    return _Payload(obj)
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """
+    Enqueues records unformatted. QueueHandler.prepare formats the message on the logging
+    thread, which would render every payload on the request path; here the listener's
+    handlers format it. Arguments are rendered when the record is written, so they must
+    not be mutated after logging.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+_listener = None
 
 def initialize_logger():
+    """
+    Log to a daily rotating file and the console from a background thread.
+
+    Request threads only put unformatted records on a queue; formatting, including the
+    rendering of payloads, and file writes happen in a QueueListener, which is flushed
+    and stopped at exit.
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
     # Create a custom logger
     logger = logging.getLogger()
-    logger.setLevel(logging.DEBUG)
+    logger.setLevel(LOG_LEVEL)
 
     timed_rotating_handler = TimedRotatingFileHandler('logs/sacm.log', when='midnight', interval=1, backupCount=5)
     console_handler = logging.StreamHandler()
@@ -16,5 +79,9 @@ def initialize_logger():
     timed_rotating_handler.setFormatter(formatter)
     console_handler.setFormatter(formatter)
 
-    logger.addHandler(timed_rotating_handler)
-    logger.addHandler(console_handler)
\ No newline at end of file
+    log_queue = queue.SimpleQueue()
+    _listener = QueueListener(log_queue, timed_rotating_handler, console_handler, respect_handler_level=True)
+    logger.addHandler(_DeferredQueueHandler(log_queue))
+    _listener.start()
+    atexit.register(_listener.stop)
+    return _listener
@@ -6,8 +6,11 @@ Files to and from the server. The interface capability aims to be aligned to
 the current tool capabilities and does not cover the full specification.
 """
 
+import itertools
 import os
-from typing import List
+import re
+import uuid
+from typing import Iterable, Iterator, List, Optional, TextIO, Tuple
 
 from src.sysml2.sysml_client import SysMLClient
 
@@ -35,52 +38,390 @@ def read_sysml_file(file_path: str) -> List[str]:
     return lines
 
 
+# Declarations understood by the importer: (keywords, "def" follows) -> SysML type
+DECLARATION_TYPES = {
+    ("package", False): "Package",
+    ("part", True): "PartDefinition",
+    ("part", False): "PartUsage",
+    ("port", True): "PortDefinition",
+    ("port", False): "PortUsage",
+    ("connection", True): "ConnectionDefinition",
+    ("connection", False): "ConnectionUsage",
+}
+DECLARATION_KEYWORDS = {keyword for keyword, _ in DECLARATION_TYPES}
+MODIFIER_KEYWORDS = {"abstract", "private", "public", "protected", "ref", "in", "out", "inout", "variation"}
+# Annotations that end with their /* body */ instead of a ';'
+ANNOTATION_KEYWORDS = {"doc", "comment"}
+
+_TOKEN_PATTERN = re.compile(
+    r"""
+      (?P<space>\s+)
+    | (?P<line_comment>//[^\n]*(?:\n|$))
+    | (?P<block_comment>/\*.*?\*/)
+    | (?P<name>'(?:[^'\\]|\\.)*')
+    | (?P<ident>[A-Za-z_][A-Za-z0-9_]*)
+    | (?P<symbol>::>|:>>|:>|::|\S)
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+_INCOMPLETE_PREFIXES = ("/*", "'")
+
+
+def tokenize_sysml(stream: TextIO, chunk_size: int = 65536) -> Iterator[Tuple[str, str]]:
+    """
+    Lazily splits SysML text into (kind, text) tokens while reading the stream in chunks.
+
+    Whitespace and line comments are dropped. Block comments are returned with kind
+    'comment', since they end doc and comment annotations. Quoted names are returned
+    unquoted with kind 'name', identifiers and keywords with kind 'ident', everything
+    else with kind 'symbol'. Only the current chunk and a partial token are held in memory.
+
+    Args:
+        stream (TextIO): Text stream to read from.
+        chunk_size (int): Number of characters read at once.
+
+    Yields:
+        Tuple[str, str]: The token kind and text.
+    """
+    buffer = ""
+    eof = False
+    while not eof:
+        chunk = stream.read(chunk_size)
+        eof = not chunk
+        buffer += chunk
+
+        pos = 0
+        while pos < len(buffer):
+            match = _TOKEN_PATTERN.match(buffer, pos)
+            # a token touching the end of the buffer may continue in the next chunk
+            if not eof and (
+                match.end() == len(buffer)
+                or (match.lastgroup == "symbol" and buffer.startswith(_INCOMPLETE_PREFIXES, pos))
+            ):
+                break
+            pos = match.end()
+            kind = match.lastgroup
+            if kind == "name":
+                yield "name", match.group()[1:-1]
+            elif kind == "block_comment":
+                yield "comment", match.group()
+            elif kind in ("ident", "symbol"):
+                yield kind, match.group()
+        buffer = buffer[pos:]
+
+
+def parse_sysml(tokens: Iterable[Tuple[str, str]]) -> Iterator[dict]:
+    """
+    Parses the supported SysML subset into element attributes, one declaration at a time.
+
+    Packages, part, port and connection definitions and usages are recognized,
+    including modifiers such as 'abstract'. '{' opens a scope owned by the declared
+    element and '}' closes it, so each element gets a pre-assigned '@id' and an
+    'owner' reference to its enclosing declaration. Other statements are skipped
+    up to their ';', doc and comment annotations up to their comment body, and
+    unknown blocks are skipped entirely, including their content.
+
+    Args:
+        tokens (Iterable[Tuple[str, str]]): Tokens as produced by tokenize_sysml.
+
+    Yields:
+        dict: Attributes of each declared element in document order (owners first).
+    """
+    scopes: List[Optional[str]] = []     # ids of the enclosing declarations
+    tokens = iter(tokens)
+
+    def skip_statement(token):
+        """Skip to the end of an unsupported statement, including a following block."""
+        annotation = token is not None and token[1] in ANNOTATION_KEYWORDS
+        depth = 0
+        while token is not None:
+            if token[0] == "comment":
+                if annotation and depth == 0:
+                    return
+            elif token[1] == "{":
+                depth += 1
+            elif token[1] == "}":
+                if depth == 0:
+                    # closes the enclosing scope, the statement had no terminator
+                    if scopes:
+                        scopes.pop()
+                    return
+                depth -= 1
+                if depth == 0:
+                    return
+            elif token[1] == ";" and depth == 0:
+                return
+            token = next(tokens, None)
+
+    for token in tokens:
+        kind, text = token
+        if text == "}":
+            if scopes:
+                scopes.pop()
+            continue
+        if kind != "ident":
+            continue
+
+        while token is not None and token[1] in MODIFIER_KEYWORDS:
+            token = next(tokens, None)
+        if token is None:
+            break
+        if token[1] not in DECLARATION_KEYWORDS:
+            skip_statement(token)
+            continue
+
+        keyword = token[1]
+        token = next(tokens, None)
+        is_definition = token is not None and token[1] == "def"
+        if is_definition:
+            token = next(tokens, None)
+        sysml_type = DECLARATION_TYPES.get((keyword, is_definition))
+        if token is None or token[0] not in ("ident", "name") or sysml_type is None:
+            skip_statement(token)
+            continue
+
+        attrs = {"@type": sysml_type, "name": token[1], "@id": str(uuid.uuid4())}
+        if scopes:
+            attrs["owner"] = {"@id": scopes[-1]}
+
+        # skip typing, multiplicity and values up to the end of the declaration
+        token = next(tokens, None)
+        while token is not None and token[1] not in ("{", ";", "}"):
+            token = next(tokens, None)
+
+        yield attrs
+
+        if token is not None and token[1] == "{":
+            scopes.append(attrs["@id"])
+        elif token is not None and token[1] == "}" and scopes:
+            scopes.pop()
+
+
 class FileImporter:
     """
     Parses .sysml files and stages model elements as changes via a SysMLClient.
 
     Attributes:
-        file_content (List[str]): Raw content of the imported file, line by line.
-        changes (List[dict]): Staged changes parsed from the file (not committed).
+        changes (List[dict]): Staged changes parsed from the file, if they were not committed in chunks.
+        element_count (int): Number of elements parsed from the last imported file.
+        commit_ids (List[str]): Commits created while importing in chunks.
     """
 
     def __init__(self):
-        self.file_content: List[str] = []
         self.changes: List[dict] = []
+        self.element_count: int = 0
+        self.commit_ids: List[str] = []
 
-    def interpret(self, client: SysMLClient, file_path: str) -> None:
+    def interpret(self, client: SysMLClient, file_path: str, chunk_size: Optional[int] = None) -> None:
         """
-        Reads a .sysml file and stages model element creation commands.
+        Streams a .sysml file and stages the creation of its model elements.
 
-        The method identifies 'part' and 'part def' declarations line by line,
-        extracts the element names, and instructs the provided SysMLClient
-        to stage creation actions accordingly. Trailing opening braces (' {')
-        are stripped before processing.
+        The file is tokenized and parsed incrementally, tracking '{}' scopes so
+        that every element is created with a pre-assigned id and an 'owner'
+        reference to its enclosing declaration.
 
         Note:
             This method does not check for existing elements on the server.
-            All changes are added to the project handler's local change list,
-            but are not committed or uploaded.
+            Without chunk_size all changes are added to the client's local change
+            list, but are not committed or uploaded. With chunk_size the staged
+            changes are committed every chunk_size elements, so the memory needed
+            stays bounded regardless of the file size. Owners always precede their
+            children in a file, so every chunk only references committed owners.
 
         Args:
             client (SysMLClient): Handler used to stage model changes.
             file_path (str): Path to the .sysml file to interpret.
+            chunk_size (Optional[int]): Number of elements per commit, or None to only stage.
+
+        Raises:
+            ValueError: If file extension is not .sysml or chunk_size is not positive.
+            IOError: If the file has no content.
         """
-        # Save file content for later review
-        self.file_content = read_sysml_file(file_path=file_path)
-        commits_initial = client.change.copy()
-        for line in [l.strip().rstrip(";") for l in self.file_content]:
-            if line.startswith("part def"):
-                content = line[len("part def") :].rstrip("{").strip()
-                client.create_element("PartDefinition", content)
-            elif line.startswith("part"):
-                content = line[len("part") :].rstrip("{").strip()
-                client.create_element("PartUsage", content)
-
-        # Create a deep copy of the new changes for review
-        self.commits = [
-            c.copy() for c in client.change if c not in commits_initial
-        ]
+        if not file_path.endswith(".sysml"):
+            raise ValueError(f"Invalid file type: '{file_path}'. Expected a .sysml file.")
+        if chunk_size is not None and chunk_size < 1:
+            raise ValueError("chunk_size must be positive.")
+
+        self.changes = []
+        self.element_count = 0
+        self.commit_ids = []
+        changes_initial = len(client.change)
+
+        with open(file_path, "r", encoding="utf-8") as file:
+            tokens = tokenize_sysml(file)
+            first = next(tokens, None)
+            if first is None:
+                raise IOError(f"Failed to read the file '{file_path}': No content was found.")
+
+            for attrs in parse_sysml(itertools.chain([first], tokens)):
+                client.create(**attrs)
+                self.element_count += 1
+                if chunk_size and self.element_count % chunk_size == 0:
+                    self._commit_chunk(client)
+
+        if chunk_size:
+            if len(client.change) > changes_initial:
+                self._commit_chunk(client)
+        else:
+            # Keep a copy of the new changes for review
+            self.changes = [c.copy() for c in client.change[changes_initial:]]
+
+    def _commit_chunk(self, client: SysMLClient) -> None:
+        client.commit_and_push(with_delta=False)
+        self.commit_ids.append(client.commit_id)
+
+
+# SysML keywords of the exportable types, inverse of DECLARATION_TYPES
+EXPORT_KEYWORDS = {
+    sysml_type: f"{keyword} def" if is_definition else keyword
+    for (keyword, is_definition), sysml_type in DECLARATION_TYPES.items()
+}
+OVERWRITE_POLICIES = ("prompt", "error", "skip", "overwrite")
+_IDENTIFIER_PATTERN = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+
+
+def format_sysml_name(name: Optional[str]) -> str:
+    """Returns the name as a SysML identifier, quoted if necessary."""
+    if name and _IDENTIFIER_PATTERN.fullmatch(name):
+        return name
+    escaped = (name or "").replace("\\", "\\\\").replace("'", "\\'")
+    return f"'{escaped}'"
+
+
+def stream_sysml_text(elements: Iterable[dict], indent: str = "    ") -> Iterator[str]:
+    """
+    Lazily renders model elements as SysML text following their ownership hierarchy.
+
+    The elements are consumed once to build a compact (type, name, owner) index;
+    the text is then produced line by line in a depth-first walk, so it can be
+    written to a file or an HTTP response without being held in memory. Elements
+    whose owner is not part of the input are treated as roots. Subtrees of types
+    without a SysML notation in this exporter are replaced by a comment.
+
+    Args:
+        elements (Iterable[dict]): Model elements with '@id', '@type', 'name' and optional 'owner'.
+        indent (str): Indentation per nesting level.
+
+    Yields:
+        str: Lines of SysML text, each ending with a newline.
+    """
+    records = {}
+    children = {}
+    for element in elements:
+        element_id = element["@id"]
+        owner = element.get("owner")
+        owner_id = owner.get("@id") if isinstance(owner, dict) else owner
+        records[element_id] = (element.get("@type"), element.get("name"))
+        children.setdefault(owner_id, []).append(element_id)
+
+    roots = [
+        element_id
+        for owner_id, owned in children.items()
+        if owner_id is None or owner_id not in records
+        for element_id in owned
+    ]
+
+    visited = set()
+    # (element id, depth, closing); closing entries emit the '}' of a scope
+    stack = [(element_id, 0, False) for element_id in reversed(roots)]
+    while stack:
+        element_id, depth, closing = stack.pop()
+        prefix = indent * depth
+        if closing:
+            yield f"{prefix}}}\n"
+            continue
+        if element_id in visited:
+            continue
+        visited.add(element_id)
+
+        sysml_type, name = records[element_id]
+        owned = children.get(element_id, [])
+        keyword = EXPORT_KEYWORDS.get(sysml_type)
+        if keyword is None:
+            yield f"{prefix}// skipped {sysml_type} {format_sysml_name(name)} with {len(owned)} owned element(s)\n"
+        elif not owned:
+            yield f"{prefix}{keyword} {format_sysml_name(name)};\n"
+        else:
+            yield f"{prefix}{keyword} {format_sysml_name(name)} {{\n"
+            stack.append((element_id, depth, True))
+            stack.extend((child_id, depth + 1, False) for child_id in reversed(owned))
+
+
+def write_sysml(elements: Iterable[dict], file: TextIO) -> int:
+    """
+    Writes model elements as SysML text to an open file handle, line by line.
+
+    Args:
+        elements (Iterable[dict]): Model elements, see stream_sysml_text.
+        file (TextIO): Writable text file handle.
+
+    Returns:
+        int: Number of lines written.
+    """
+    count = 0
+    for line in stream_sysml_text(elements):
+        file.write(line)
+        count += 1
+    return count
+
+
+def resolve_export_path(file_path: str, overwrite: str = "prompt") -> Optional[str]:
+    """
+    Validates an export target and applies the overwrite policy.
+
+    - Appends '.sysml' if missing; raises an error for other extensions.
+    - Ensures the target directory exists; creates it if necessary.
+    - For existing files: 'prompt' asks on the console, 'error' raises,
+      'skip' cancels the export and 'overwrite' replaces the file.
+
+    Args:
+        file_path (str): Target file path for export.
+        overwrite (str): One of OVERWRITE_POLICIES.
+
+    Returns:
+        Optional[str]: The file path to write to, or None if the export is canceled.
+
+    Raises:
+        ValueError: If the file extension or the overwrite policy is invalid.
+        FileExistsError: If the file exists and the policy is 'error'.
+        OSError: If directory creation fails.
+    """
+    if overwrite not in OVERWRITE_POLICIES:
+        raise ValueError(f"Invalid overwrite policy '{overwrite}'. Expected one of {OVERWRITE_POLICIES}.")
+
+    # Ensure correct file extension
+    base, ext = os.path.splitext(file_path)
+    if not ext:
+        file_path += ".sysml"
+    elif ext != ".sysml":
+        raise ValueError(
+            f"Invalid file extension '{ext}'. Only '.sysml' is allowed."
+        )
+
+    # Ensure directory exists
+    folder = os.path.dirname(file_path)
+    if folder and not os.path.exists(folder):
+        try:
+            os.makedirs(folder, exist_ok=True)
+        except OSError as e:
+            raise OSError(f"Failed to access or create directory '{folder}': {e}")
+
+    if os.path.exists(file_path):
+        if overwrite == "error":
+            raise FileExistsError(f"File '{file_path}' already exists.")
+        if overwrite == "skip":
+            return None
+        if overwrite == "prompt":
+            confirm = (
+                input(f"File '{file_path}' already exists. Overwrite? [y/N]: ")
+                .strip()
+                .lower()
+            )
+            if confirm != "y":
+                print("Export canceled.")
+                return None
+
+    return file_path
 
 
 class FileExporter:
@@ -157,52 +498,62 @@ class FileExporter:
                 for p in parts:
                     write_line(f"part {p['name']}")
 
-        print(file_contents)
         self.file_contents = file_contents
 
-    def export_to_file(self, file_path: str) -> None:
+    def export_to_file(self, file_path: str, overwrite: str = "prompt") -> None:
         """
         Writes the file_contents to a .sysml file at the specified path.
 
-        - Ensures the target directory exists; creates it if necessary.
-        - Appends '.sysml' if missing; raises an error for other extensions.
-        - Prompts before overwriting an existing file.
+        See resolve_export_path for the handling of the path and existing files.
 
         Args:
             file_path (str): Target file path for export.
+            overwrite (str): Policy for existing files, one of OVERWRITE_POLICIES.
 
         Raises:
             ValueError: If the file extension is not '.sysml' or is invalid.
             OSError: If directory creation or file writing fails.
         """
-        # Ensure correct file extension
-        base, ext = os.path.splitext(file_path)
-        if not ext:
-            file_path += ".sysml"
-        elif ext != ".sysml":
-            raise ValueError(
-                f"Invalid file extension '{ext}'. Only '.sysml' is allowed."
-            )
-
-        # Ensure directory exists
-        folder = os.path.dirname(file_path)
-        if folder and not os.path.exists(folder):
-            try:
-                os.makedirs(folder, exist_ok=True)
-            except OSError as e:
-                raise OSError(f"Failed to access or create directory '{folder}': {e}")
-
-        # Confirm overwrite if file exists
-        if os.path.exists(file_path):
-            confirm = (
-                input(f"File '{file_path}' already exists. Overwrite? [y/N]: ")
-                .strip()
-                .lower()
-            )
-            if confirm != "y":
-                print("Export canceled.")
-                return
+        file_path = resolve_export_path(file_path, overwrite)
+        if file_path is None:
+            return
 
         # Write file contents
         with open(file_path, "w", encoding="utf-8") as f:
             f.writelines(self.file_contents)
+
+    def export_elements(self, elements: Iterable[dict], file_path: str, overwrite: str = "error") -> Optional[str]:
+        """
+        Streams model elements, e.g. of a commit snapshot, into a .sysml file.
+
+        The text follows the ownership hierarchy and is written incrementally to a
+        temporary file next to the target, which then replaces the target. Memory
+        use is bounded by a compact index of the elements, not by the text size,
+        and no console I/O happens unless the 'prompt' policy is chosen.
+
+        Args:
+            elements (Iterable[dict]): Model elements, see stream_sysml_text.
+            file_path (str): Target file path for export.
+            overwrite (str): Policy for existing files, one of OVERWRITE_POLICIES.
+
+        Returns:
+            Optional[str]: The written file path, or None if the export was skipped.
+
+        Raises:
+            ValueError: If the file extension or the overwrite policy is invalid.
+            FileExistsError: If the file exists and the policy is 'error'.
+            OSError: If directory creation or file writing fails.
+        """
+        file_path = resolve_export_path(file_path, overwrite)
+        if file_path is None:
+            return None
+
+        temp_path = f"{file_path}.part"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                write_sysml(elements, f)
+            os.replace(temp_path, file_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return file_path
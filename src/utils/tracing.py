@@ -0,0 +1,177 @@
+import atexit
+import contextvars
+import functools
+import logging
+import os
+import queue
+import re
+import time
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from src.utils.json_codec import dumps
+logger = logging.getLogger(__name__)
+
+# Finished spans are appended to this file as JSON lines, an empty value disables the sink
+TRACE_FILE = os.environ.get("TRACE_FILE", "logs/traces.jsonl")
+TRACE_MAX_BYTES = int(os.environ.get("TRACE_MAX_BYTES", str(10 * 1024 * 1024)))
+TRACE_BACKUP_COUNT = int(os.environ.get("TRACE_BACKUP_COUNT", "5"))
+
+# W3C trace context: version-trace_id-parent_id-flags
+_TRACEPARENT = re.compile(r"^[0-9a-f]{2}-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+_TRACE_ID = re.compile(r"^[0-9A-Za-z-]{1,64}$")
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+_collector = contextvars.ContextVar("span_collector", default=None)
+
+# spans are written by a QueueListener thread, not on the request thread
+_sink = logging.getLogger("sacm.trace")
+_sink.propagate = False
+_sink.setLevel(logging.INFO)
+_sink_listener = None
+
+
+def new_trace_id():
+    return os.urandom(16).hex()
+
+def new_span_id():
+    return os.urandom(8).hex()
+
+
+class Span:
+    """A timed operation of a trace; attributes can be added while it is open."""
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "attributes", "start", "duration_ms", "error", "_t0")
+
+    def __init__(self, name, trace_id, parent_id, attributes):
+        self.trace_id = trace_id
+        self.span_id = new_span_id()
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes
+        self.start = time.time()
+        self.duration_ms = None
+        self.error = None
+        self._t0 = time.perf_counter()
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def record(self):
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration_ms": self.duration_ms,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+def current_trace_id():
+    """Return the trace id of the open span, or None outside of a trace."""
+    current = _current_span.get()
+    return current.trace_id if current is not None else None
+
+@contextmanager
+def span(name, trace_id=None, parent_id=None, **attributes):
+    """
+    Time the enclosed block as a child of the open span.
+
+    A trace_id (and optionally the parent_id of a remote caller) starts a new
+    trace; without an open span a new trace id is generated.
+    """
+    parent = _current_span.get()
+    if trace_id is None and parent is not None:
+        trace_id, parent_id = parent.trace_id, parent.span_id
+    current = Span(name, trace_id or new_trace_id(), parent_id, attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current.duration_ms = round((time.perf_counter() - current._t0) * 1000, 3)
+        _current_span.reset(token)
+        _finish(current)
+
+def traced(name):
+    """Decorator that wraps every call of the function in a span."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def bind_context(func):
+    """Wrap func to run in a copy of the caller's context, so spans on pool threads join the trace."""
+    context = contextvars.copy_context()
+    def wrapper(*args, **kwargs):
+        return context.copy().run(func, *args, **kwargs)
+    return wrapper
+
+
+def _finish(finished):
+    spans = _collector.get()
+    if spans is not None:
+        spans.append(finished)
+    if _sink_listener is not None:
+        _sink.info(dumps(finished.record()))
+
+@contextmanager
+def collect_spans():
+    """Collect the spans finished in the enclosed block, including those of bound pool threads."""
+    spans = []
+    token = _collector.set(spans)
+    try:
+        yield spans
+    finally:
+        _collector.reset(token)
+
+def span_tree(spans):
+    """Nest collected spans below their parents, in start order, as a summary for responses."""
+    nodes = {}
+    for s in sorted(spans, key=lambda s: s.start):
+        nodes[s.span_id] = {"name": s.name, "duration_ms": s.duration_ms, "children": []}
+        if s.attributes:
+            nodes[s.span_id]["attributes"] = s.attributes
+        if s.error:
+            nodes[s.span_id]["error"] = s.error
+
+    roots = []
+    for s in sorted(spans, key=lambda s: s.start):
+        parent = nodes.get(s.parent_id)
+        (parent["children"] if parent is not None else roots).append(nodes[s.span_id])
+    return roots
+
+
+def trace_from_headers(headers):
+    """Return (trace_id, parent_id) of an incoming request's traceparent or X-Trace-Id header."""
+    match = _TRACEPARENT.match(headers.get("traceparent", "").strip().lower())
+    if match and set(match.group(1)) != {"0"}:
+        return match.group(1), match.group(2)
+    trace_id = headers.get("X-Trace-Id", "").strip()
+    if _TRACE_ID.match(trace_id):
+        return trace_id, None
+    return None, None
+
+
+def initialize_tracing():
+    """Write finished spans to the rotating TRACE_FILE from a background thread."""
+    global _sink_listener
+    if _sink_listener is not None or not TRACE_FILE:
+        return _sink_listener
+
+    handler = RotatingFileHandler(TRACE_FILE, maxBytes=TRACE_MAX_BYTES, backupCount=TRACE_BACKUP_COUNT)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    span_queue = queue.SimpleQueue()
+    _sink_listener = QueueListener(span_queue, handler)
+    _sink.addHandler(QueueHandler(span_queue))
+    _sink_listener.start()
+    atexit.register(_sink_listener.stop)
+    logger.info("Writing trace spans to %s", TRACE_FILE)
+    return _sink_listener
@@ -0,0 +1,233 @@
+import os
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.change.plan_cache import plan_cache
+from src.sysml2.commit_queue import CommitResult
+from src.sysml2.snapshot import ModelSnapshot
+from src.sysml2.validation import ChangeValidationError
+
+# the engine sets up the chat model and token counter on import
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("OPENAI_API_MODEL", "gpt-4o-mini")
+engine = pytest.importorskip("src.change.engine")
+
+
+# -------------------------------
+# Fixtures
+# -------------------------------
+
+
+ELEMENTS = [
+    {"@id": "m", "@type": "PartDefinition", "name": "CoffeeMachine"},
+    {"@id": "p", "@type": "PartUsage", "name": "WaterPump", "owner": {"@id": "m"}},
+]
+
+
+class FakeValidator:
+
+    def __init__(self, reject=False):
+        self.reject = reject
+        self.errors = []
+
+    def check_create(self, attrs):
+        self._check(attrs)
+
+    def check_update(self, element_id, attrs):
+        self._check(attrs)
+
+    def check_delete(self, element_id, sysml_type=None):
+        self._check({"element_id": element_id})
+
+    def _check(self, attrs):
+        if self.reject:
+            self.errors.append(f"Rejected {attrs}")
+            raise ChangeValidationError(f"Rejected {attrs}")
+
+
+class FakeClient:
+    """SysMLClient on a fixed snapshot that records the staged and pushed changes."""
+
+    instances = []
+    reject_first_plan = False
+
+    def __init__(self):
+        FakeClient.instances.append(self)
+        self.pushed = None
+
+    def initialize(self, project_id, branch_id):
+        self.project_id, self.branch_id = project_id, branch_id
+        self.commit_id = "c1"
+        self.parent_commit_id, self.coalesced = None, False
+        self.snapshot = ModelSnapshot("c1", ELEMENTS)
+        self.change = []
+        self.validator = FakeValidator(reject=FakeClient.reject_first_plan)
+
+    def create(self, **attrs):
+        self.change.append({"identity": {"@id": attrs.pop("@id", "new")}, "payload": attrs})
+
+    def update(self, element_id, **attrs):
+        self.change.append({"identity": {"@id": element_id}, "payload": attrs})
+
+    def delete(self, element_id):
+        self.change.append({"identity": {"@id": element_id}, "payload": None})
+
+    def discard_change(self):
+        self.change = []
+        self.validator = FakeValidator()
+
+    def optimize_change(self):
+        return self.change
+
+    def commit_and_push(self):
+        self.pushed = list(self.change)
+        delta = self.snapshot.preview_change(self.change)
+        self.commit_id, self.parent_commit_id, self.coalesced = "c2", "c1", False
+        return delta
+
+
+class FakeContextManager:
+
+    def __init__(self, client):
+        self.retrieval = {"mode": "fixed", "k": 1, "hits": [{"id": "p", "score": 0.9}]}
+
+    def create_context(self, query):
+        return ['{"@id": "p", "@type": "PartUsage", "name": "WaterPump"}']
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    FakeClient.instances = []
+    FakeClient.reject_first_plan = False
+    send = MagicMock(return_value=(
+        [{"name": "update", "args": {"element_id": "p", "attrs": {"@type": "PartUsage", "name": "MainPump"}}}], 100, 10,
+    ))
+    monkeypatch.setattr(engine, "SysMLClient", FakeClient)
+    monkeypatch.setattr(engine, "ContextManager", FakeContextManager)
+    monkeypatch.setattr(engine, "send_llm_request", send)
+    monkeypatch.setattr(engine, "_naive_input_tokens", lambda client, change_request: 1000)
+    monkeypatch.setattr(engine, "RULE_PATH", True)
+    return send
+
+
+# -------------------------------
+# Tests for the rule path
+# -------------------------------
+
+
+def test_rule_plan_is_committed_without_the_llm(llm):
+    result, code = engine.run("proj", "main", "Rename WaterPump to MainPump")
+
+    assert code == 200
+    llm.assert_not_called()
+    assert result["path"] == "rule"
+    assert result["intent"] == "rename"
+    assert result["model"] is None and result["retrieval"] is None
+    assert FakeClient.instances[0].pushed == [
+        {"identity": {"@id": "p"}, "payload": {"@type": "PartUsage", "name": "MainPump"}},
+    ]
+
+
+def test_invalid_rule_plan_falls_back_to_the_llm(llm):
+    FakeClient.reject_first_plan = True
+
+    result, code = engine.run("proj", "main", "Rename WaterPump to MainPump")
+
+    assert code == 200
+    llm.assert_called_once()
+    assert result["path"] == "llm"
+    assert result["intent"] is None
+    assert result["model"]["name"]
+    assert result["retrieval"]["hits"] == [{"id": "p", "score": 0.9}]
+    assert FakeClient.instances[0].pushed == [
+        {"identity": {"@id": "p"}, "payload": {"@type": "PartUsage", "name": "MainPump"}},
+    ]
+
+
+def test_other_requests_are_planned_by_the_llm(llm):
+    result, code = engine.run("proj", "main", "Make the pump more efficient")
+
+    assert code == 200
+    llm.assert_called_once()
+    assert set(result) >= {"path", "intent", "model", "retrieval"}
+    assert result["path"] == "llm"
+
+
+# -------------------------------
+# Tests for applying stored plans
+# -------------------------------
+
+
+class FakeQueue:
+
+    def __init__(self):
+        self.submitted = []
+
+    def submit_change(self, base_commit_id, change, progress=None):
+        self.submitted.append((base_commit_id, change))
+        return CommitResult("c2", base_commit_id, False)
+
+
+@pytest.fixture
+def branch(llm, monkeypatch):
+    """Branch with HEAD at c1 and a recording commit queue; set branch["head"] to move HEAD."""
+    state = {"head": "c1", "queue": FakeQueue()}
+    monkeypatch.setattr(engine, "get_project_branch", lambda project_id, branch_id: {"head": {"@id": state["head"]}})
+    monkeypatch.setattr(engine, "get_commit_queue", lambda project_id, branch_id: state["queue"])
+    return state
+
+
+def test_apply_commits_exactly_the_stored_change(branch):
+    planned, code = engine.plan("proj", "main", "Rename WaterPump to MainPump")
+    assert code == 200
+
+    result, code = engine.apply("proj", "main", planned["plan_id"])
+
+    assert code == 200
+    assert branch["queue"].submitted == [("c1", planned["change"])]
+    assert result["commit_id"] == "c2" and result["parent_commit_id"] == "c1"
+    assert result["changes"]["updated"] == [
+        {"@id": "p", "@type": "PartUsage", "name": "MainPump", "owner": {"@id": "m"}},
+    ]
+    assert plan_cache.get(planned["plan_id"]) is None
+
+
+def test_apply_does_not_reload_the_snapshot(branch, monkeypatch):
+    planned, _ = engine.plan("proj", "main", "Rename WaterPump to MainPump")
+    monkeypatch.setattr(ModelSnapshot, "preview_change", MagicMock(side_effect=AssertionError("snapshot reloaded")))
+
+    result, code = engine.apply("proj", "main", planned["plan_id"])
+
+    assert code == 200
+    assert len(result["changes"]["updated"]) == 1
+
+
+def test_apply_after_head_moved_is_a_conflict(branch):
+    planned, _ = engine.plan("proj", "main", "Rename WaterPump to MainPump")
+    branch["head"] = "c9"
+
+    result, code = engine.apply("proj", "main", planned["plan_id"])
+
+    assert code == 409
+    assert branch["queue"].submitted == []
+    assert plan_cache.get(planned["plan_id"]) is None
+
+
+# -------------------------------
+# Tests for the naive token count
+# -------------------------------
+
+
+def test_naive_tokens_count_the_model_once_per_commit(monkeypatch):
+    client = FakeClient()
+    client.initialize("proj", "main")
+    client.get_all_elements = MagicMock(return_value=ELEMENTS)
+    monkeypatch.setattr(engine, "create_llm_prompt", lambda context, user_request: (context, 100))
+    monkeypatch.setattr(engine, "count_tokens", len)
+    monkeypatch.setattr(engine, "get_projection", lambda name: MagicMock(project_many=lambda elements: elements))
+    monkeypatch.setattr(engine, "_naive_model_tokens", engine.OrderedDict())
+
+    assert engine._naive_input_tokens(client, "abc") == 103
+    assert engine._naive_input_tokens(client, "abcdef") == 106
+    client.get_all_elements.assert_called_once()
@@ -0,0 +1,107 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.change.intent import name_index, parse_intent
+from src.sysml2.snapshot import ModelSnapshot
+from src.sysml2.tooling import TOOLS_BY_NAME, execute_tool
+
+
+# -------------------------------
+# Fixtures
+# -------------------------------
+
+
+@pytest.fixture
+def snapshot():
+    return ModelSnapshot("c1", [
+        {"@id": "m", "@type": "PartDefinition", "name": "CoffeeMachine", "qualifiedName": "CoffeeMachine"},
+        {"@id": "w", "@type": "PartDefinition", "name": "WaterSubsystem", "owner": {"@id": "m"},
+         "qualifiedName": "CoffeeMachine::WaterSubsystem"},
+        {"@id": "p", "@type": "PartUsage", "name": "WaterPump", "owner": {"@id": "w"},
+         "qualifiedName": "CoffeeMachine::WaterSubsystem::WaterPump"},
+        {"@id": "b", "@type": "PartDefinition", "name": "BrewingSubsystem", "owner": {"@id": "m"},
+         "qualifiedName": "CoffeeMachine::BrewingSubsystem"},
+        {"@id": "s1", "@type": "PartUsage", "name": "TemperatureSensor", "owner": {"@id": "w"},
+         "qualifiedName": "CoffeeMachine::WaterSubsystem::TemperatureSensor"},
+        {"@id": "s2", "@type": "PartUsage", "name": "TemperatureSensor", "owner": {"@id": "b"},
+         "qualifiedName": "CoffeeMachine::BrewingSubsystem::TemperatureSensor"},
+    ])
+
+
+# -------------------------------
+# Tests for parse_intent
+# -------------------------------
+
+
+@pytest.mark.parametrize("request_text", [
+    "Rename WaterPump to CirculationPump",
+    "rename the water pump to CirculationPump.",
+    "Please rename 'CoffeeMachine::WaterSubsystem::WaterPump' to \"CirculationPump\"",
+])
+def test_rename(snapshot, request_text):
+    intent = parse_intent(request_text, snapshot)
+
+    assert intent.action == "rename"
+    assert intent.tool_calls == [{
+        "name": "update",
+        "args": {"element_id": "p", "attrs": {"@type": "PartUsage", "name": "CirculationPump"}},
+    }]
+
+
+def test_delete_leaf_and_subtree(snapshot):
+    assert parse_intent("Delete the water pump", snapshot).tool_calls == [
+        {"name": "delete", "args": {"element_id": "p", "type": "PartUsage"}},
+    ]
+    assert parse_intent("Remove WaterSubsystem", snapshot).tool_calls == [
+        {"name": "delete_many", "args": {"selector": {"subtree": "w"}}},
+    ]
+
+
+def test_owner_disambiguates_delete(snapshot):
+    intent = parse_intent("Delete the temperature sensor from the brewing subsystem", snapshot)
+
+    assert intent.tool_calls[0]["args"]["element_id"] == "s2"
+
+
+def test_add_part(snapshot):
+    intent = parse_intent("Add a part Grinder under the BrewingSubsystem", snapshot)
+
+    assert intent.action == "add_part"
+    assert intent.tool_calls == [{
+        "name": "create",
+        "args": {"attrs": {"@type": "PartUsage", "name": "Grinder", "owner": {"@id": "b"}}},
+    }]
+
+
+@pytest.mark.parametrize("request_text", [
+    "Delete the temperature sensor",                         # two elements with that name
+    "Rename the heater to ThermoBlock",                      # no such element
+    "Add a part WaterPump to the water subsystem",           # already exists
+    "Add a milk frother to the brewing subsystem",           # not a named part
+    "Rename WaterPump to MainPump and delete the WaterSubsystem",
+    "Move the WaterPump into the BrewingSubsystem",
+])
+def test_unclear_requests_are_left_to_the_llm(snapshot, request_text):
+    assert parse_intent(request_text, snapshot) is None
+
+
+def test_name_index_follows_the_snapshot_commit(snapshot):
+    assert "waterpump" in name_index(snapshot)
+
+    snapshot.apply_change([{"identity": {"@id": "p"}, "payload": {"@type": "PartUsage", "name": "MainPump"}}], "c2")
+
+    assert "mainpump" in name_index(snapshot)
+
+
+def test_tool_calls_run_through_the_handlers(snapshot):
+    client = MagicMock()
+    client.snapshot = snapshot
+
+    for tool_call in parse_intent("Rename WaterPump to MainPump", snapshot).tool_calls:
+        execute_tool(TOOLS_BY_NAME, tool_call, client)
+    for tool_call in parse_intent("Add part Grinder to BrewingSubsystem", snapshot).tool_calls:
+        execute_tool(TOOLS_BY_NAME, tool_call, client)
+
+    client.update.assert_called_once_with("p", **{"@type": "PartUsage", "name": "MainPump"})
+    client.create.assert_called_once_with(**{"@type": "PartUsage", "name": "Grinder", "owner": {"@id": "b"}})
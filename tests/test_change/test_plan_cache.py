@@ -0,0 +1,37 @@
+from unittest.mock import patch
+
+from src.change.plan_cache import PlanCache
+
+
+def test_put_and_get_returns_plan_with_id():
+    cache = PlanCache(max_size=2, ttl=60)
+
+    plan_id = cache.put({"change": []})
+
+    assert cache.get(plan_id) == {"change": [], "plan_id": plan_id}
+
+
+def test_oldest_plan_is_evicted():
+    cache = PlanCache(max_size=2, ttl=60)
+    first = cache.put({})
+    cache.put({})
+    cache.put({})
+
+    assert cache.get(first) is None
+
+
+def test_expired_plan_is_not_returned():
+    cache = PlanCache(max_size=2, ttl=10)
+    with patch("src.change.plan_cache.time.monotonic", return_value=100.0):
+        plan_id = cache.put({})
+    with patch("src.change.plan_cache.time.monotonic", return_value=111.0):
+        assert cache.get(plan_id) is None
+
+
+def test_discard_removes_plan():
+    cache = PlanCache()
+    plan_id = cache.put({})
+
+    cache.discard(plan_id)
+
+    assert cache.get(plan_id) is None
@@ -0,0 +1,54 @@
+import pytest
+
+from src.change.router import RequestFeatures, request_features, route
+
+
+def context(size):
+    return [f'{{"@id": "e{i}"}}' for i in range(size)]
+
+
+# -------------------------------
+# Tests for request_features
+# -------------------------------
+
+
+def test_features_of_a_rename():
+    features = request_features("Rename WaterPump to CirculationPump", context(5))
+
+    assert features == RequestFeatures(sub_requests=1, verbs=1, targets=2, context_elements=5, structural=False)
+
+
+def test_features_of_a_compound_structural_request():
+    features = request_features("Move the 'Temperature Sensor' to the BrewChamber and delete the DripTray", context(3))
+
+    assert features.sub_requests == 2
+    assert features.verbs == 2
+    assert features.targets == 3
+    assert features.structural
+
+
+# -------------------------------
+# Tests for route
+# -------------------------------
+
+
+@pytest.mark.parametrize("request_text", [
+    "Rename WaterPump to CirculationPump",
+    "Delete the drip tray",
+    "Add a milk frother to the BrewingSubsystem",
+])
+def test_simple_requests_go_to_the_fast_model(request_text):
+    assert route(request_features(request_text, context(10)))[0] == "fast"
+
+
+@pytest.mark.parametrize("request_text, reason", [
+    ("Move the SafetyController into the PowerSubsystem", "structural edit"),
+    ("Rename the grinder motor to BurrMotor and delete the bean hopper", "compound request"),
+    ("Add a FlowMeter, a PressureGauge and a ReliefValve to the WaterSubsystem", "4 target elements"),
+])
+def test_complex_requests_go_to_the_strong_model(request_text, reason):
+    assert route(request_features(request_text, context(10))) == ("strong", reason)
+
+
+def test_large_contexts_go_to_the_strong_model():
+    assert route(request_features("Delete the drip tray", context(500)))[0] == "strong"
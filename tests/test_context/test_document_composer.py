@@ -0,0 +1,64 @@
+from src.context.document_composer import DocumentComposer, OwnerPaths
+from src.sysml2.snapshot import ModelSnapshot
+
+
+# -------------------------------
+# Fixtures
+# -------------------------------
+
+
+def snapshot():
+    return ModelSnapshot("c1", [
+        {"@id": "v", "@type": "PartDefinition", "declaredName": "Vehicle"},
+        {"@id": "p", "@type": "PartUsage", "name": "powertrain", "owner": {"@id": "v"}},
+        {"@id": "e", "@type": "PartUsage", "name": "engine", "owner": {"@id": "p"}},
+    ])
+
+
+# -------------------------------
+# Tests for OwnerPaths
+# -------------------------------
+
+
+def test_owner_paths_follow_the_ownership_chain():
+    paths = OwnerPaths(snapshot())
+
+    assert paths("e") == "Vehicle::powertrain"
+    assert paths("p") == "Vehicle"
+    assert paths("v") == ""
+
+
+def test_owner_paths_of_unknown_owner_are_empty():
+    paths = OwnerPaths(ModelSnapshot("c1", [
+        {"@id": "x", "@type": "PartUsage", "owner": {"@id": "missing"}},
+        {"@id": "y", "@type": "PartUsage", "owner": {"@id": "x"}},
+    ]))
+
+    assert paths("x") == ""
+    assert paths("y") == "<unnamed>"
+
+
+# -------------------------------
+# Tests for DocumentComposer
+# -------------------------------
+
+
+def test_compose_writes_type_name_path_and_scalar_attributes():
+    composer = DocumentComposer(attributes=["isAbstract", "body", "owner"])
+    element = {"@id": "e", "@type": "PartUsage", "name": "engine", "isAbstract": False, "owner": {"@id": "p"}}
+
+    text = composer.compose(element, "Vehicle::powertrain")
+
+    assert text == "PartUsage engine\nin Vehicle::powertrain\nisAbstract: false"
+
+
+def test_compose_truncates_long_values():
+    composer = DocumentComposer(attributes=["body"], max_value_length=5)
+
+    assert composer.compose({"@type": "Comment", "body": "abcdefgh"}) == "Comment\nbody: abcde…"
+
+
+def test_compose_writes_all_scalar_attributes_by_default():
+    element = {"@id": "e", "@type": "PartUsage", "name": "engine", "owner": {"@id": "p"}, "isAbstract": True}
+
+    assert DocumentComposer().compose(element) == "PartUsage engine\nisAbstract: true"
@@ -0,0 +1,33 @@
+import pytest
+
+from src.context.query_splitter import split_request
+
+
+@pytest.mark.parametrize("request_text, expected", [
+    (
+        "add a grinder to the bean subsystem and remove the water filter",
+        ["add a grinder to the bean subsystem", "remove the water filter"],
+    ),
+    (
+        "Rename the pump to MainPump; delete the heater. Add a sensor to the brewing subsystem",
+        ["Rename the pump to MainPump", "delete the heater", "Add a sensor to the brewing subsystem"],
+    ),
+    (
+        "add a grinder, then move the hopper to the water subsystem",
+        ["add a grinder", "move the hopper to the water subsystem"],
+    ),
+])
+def test_compound_requests_are_split(request_text, expected):
+    assert split_request(request_text) == expected
+
+
+@pytest.mark.parametrize("request_text", [
+    "Rename my element from X to Y",
+    "add a part for water and coffee beans",
+])
+def test_simple_requests_are_kept(request_text):
+    assert split_request(request_text) == [request_text]
+
+
+def test_empty_request_is_kept():
+    assert split_request("") == [""]
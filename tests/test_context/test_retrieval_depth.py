@@ -0,0 +1,37 @@
+from src.context.retrieval_depth import select_hits
+
+
+def hits(*scores):
+    return [(f"doc{i}", score) for i, score in enumerate(scores)]
+
+
+def test_hits_below_the_threshold_are_dropped():
+    selected = select_hits(hits(0.8, 0.75, 0.5, 0.2), score_threshold=0.4)
+
+    assert selected == [("doc0", 0.8), ("doc1", 0.75), ("doc2", 0.5)]
+
+
+def test_hits_far_below_the_best_score_are_dropped():
+    # a clear-cut request: one strong hit, the rest are noise
+    selected = select_hits(hits(0.9, 0.5, 0.48, 0.47), score_threshold=0.3, drop_off=0.25)
+
+    assert [doc for doc, _ in selected] == ["doc0"]
+
+
+def test_ambiguous_requests_keep_more_hits_up_to_max_k():
+    selected = select_hits(hits(*[0.6 - i * 0.01 for i in range(30)]), max_k=12, score_threshold=0.3, drop_off=0.25)
+
+    assert len(selected) == 12
+
+
+def test_min_k_hits_are_kept_regardless_of_their_score():
+    selected = select_hits(hits(0.1, 0.05, 0.01), min_k=2, score_threshold=0.5)
+
+    assert [doc for doc, _ in selected] == ["doc0", "doc1"]
+
+
+def test_hits_are_ordered_by_score():
+    selected = select_hits([("b", 0.5), ("a", 0.7)])
+
+    assert selected == [("a", 0.7), ("b", 0.5)]
+    assert select_hits([]) == []
@@ -0,0 +1,121 @@
+import os
+
+import pytest
+
+from src.context import retrieval_config
+from src.context.retrieval_config import load_retrieval_config, validate_retrieval_config, write_retrieval_config
+from src.context.retrieval_eval import (
+    EvalCase, build_model, choose, evaluate, load_cases, load_seed_models, pareto_front, synthetic_cases,
+    synthetic_model,
+)
+from src.utils.json_codec import dumps
+
+ROOT = os.path.join(os.path.dirname(__file__), "..", "..")
+
+
+# -------------------------------
+# Fixtures
+# -------------------------------
+
+
+@pytest.fixture
+def models():
+    return load_seed_models(os.path.join(ROOT, "demo", "seeder", "data.yaml"))
+
+
+def result(k, recall, tokens):
+    return {"settings": {"k": k, "multi_query": False, "expand_related": True}, "recall": recall, "complete": recall, "tokens": tokens}
+
+
+# -------------------------------
+# Tests for models and cases
+# -------------------------------
+
+
+def test_build_model_assigns_stable_ids_owner_first():
+    tree = [{"name": "Root", "type": "PartDefinition", "children": [{"name": "Pump", "type": "PartUsage"}]}]
+    first, second = build_model("M", tree), build_model("M", tree)
+
+    assert first == second
+    assert [e["qualifiedName"] for e in first] == ["Root", "Root::Pump"]
+    assert first[1]["owner"] == {"@id": first[0]["@id"]}
+
+
+def test_labelled_cases_resolve_against_the_seed_models(models):
+    cases = load_cases(models, os.path.join(ROOT, "benchmarks", "retrieval_cases.yaml"))
+
+    assert cases
+    ids = {e["@id"] for e in models["Coffee Machine"]}
+    assert all(case.required_ids <= ids for case in cases)
+
+
+def test_synthetic_model_and_cases():
+    elements = synthetic_model("Synthetic", 500)
+    names = [e["name"] for e in elements]
+
+    assert len(elements) == 500
+    assert len(set(names)) == len(names)
+    cases = synthetic_cases("Synthetic", elements, 10)
+    assert len(cases) == 10
+    assert all(len(case.required_ids) == 1 for case in cases)
+
+
+# -------------------------------
+# Tests for the evaluation
+# -------------------------------
+
+
+def test_evaluate_measures_recall_and_tokens():
+    cases = [EvalCase("M", "rename a", frozenset(["a"])), EvalCase("M", "move b", frozenset(["b", "c"]))]
+    contexts = {"rename a": ["a", "x"], "move b": ["b"]}
+
+    def retrieve(case, settings):
+        return [dumps({"@id": i}) for i in contexts[case.request][:settings["k"]]]
+
+    results = evaluate(retrieve, cases, len, [{"k": 1}, {"k": 2}])
+
+    assert [r["recall"] for r in results] == [0.75, 0.75]
+    assert [r["complete"] for r in results] == [0.5, 0.5]
+    assert results[0]["tokens"] < results[1]["tokens"]
+
+
+def test_pareto_front_and_choice():
+    results = [result(1, 0.5, 100), result(3, 0.9, 300), result(5, 0.89, 500), result(8, 0.91, 800), result(2, 0.4, 200)]
+    front = pareto_front(results)
+
+    assert [r["settings"]["k"] for r in front] == [1, 3, 8]
+    assert choose(front, tolerance=0.02)["settings"]["k"] == 3
+    assert choose(front, tolerance=0)["settings"]["k"] == 8
+
+
+# -------------------------------
+# Tests for the retrieval config
+# -------------------------------
+
+
+def test_retrieval_config_round_trip(tmp_path):
+    path = str(tmp_path / "config" / "retrieval.json")
+    write_retrieval_config({"k": 8, "multi_query": True}, path, evaluation={"recall": 0.9})
+
+    assert load_retrieval_config(path) == {**retrieval_config.DEFAULTS, "k": 8, "multi_query": True}
+
+
+def test_missing_or_invalid_config_falls_back_to_defaults(tmp_path):
+    path = tmp_path / "retrieval.json"
+    assert load_retrieval_config(str(path)) == retrieval_config.DEFAULTS
+
+    path.write_text('{"k": 0}')
+    assert load_retrieval_config(str(path)) == retrieval_config.DEFAULTS
+    with pytest.raises(ValueError):
+        validate_retrieval_config({"expand_related": "yes"})
+
+
+@pytest.mark.parametrize("config", [
+    {"min_k": 5, "max_k": 3},
+    {"score_threshold": 1.5},
+    {"drop_off": -0.1},
+    {"adaptive": 1},
+])
+def test_invalid_adaptive_settings_are_rejected(config):
+    with pytest.raises(ValueError):
+        validate_retrieval_config(config)
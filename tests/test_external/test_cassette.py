@@ -0,0 +1,105 @@
+from unittest.mock import patch
+
+import pytest
+import requests
+
+from src.external import cassette, rest_service
+from src.external.cassette import Cassette, CassetteMissError
+
+
+# -------------------------------
+# Fixtures
+# -------------------------------
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "cassettes" / "run.jsonl")
+
+
+def use(monkeypatch, active):
+    monkeypatch.setattr(cassette, "_cassette", active)
+    monkeypatch.setattr(cassette, "CASSETTE_MODE", active.mode)
+    return active
+
+
+def live_response(status_code, text):
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers["Content-Type"] = "application/json"
+    response._content = text.encode("utf-8")
+    return response
+
+
+# -------------------------------
+# Tests for REST interactions
+# -------------------------------
+
+
+def test_rest_calls_are_replayed_without_network(monkeypatch, path):
+    use(monkeypatch, Cassette(path, "record"))
+    with patch("src.external.rest_service.requests.request", return_value=live_response(200, '{"@id":"p1"}')):
+        assert rest_service.send_request("GET", "/projects/p1").json() == {"@id": "p1"}
+
+    use(monkeypatch, Cassette(path, "replay"))
+    with patch("src.external.rest_service.requests.request", side_effect=AssertionError("network access")):
+        response = rest_service.send_request("GET", "/projects/p1")
+    assert response.status_code == 200
+    assert response.json() == {"@id": "p1"}
+
+
+def test_bodies_with_new_ids_fall_back_to_the_recorded_order(path):
+    recorder = Cassette(path, "record")
+    for commit_id in ("c1", "c2"):
+        recorder.call("rest", cassette.request_key("POST", commit_id), lambda: commit_id,
+                      encode=str, decode=str, group="POST /commits")
+
+    player = Cassette(path, "replay")
+    take = lambda body: player.call("rest", cassette.request_key("POST", body), None,
+                                    encode=str, decode=str, group="POST /commits")
+    assert take("c2") == "c2"     # exact match
+    assert take("other") == "c1"  # first unused of the group
+    assert take("c2") == "c2"     # used up, served again
+
+
+def test_unknown_requests_raise(path):
+    Cassette(path, "record")._append([])
+    player = Cassette(path, "replay")
+    with pytest.raises(CassetteMissError):
+        player.call("llm", "key", None, encode=list, decode=list, group="llm")
+
+
+def test_replay_simulates_recorded_latency(monkeypatch, path):
+    Cassette(path, "record")._append([
+        {"kind": "llm", "key": "k", "group": "llm", "response": [], "elapsed_ms": 200.0},
+    ])
+    sleeps = []
+    monkeypatch.setattr(cassette.time, "sleep", sleeps.append)
+
+    Cassette(path, "replay", latency=0.5).call("llm", "k", None, encode=list, decode=list)
+    assert sleeps == [0.1]
+
+
+# -------------------------------
+# Tests for embeddings and runs
+# -------------------------------
+
+
+def test_embeddings_are_replayed_per_text(path):
+    recorder = Cassette(path, "record")
+    recorder.embed(["a", "b"], lambda: [[0.5, 1.0], [2.0, -1.5]])
+
+    player = Cassette(path, "replay")
+    assert player.embed(["b", "a", "b"], None) == [[2.0, -1.5], [0.5, 1.0], [2.0, -1.5]]
+    with pytest.raises(CassetteMissError):
+        player.embed(["c"], None)
+
+
+def test_runs_are_recorded(path):
+    Cassette(path, "record").record_run(project_id="p", branch_id="b", change_request="Rename X to Y")
+    assert Cassette(path, "replay").runs() == [{"project_id": "p", "branch_id": "b", "change_request": "Rename X to Y"}]
+
+
+def test_unknown_mode_is_rejected(path):
+    with pytest.raises(ValueError):
+        Cassette(path, "rewind")
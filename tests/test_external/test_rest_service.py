@@ -0,0 +1,121 @@
+import asyncio
+import gzip
+import json
+
+import httpx
+import pytest
+import requests
+
+from src.external import rest_service
+from src.external.sysml2 import element
+from src.external.sysml2.project import get_project_async
+
+
+# -------------------------------
+# Fixtures
+# -------------------------------
+
+
+@pytest.fixture
+def server(monkeypatch):
+    """Route the async client to a handler(request) -> httpx.Response."""
+    def serve(handler):
+        client = httpx.AsyncClient(base_url="http://sysml", transport=httpx.MockTransport(handler))
+        monkeypatch.setattr(rest_service, "get_async_client", lambda: client)
+    monkeypatch.setattr(rest_service.cassette, "CASSETTE_MODE", "off")
+    return serve
+
+
+# -------------------------------
+# Tests for async requests
+# -------------------------------
+
+
+def test_async_request_sends_json_body(server):
+    received = []
+
+    def handler(request):
+        received.append(request)
+        return httpx.Response(200, json={"@id": "c1"})
+
+    server(handler)
+    response = asyncio.run(rest_service.send_request_async("POST", "/projects/p/commits", {"change": []}, compress=False))
+
+    assert response.status_code == 200
+    assert json.loads(response.content) == {"@id": "c1"}
+    assert received[0].url.path == "/projects/p/commits"
+    assert json.loads(received[0].content) == {"change": []}
+
+
+def test_async_gzip_body_falls_back_to_plain_json_on_415(server, monkeypatch):
+    monkeypatch.setattr(rest_service, "_gzip_accepted", True)
+    received = []
+
+    def handler(request):
+        received.append(request)
+        return httpx.Response(415 if len(received) == 1 else 200, json={})
+
+    server(handler)
+    response = asyncio.run(rest_service.send_request_async("POST", "/projects/p/commits", {"change": []}, compress=True))
+
+    assert response.status_code == 200
+    assert received[0].headers["Content-Encoding"] == "gzip"
+    assert json.loads(gzip.decompress(received[0].content)) == {"change": []}
+    assert "Content-Encoding" not in received[1].headers
+
+
+def test_concurrent_async_fetches(server):
+    async def handler(request):
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, json={"@id": request.url.path.rsplit("/", 1)[1], "name": "P"})
+
+    server(handler)
+
+    async def fetch_all():
+        return await asyncio.gather(*[get_project_async(f"p{i}") for i in range(50)])
+
+    projects = asyncio.run(fetch_all())
+    assert [p["@id"] for p in projects] == [f"p{i}" for i in range(50)]
+
+
+# -------------------------------
+# Tests for paged element fetches
+# -------------------------------
+
+
+def page_response(elements, next_url=None):
+    response = requests.Response()
+    response.status_code = 200
+    response._content = json.dumps(elements).encode()
+    if next_url:
+        response.headers["Link"] = f'<{next_url}>; rel="next"'
+    return response
+
+
+def test_elements_are_fetched_page_by_page(monkeypatch):
+    pages = {
+        "/projects/p/commits/c1/elements?page[size]=2": page_response([{"@id": "a"}, {"@id": "b"}], f"{rest_service.TARGET_URL}/projects/p/commits/c1/elements?page[after]=b&page[size]=2"),
+        "/projects/p/commits/c1/elements?page[after]=b&page[size]=2": page_response([{"@id": "c"}]),
+    }
+    requested = []
+
+    def send_request(method, endpoint):
+        requested.append(endpoint)
+        return pages[endpoint]
+
+    monkeypatch.setattr(element, "send_request", send_request)
+    elements = element.iter_project_elements("p", "c1", page_size=2)
+
+    assert len(requested) == 1
+    assert next(elements) == {"@id": "a"}
+    assert len(requested) == 1
+    assert [e["@id"] for e in elements] == ["b", "c"]
+    assert len(requested) == 2
+
+
+def test_paged_fetch_of_unknown_commit_returns_none(monkeypatch):
+    response = requests.Response()
+    response.status_code = 404
+    monkeypatch.setattr(element, "send_request", lambda method, endpoint: response)
+
+    assert element.iter_project_elements("p", "missing") is None
@@ -0,0 +1,115 @@
+import pytest
+
+from src.sysml2.change_optimizer import optimize_change
+from src.sysml2.snapshot import ModelSnapshot
+
+
+# -------------------------------
+# Fixtures and helpers
+# -------------------------------
+
+
+@pytest.fixture
+def elements():
+    return [
+        {"@id": "root", "@type": "Package", "name": "System"},
+        {"@id": "a", "@type": "PartDefinition", "name": "A", "owner": {"@id": "root"}},
+        {"@id": "a1", "@type": "PartUsage", "name": "a1", "owner": {"@id": "a"}},
+    ]
+
+
+def data_version(element_id, payload):
+    return {"@type": "DataVersion", "payload": payload, "identity": {"@id": element_id}}
+
+
+def operations(change):
+    return [(dv["identity"]["@id"], dv["payload"] is not None) for dv in change]
+
+
+def assert_equivalent(elements, change, optimized):
+    expected = ModelSnapshot("c1", elements)
+    expected.apply_change(change, "c2")
+    actual = ModelSnapshot("c1", elements)
+    actual.apply_change(optimized, "c2")
+    key = lambda e: e["@id"]
+    assert sorted(actual.elements(), key=key) == sorted(expected.elements(), key=key)
+
+
+# -------------------------------
+# Tests for optimize_change
+# -------------------------------
+
+
+def test_updates_to_the_same_element_are_merged(elements):
+    change = [data_version("a", {"name": "A2"}), data_version("a", {"isAbstract": True})]
+
+    optimized = optimize_change(change, ModelSnapshot("c1", elements))
+
+    assert optimized == [data_version("a", {"name": "A2", "isAbstract": True})]
+    assert_equivalent(elements, change, optimized)
+
+
+def test_create_followed_by_delete_cancels_out(elements):
+    change = [
+        data_version("b", {"@type": "PartDefinition", "name": "B"}),
+        data_version("b", {"name": "B2"}),
+        data_version("b", None),
+    ]
+
+    assert optimize_change(change, ModelSnapshot("c1", elements)) == []
+
+
+def test_noop_updates_and_repeated_or_unknown_deletes_are_dropped(elements):
+    change = [
+        data_version("a", {"name": "A", "owner": {"@id": "root"}}),
+        data_version("a1", None),
+        data_version("a1", None),
+        data_version("missing", None),
+    ]
+
+    optimized = optimize_change(change, ModelSnapshot("c1", elements))
+
+    assert optimized == [data_version("a1", None)]
+
+
+def test_update_after_create_is_folded_into_the_create(elements):
+    change = [
+        data_version("b", {"@type": "PartDefinition", "name": "B"}),
+        data_version("b", {"name": "B2"}),
+    ]
+
+    optimized = optimize_change(change, ModelSnapshot("c1", elements))
+
+    assert optimized == [data_version("b", {"@type": "PartDefinition", "name": "B2"})]
+
+
+def test_operations_are_ordered_by_ownership(elements):
+    change = [
+        data_version("root", None),
+        data_version("c1", {"@type": "PartUsage", "name": "c1", "owner": {"@id": "c"}}),
+        data_version("a1", None),
+        data_version("c", {"@type": "PartDefinition", "name": "C", "owner": {"@id": "a"}}),
+        data_version("a", {"name": "A2"}),
+    ]
+
+    optimized = optimize_change(change, ModelSnapshot("c1", elements))
+
+    assert operations(optimized) == [("c", True), ("c1", True), ("a", True), ("a1", False), ("root", False)]
+    assert_equivalent(elements, change, optimized)
+
+
+def test_delete_and_create_again_replaces_the_element(elements):
+    change = [
+        data_version("a", None),
+        data_version("a", {"@type": "PartUsage", "name": "A"}),
+    ]
+
+    optimized = optimize_change(change, ModelSnapshot("c1", elements))
+
+    assert operations(optimized) == [("a", False), ("a", True)]
+    assert_equivalent(elements, change, optimized)
+
+
+def test_missing_identity_raises(elements):
+    with pytest.raises(ValueError):
+        optimize_change([{"@type": "DataVersion", "payload": {}}], ModelSnapshot("c1", elements))
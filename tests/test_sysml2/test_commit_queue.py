@@ -0,0 +1,248 @@
+import asyncio
+import json
+import threading
+import time
+import pytest
+from unittest.mock import patch
+
+from src.sysml2.commit_queue import CommitConflictError, CommitQueue, CommitResult, change_footprint
+
+
+# -------------------------------
+# Fixtures and helpers
+# -------------------------------
+
+
+def update(element_id, owner_id=None):
+    payload = {"@type": "PartUsage", "name": "x"}
+    if owner_id:
+        payload["owner"] = {"@id": owner_id}
+    return {"@type": "DataVersion", "payload": payload, "identity": {"@id": element_id}}
+
+
+class FakeServer:
+    """Minimal branch state that records pushed commits."""
+
+    def __init__(self, head="c0"):
+        self.head = head
+        self.pushed = []
+
+    def get_branch(self, project_id, branch_id):
+        return {"@id": branch_id, "head": {"@id": self.head}}
+
+    def push(self, project_id, body, branch_id=None):
+        self.pushed.append(json.loads(body.data)["change"])
+        self.head = f"c{len(self.pushed)}"
+        return self.head
+
+
+@pytest.fixture
+def server():
+    server = FakeServer()
+    with patch("src.sysml2.commit_queue.get_project_branch", side_effect=server.get_branch), \
+         patch("src.sysml2.commit_upload.push_commit", side_effect=server.push):
+        yield server
+
+
+def submit_concurrently(queue, submissions):
+    results = [None] * len(submissions)
+
+    def worker(i, base, change):
+        try:
+            results[i] = queue.submit(base, change)
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=worker, args=(i, *s)) for i, s in enumerate(submissions)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+# -------------------------------
+# Tests
+# -------------------------------
+
+
+def test_change_footprint_collects_identities_and_owners():
+    written, referenced = change_footprint([update("a", owner_id="p"), {"@type": "DataVersion", "payload": {"owner": {"@id": "q"}}}])
+
+    assert written == {"a"}
+    assert referenced == {"p", "q"}
+
+
+def test_concurrent_submissions_are_coalesced(server):
+    queue = CommitQueue("p", "b", window=0.2)
+
+    results = submit_concurrently(queue, [("c0", [update("a")]), ("c0", [update("b")])])
+
+    assert results == ["c1", "c1"]
+    assert len(server.pushed) == 1
+    assert len(server.pushed[0]) == 2
+
+
+def test_commit_result_reports_parent_and_coalescing(server):
+    queue = CommitQueue("p", "b", window=0.2)
+
+    results = []
+    submit = lambda base, change: results.append(queue.submit_change(base, change))
+    threads = [threading.Thread(target=submit, args=("c0", [update(i)])) for i in "ab"]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    queue.window = 0
+    # planned on c0, but pushed on c1 which holds other changes
+    alone = queue.submit_change("c0", [update("c")])
+
+    assert results == [CommitResult("c1", "c0", True)] * 2
+    assert alone == CommitResult("c2", "c1", False)
+    assert queue.submit_change("c2", []) == CommitResult("c2", "c2", False)
+
+
+def test_overlapping_submission_in_batch_conflicts(server):
+    queue = CommitQueue("p", "b", window=0.2)
+
+    results = submit_concurrently(queue, [("c0", [update("a")]), ("c0", [update("x", owner_id="a")])])
+
+    assert sorted(isinstance(r, CommitConflictError) for r in results) == [False, True]
+    assert len(server.pushed) == 1
+
+
+def test_stale_base_is_accepted_when_untouched(server):
+    queue = CommitQueue("p", "b", window=0)
+
+    assert queue.submit("c0", [update("a")]) == "c1"
+    assert queue.submit("c0", [update("b")]) == "c2"
+
+
+def test_stale_base_conflicts_on_touched_element(server):
+    queue = CommitQueue("p", "b", window=0)
+    queue.submit("c0", [update("a")])
+
+    with pytest.raises(CommitConflictError):
+        queue.submit("c0", [update("a")])
+
+
+def test_unknown_external_commit_conflicts(server):
+    queue = CommitQueue("p", "b", window=0)
+    server.head = "external"
+
+    with pytest.raises(CommitConflictError):
+        queue.submit("c0", [update("a")])
+    assert server.pushed == []
+
+
+def test_empty_change_is_not_pushed(server):
+    queue = CommitQueue("p", "b", window=0)
+
+    assert queue.submit("c0", []) == "c0"
+    assert server.pushed == []
+
+
+def test_large_change_is_pushed_in_chunks_with_progress(server):
+    queue = CommitQueue("p", "b", window=0)
+    reported = []
+
+    with patch("src.sysml2.commit_upload.CHUNK_OPERATIONS", 2):
+        commit_id = queue.submit("c0", [update(i) for i in "abcde"], progress=lambda *args: reported.append(args))
+
+    assert commit_id == "c3"
+    assert [len(c) for c in server.pushed] == [2, 2, 1]
+    assert reported == [(2, 5, "c1"), (4, 5, "c2"), (5, 5, "c3")]
+    # every chunk commit is known, so a request based on an intermediate commit is checked
+    assert queue.submit("c1", [update("x")]) == "c4"
+
+
+def test_request_returns_once_its_batch_is_pushed(server):
+    queue = CommitQueue("p", "b", window=0.05)
+    stop = threading.Event()
+    finished = threading.Event()
+
+    def load(worker):
+        i = 0
+        while not stop.is_set():
+            queue.submit(server.head, [update(f"load{worker}-{i}")])
+            i += 1
+
+    # the first request is submitted before the load, later requests keep the queue busy
+    first = threading.Thread(target=lambda: (queue.submit("c0", [update("a")]), finished.set()))
+    first.start()
+    time.sleep(0.01)
+    background = [threading.Thread(target=load, args=(worker,)) for worker in range(3)]
+    for thread in background:
+        thread.start()
+    try:
+        assert finished.wait(1.0)
+    finally:
+        stop.set()
+        for thread in background:
+            thread.join()
+
+
+def test_request_does_not_wait_for_write_through(server):
+    queue = CommitQueue("p", "b", window=0)
+    release = threading.Event()
+
+    with patch("src.sysml2.commit_queue.apply_commit", side_effect=lambda *args: release.wait(5)):
+        start = time.monotonic()
+        assert queue.submit("c0", [update("a")]) == "c1"
+        assert time.monotonic() - start < 1
+        release.set()
+
+
+def test_slow_write_through_does_not_hold_back_later_requests(server):
+    queue = CommitQueue("p", "b", window=0)
+    release = threading.Event()
+    written = []
+
+    def apply_commit(project_id, base_commit_id, commit_id, change):
+        release.wait(5)
+        written.append(commit_id)
+
+    with patch("src.sysml2.commit_queue.apply_commit", side_effect=apply_commit):
+        start = time.monotonic()
+        assert queue.submit("c0", [update("a")]) == "c1"
+        assert queue.submit("c1", [update("b")]) == "c2"
+        assert time.monotonic() - start < 1
+        release.set()
+        queue._write_through_executor.submit(lambda: None).result(5)
+
+    # written through in commit order
+    assert written == ["c1", "c2"]
+
+
+def test_bulk_chunks_are_not_written_through(server):
+    queue = CommitQueue("p", "b", window=0)
+
+    with patch("src.sysml2.commit_queue.apply_commit") as apply_commit:
+        assert queue.submit("c0", [update("a")], write_through=False) == "c1"
+        assert queue.submit("c1", [update("b")]) == "c2"
+        queue._write_through_executor.submit(lambda: None).result(5)
+
+    assert [call.args[2] for call in apply_commit.call_args_list] == ["c2"]
+
+
+def test_async_submissions_wait_without_threads(server):
+    queue = CommitQueue("p", "b", window=0.05)
+
+    async def submit_all():
+        loop = asyncio.get_running_loop()
+        with patch.object(loop, "run_in_executor", side_effect=AssertionError("submission waits on a thread")):
+            return await asyncio.gather(*(queue.submit_change_async("c0", [update(f"e{i}")]) for i in range(50)))
+
+    results = asyncio.run(submit_all())
+
+    assert {result.commit_id for result in results} == {"c1"}
+    assert all(result.coalesced for result in results)
+    assert len(server.pushed[0]) == 50
+
+
+def test_async_submission_raises_conflicts(server):
+    queue = CommitQueue("p", "b", window=0)
+    server.head = "c9"
+
+    with pytest.raises(CommitConflictError):
+        asyncio.run(queue.submit_change_async("c0", [update("a")]))
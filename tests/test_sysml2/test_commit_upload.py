@@ -0,0 +1,94 @@
+import gzip
+import json
+from unittest.mock import patch
+
+import pytest
+
+from src.external import rest_service
+from src.sysml2.commit_upload import PartialUploadError, order_by_ownership, split_change, upload_change
+
+
+# -------------------------------
+# Helpers
+# -------------------------------
+
+
+def create(element_id, owner_id=None):
+    payload = {"@type": "PartUsage", "name": element_id}
+    if owner_id:
+        payload["owner"] = {"@id": owner_id}
+    return {"@type": "DataVersion", "payload": payload, "identity": {"@id": element_id}}
+
+
+def ids(change):
+    return [dv["identity"]["@id"] for dv in change]
+
+
+# -------------------------------
+# Tests for ordering and splitting
+# -------------------------------
+
+
+def test_ordered_change_is_kept():
+    change = [create("a"), create("b", "a"), create("c", "b")]
+
+    assert order_by_ownership(change) == change
+
+
+def test_owned_elements_move_behind_their_owner():
+    change = [create("c", "b"), create("x"), create("b", "a"), create("a")]
+
+    assert ids(order_by_ownership(change)) == ["x", "a", "b", "c"]
+
+
+def test_split_change_respects_chunk_size():
+    change = [create(str(i)) for i in range(5)]
+
+    assert [ids(c) for c in split_change(change, 2)] == [["0", "1"], ["2", "3"], ["4"]]
+
+
+# -------------------------------
+# Tests for upload_change
+# -------------------------------
+
+
+def test_upload_change_raises_partial_error_with_pushed_commits():
+    results = iter(["c1", None])
+
+    with patch("src.sysml2.commit_upload.push_commit", side_effect=lambda *args: next(results)):
+        with pytest.raises(PartialUploadError) as error:
+            upload_change("p", "b", [create(str(i)) for i in range(5)], max_operations=2)
+
+    assert error.value.commit_ids == ["c1"]
+
+
+# -------------------------------
+# Tests for compressed request bodies
+# -------------------------------
+
+
+class FakeResponse:
+
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.text = ""
+        self.content = b""
+
+
+def test_gzip_body_falls_back_to_plain_json_on_415(monkeypatch):
+    monkeypatch.setattr(rest_service, "_gzip_accepted", True)
+    sent = []
+
+    def request(**kwargs):
+        sent.append(kwargs)
+        return FakeResponse(415 if len(sent) == 1 else 200)
+
+    with patch("src.external.rest_service.requests.request", side_effect=request):
+        response = rest_service.send_request("POST", "/projects/p/commits", {"change": []}, compress=True)
+
+    assert response.status_code == 200
+    assert sent[0]["headers"]["Content-Encoding"] == "gzip"
+    assert json.loads(gzip.decompress(sent[0]["data"])) == {"change": []}
+    assert "Content-Encoding" not in sent[1]["headers"]
+    assert json.loads(sent[1]["data"]) == {"change": []}
+    assert rest_service.encode_body({}, compress=True).compressed is False
@@ -0,0 +1,41 @@
+import pytest
+from unittest.mock import patch
+
+from src.sysml2.model_tree import children_page
+from src.sysml2.snapshot import ModelSnapshot
+
+
+@pytest.fixture
+def snapshot():
+    elements = [{"@id": "root", "@type": "Package", "name": "Model"}]
+    elements += [
+        {"@id": f"p{i}", "@type": "PartUsage", "name": f"Part{i}", "owner": {"@id": "root"}}
+        for i in range(5)
+    ]
+    elements.append({"@id": "leaf", "@type": "PartUsage", "name": "Leaf", "owner": {"@id": "p0"}})
+    with patch("src.sysml2.model_tree.load_snapshot", return_value=ModelSnapshot("c1", elements)):
+        yield
+
+
+def test_roots_page(snapshot):
+    page = children_page("p", "c1")
+
+    assert page["total"] == 1
+    assert page["items"] == [{"@id": "root", "@type": "Package", "name": "Model", "child_count": 5}]
+
+
+def test_children_are_paged(snapshot):
+    page = children_page("p", "c1", "root", offset=2, limit=2)
+
+    assert page["total"] == 5
+    assert [item["@id"] for item in page["items"]] == ["p2", "p3"]
+
+
+def test_unknown_parent_raises(snapshot):
+    with pytest.raises(LookupError):
+        children_page("p", "c1", "missing")
+
+
+def test_invalid_limit_raises(snapshot):
+    with pytest.raises(ValueError):
+        children_page("p", "c1", limit=0)
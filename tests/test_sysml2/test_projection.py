@@ -0,0 +1,56 @@
+from src.sysml2.projection import CONSUMER_FIELDS, Projection
+
+
+# -------------------------------
+# Fixtures and helpers
+# -------------------------------
+
+
+PROPERTIES = {
+    "PartUsage": {"@id", "@type", "name", "owner", "isAbstract", "definition", "ownedRelationship", "qualifiedName"},
+    "Comment": {"@id", "@type", "body", "owner"},
+}
+
+ELEMENT = {
+    "@id": "e",
+    "@type": "PartUsage",
+    "name": "engine",
+    "owner": {"@id": "p"},
+    "isAbstract": False,
+    "definition": [{"@id": "d"}],
+    "ownedRelationship": [{"@id": "r1"}, {"@id": "r2"}],
+    "qualifiedName": "Vehicle::engine",
+    "declaredShortName": "",
+}
+
+
+# -------------------------------
+# Tests for Projection
+# -------------------------------
+
+
+def test_project_keeps_allowed_non_empty_fields():
+    projection = Projection(CONSUMER_FIELDS["prompt"], properties=PROPERTIES.get)
+
+    assert projection.project(ELEMENT) == {
+        "@id": "e", "@type": "PartUsage", "name": "engine", "owner": {"@id": "p"},
+        "isAbstract": False, "definition": [{"@id": "d"}],
+    }
+
+
+def test_fields_are_restricted_to_declared_properties():
+    projection = Projection(CONSUMER_FIELDS["prompt"], properties=PROPERTIES.get)
+
+    assert projection.fields_for("Comment") == ("@id", "@type", "owner", "body")
+
+
+def test_unknown_types_use_the_allowlist():
+    projection = Projection(("@id", "name"), properties=PROPERTIES.get)
+
+    assert projection.project({"@id": "x", "@type": "Unknown", "name": "X", "extra": 1}) == {"@id": "x", "name": "X"}
+
+
+def test_type_fields_extend_the_allowlist():
+    projection = Projection(("@id",), type_fields={"PartUsage": ("qualifiedName",)}, properties=PROPERTIES.get)
+
+    assert projection.project(ELEMENT) == {"@id": "e", "qualifiedName": "Vehicle::engine"}
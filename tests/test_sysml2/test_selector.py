@@ -0,0 +1,75 @@
+import pytest
+
+from src.sysml2.selector import render_attrs, select
+from src.sysml2.snapshot import ModelSnapshot
+from src.sysml2.validation import ChangeValidationError
+
+
+# -------------------------------
+# Fixtures
+# -------------------------------
+
+
+@pytest.fixture
+def snapshot():
+    return ModelSnapshot("c1", [
+        {"@id": "root", "@type": "Package", "name": "System"},
+        {"@id": "s", "@type": "PartDefinition", "name": "Sensors", "owner": {"@id": "root"}},
+        {"@id": "t", "@type": "PartUsage", "name": "TempSensor", "owner": {"@id": "s"}},
+        {"@id": "p", "@type": "PartUsage", "name": "PressureSensor", "owner": {"@id": "s"}},
+        {"@id": "m", "@type": "PartUsage", "name": "Motor", "owner": {"@id": "root"}},
+    ])
+
+
+def ids(records):
+    return [r["@id"] for r in records]
+
+
+# -------------------------------
+# Tests for select
+# -------------------------------
+
+
+def test_select_by_ids_keeps_order_and_drops_duplicates(snapshot):
+    assert ids(select(snapshot, {"ids": ["m", "t", "m"]})) == ["m", "t"]
+
+
+def test_select_subtree_lists_owners_first(snapshot):
+    assert ids(select(snapshot, {"subtree": "s"})) == ["s", "t", "p"]
+
+
+def test_select_by_type_and_name_glob(snapshot):
+    assert sorted(ids(select(snapshot, {"type": "PartUsage", "name": "*sensor"}))) == ["p", "t"]
+
+
+def test_select_narrows_subtree_by_type(snapshot):
+    assert ids(select(snapshot, {"subtree": "root", "type": "PartDefinition"})) == ["s"]
+
+
+@pytest.mark.parametrize("selector", [
+    {},
+    {"names": "x"},
+    {"ids": ["missing"]},
+    {"subtree": "missing"},
+    {"ids": ["t"], "subtree": "s"},
+    {"name": "Nothing*"},
+])
+def test_select_rejects_bad_selectors(snapshot, selector):
+    with pytest.raises(ChangeValidationError):
+        select(snapshot, selector)
+
+
+def test_select_limits_selection_size(snapshot):
+    with pytest.raises(ChangeValidationError, match="at most 2"):
+        select(snapshot, {"type": "PartUsage"}, max_selection=2)
+
+
+# -------------------------------
+# Tests for render_attrs
+# -------------------------------
+
+
+def test_render_attrs_replaces_placeholders(snapshot):
+    attrs = render_attrs({"name": "{name}_v2", "doc": "of {id}", "isAbstract": True}, snapshot.get("t"))
+
+    assert attrs == {"name": "TempSensor_v2", "doc": "of t", "isAbstract": True}
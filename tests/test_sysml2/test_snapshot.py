@@ -0,0 +1,214 @@
+import asyncio
+
+import pytest
+
+from src.sysml2 import snapshot as snapshot_module
+from src.sysml2.snapshot import ModelSnapshot, apply_commit, get_snapshot, iter_commit_elements, load_snapshot_async
+
+
+# -------------------------------
+# Fixtures and helpers
+# -------------------------------
+
+
+@pytest.fixture
+def elements():
+    return [
+        {"@id": "root", "@type": "PartDefinition", "name": "System"},
+        {"@id": "a", "@type": "PartDefinition", "name": "A", "owner": {"@id": "root"}},
+        {"@id": "b", "@type": "PartDefinition", "name": "B", "owner": {"@id": "root"}},
+    ]
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    snapshot_module._snapshots.clear()
+    yield
+    snapshot_module._snapshots.clear()
+
+
+def data_version(element_id, payload):
+    return {"@type": "DataVersion", "payload": payload, "identity": {"@id": element_id}}
+
+
+# -------------------------------
+# Tests for ModelSnapshot
+# -------------------------------
+
+
+def test_snapshot_indexes_ownership(elements):
+    snapshot = ModelSnapshot("c1", elements)
+
+    assert [e["@id"] for e in snapshot.roots()] == ["root"]
+    assert [e["@id"] for e in snapshot.children("root")] == ["a", "b"]
+    assert snapshot.owner_id("a") == "root"
+    assert len(snapshot) == 3
+
+
+def test_apply_change_creates_updates_and_deletes(elements):
+    snapshot = ModelSnapshot("c1", elements)
+
+    delta = snapshot.apply_change([
+        data_version("c", {"@type": "PartUsage", "name": "C", "owner": {"@id": "a"}}),
+        data_version("a", {"@type": "PartDefinition", "name": "A2"}),
+        data_version("b", None),
+    ], "c2")
+
+    assert snapshot.commit_id == "c2"
+    assert [e["@id"] for e in delta["created"]] == ["c"]
+    assert delta["updated"][0]["name"] == "A2"
+    assert delta["updated"][0]["owner"] == {"@id": "root"}
+    assert [e["@id"] for e in delta["deleted"]] == ["b"]
+    assert [e["@id"] for e in snapshot.children("root")] == ["a"]
+    assert [e["@id"] for e in snapshot.children("a")] == ["c"]
+
+
+def test_apply_change_moves_element_to_new_owner(elements):
+    snapshot = ModelSnapshot("c1", elements)
+
+    snapshot.apply_change([data_version("b", {"owner": {"@id": "a"}})], "c2")
+
+    assert [e["@id"] for e in snapshot.children("root")] == ["a"]
+    assert [e["@id"] for e in snapshot.children("a")] == ["b"]
+
+
+def test_apply_change_without_identity_raises(elements):
+    snapshot = ModelSnapshot("c1", elements)
+
+    with pytest.raises(ValueError):
+        snapshot.apply_change([{"@type": "DataVersion", "payload": {"name": "X"}}], "c2")
+
+
+def test_advance_layers_the_change_over_an_unchanged_base(elements):
+    base = ModelSnapshot("c1", elements)
+
+    snapshot, delta = base.advance([
+        data_version("c", {"@type": "PartUsage", "name": "C", "owner": {"@id": "a"}}),
+        data_version("b", None),
+    ], "c2")
+
+    assert snapshot.commit_id == "c2" and len(snapshot) == 3
+    assert [e["@id"] for e in delta["created"]] == ["c"]
+    assert [e["@id"] for e in snapshot.children("root")] == ["a"]
+    assert [e["@id"] for e in snapshot.children("a")] == ["c"]
+    assert "b" not in snapshot
+    # only the changed records and the child lists of their owners are held by the new layer
+    assert set(snapshot._elements) == {"b", "c"}
+    assert set(snapshot._children) == {"root", "a"}
+    assert base.commit_id == "c1" and len(base) == 3 and "b" in base and "c" not in base
+    assert [e["@id"] for e in base.children("root")] == ["a", "b"]
+
+
+def test_advance_merges_layers_beyond_the_depth_limit(elements, monkeypatch):
+    monkeypatch.setattr(snapshot_module, "MAX_OVERLAY_DEPTH", 3)
+    snapshot = ModelSnapshot("c0", elements)
+
+    for i in range(1, 10):
+        snapshot, _ = snapshot.advance([data_version(f"n{i}", {"@type": "PartUsage", "owner": {"@id": "a"}})], f"c{i}")
+        assert snapshot._depth <= 3
+
+    expected = ModelSnapshot("c1", elements)
+    for i in range(1, 10):
+        expected.apply_change([data_version(f"n{i}", {"@type": "PartUsage", "owner": {"@id": "a"}})], f"c{i}")
+    assert snapshot.commit_id == "c9"
+    assert sorted(e["@id"] for e in snapshot.elements()) == sorted(e["@id"] for e in expected.elements())
+    assert [e["@id"] for e in snapshot.children("a")] == [f"n{i}" for i in range(1, 10)]
+
+
+# -------------------------------
+# Tests for the snapshot cache
+# -------------------------------
+
+
+def test_get_snapshot_loads_once(elements):
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return elements
+
+    first = get_snapshot("p", "c1", loader)
+    second = get_snapshot("p", "c1", loader)
+
+    assert first is second
+    assert len(calls) == 1
+
+
+def test_apply_commit_caches_an_advanced_copy(elements):
+    base = get_snapshot("p", "c1", lambda: elements)
+    children_before = base.children("a")
+
+    delta = apply_commit("p", "c1", "c2", [data_version("a", None)])
+
+    assert [e["@id"] for e in delta["deleted"]] == ["a"]
+    snapshot = get_snapshot("p", "c2", lambda: pytest.fail("snapshot should be cached"))
+    assert "a" not in snapshot
+    # readers of the base commit still see it unchanged
+    assert base is get_snapshot("p", "c1", lambda: pytest.fail("base should stay cached"))
+    assert base.commit_id == "c1" and "a" in base
+    assert base.children("a") == children_before
+
+
+def test_apply_commit_without_cached_base_returns_none():
+    assert apply_commit("p", "unknown", "c2", []) is None
+
+
+def test_iter_commit_elements_does_not_load_the_snapshot(elements, monkeypatch):
+    monkeypatch.setattr(snapshot_module, "get_snapshot_store", lambda: None)
+    monkeypatch.setattr(snapshot_module, "iter_project_elements", lambda project_id, commit_id: iter(elements))
+
+    assert list(iter_commit_elements("p", "c1")) == elements
+    assert snapshot_module.peek_snapshot("p", "c1") is None
+
+    cached = get_snapshot("p", "c2", lambda: elements[:1])
+    assert list(iter_commit_elements("p", "c2")) == cached.elements()
+
+
+def test_iter_commit_elements_of_unknown_commit_raises(monkeypatch):
+    monkeypatch.setattr(snapshot_module, "get_snapshot_store", lambda: None)
+    monkeypatch.setattr(snapshot_module, "iter_project_elements", lambda project_id, commit_id: None)
+
+    with pytest.raises(LookupError):
+        iter_commit_elements("p", "missing")
+
+
+def test_load_snapshot_async_fetches_once(elements, monkeypatch):
+    calls = []
+
+    async def get_project_elements_async(project_id, commit_id):
+        calls.append(commit_id)
+        return elements
+
+    monkeypatch.setattr(snapshot_module, "get_project_elements_async", get_project_elements_async)
+    monkeypatch.setattr(snapshot_module, "record_snapshot", lambda *args: None)
+
+    first = asyncio.run(load_snapshot_async("p", "c1"))
+    second = asyncio.run(load_snapshot_async("p", "c1"))
+
+    assert first is second
+    assert calls == ["c1"]
+    assert get_snapshot("p", "c1", lambda: pytest.fail("snapshot should be cached")) is first
+
+
+def test_load_snapshot_async_raises_for_unknown_commit(monkeypatch):
+    async def get_project_elements_async(project_id, commit_id):
+        return None
+
+    monkeypatch.setattr(snapshot_module, "get_project_elements_async", get_project_elements_async)
+    with pytest.raises(LookupError):
+        asyncio.run(load_snapshot_async("p", "missing"))
+
+
+def test_preview_change_matches_apply_without_mutating(elements):
+    snapshot = ModelSnapshot("c1", elements)
+    change = [
+        data_version("c", {"@type": "PartUsage", "name": "C", "owner": {"@id": "a"}}),
+        data_version("c", {"name": "C2"}),
+        data_version("b", None),
+    ]
+
+    preview = snapshot.preview_change(change)
+
+    assert "c" not in snapshot and "b" in snapshot
+    assert preview == ModelSnapshot("c1", elements).apply_change(change, "c2")
+    assert preview["updated"][0]["owner"] == {"@id": "a"}
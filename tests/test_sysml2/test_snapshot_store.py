@@ -0,0 +1,151 @@
+import os
+
+import pytest
+
+from src.sysml2.snapshot import ModelSnapshot
+from src.sysml2.snapshot_store import SnapshotStore
+
+
+# -------------------------------
+# Fixtures and helpers
+# -------------------------------
+
+
+@pytest.fixture
+def elements():
+    return [
+        {"@id": "root", "@type": "Package", "name": "System"},
+        {"@id": "a", "@type": "PartDefinition", "name": "A", "owner": {"@id": "root"}},
+        {"@id": "b", "@type": "PartDefinition", "name": "B", "owner": {"@id": "root"}},
+        {"@id": "a1", "@type": "PartUsage", "name": "a1", "owner": {"@id": "a"}},
+    ]
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SnapshotStore(str(tmp_path))
+
+
+def data_version(element_id, payload):
+    return {"@type": "DataVersion", "payload": payload, "identity": {"@id": element_id}}
+
+
+def object_count(store):
+    return sum(len(files) for _, _, files in os.walk(os.path.join(store.root, "objects")))
+
+
+def ids(records):
+    return sorted(r["@id"] for r in records)
+
+
+# -------------------------------
+# Tests for recording snapshots
+# -------------------------------
+
+
+def test_put_snapshot_round_trips_elements(store, elements):
+    store.put_snapshot("p", "c1", elements)
+
+    assert store.has_commit("p", "c1")
+    assert sorted(store.iter_elements("p", "c1"), key=lambda e: e["@id"]) == sorted(elements, key=lambda e: e["@id"])
+    assert [e["@id"] for e in store.iter_elements("p", "c1")][0] == "root"
+
+
+def test_equal_snapshots_share_all_objects(store, elements):
+    first = store.put_snapshot("p", "c1", elements)
+    count = object_count(store)
+
+    second = store.put_snapshot("p", "c2", list(reversed(elements)))
+
+    assert first == second
+    assert object_count(store) == count
+
+
+def test_apply_delta_matches_full_put(store, elements):
+    store.put_snapshot("p", "c1", elements)
+    snapshot = ModelSnapshot("c1", elements)
+    delta = snapshot.apply_change([
+        data_version("b1", {"@type": "PartUsage", "name": "b1", "owner": {"@id": "b"}}),
+        data_version("a1", {"owner": {"@id": "b"}}),
+        data_version("a", None),
+    ], "c2")
+
+    incremental = store.apply_delta("p", "c1", "c2", delta)
+    count = object_count(store)
+
+    assert incremental == SnapshotStore(store.root).put_snapshot("p", "c3", snapshot.elements())
+    assert object_count(store) == count
+    assert store.is_tracked("p", "c1") and store.is_tracked("p", "c2")
+
+
+def test_apply_delta_can_advance_a_base_twice(store, elements):
+    store.put_snapshot("p", "c1", elements)
+    created = {"@id": "x", "@type": "PartDefinition", "name": "X", "owner": {"@id": "root"}}
+    empty = {"created": [], "updated": [], "deleted": []}
+
+    first = store.apply_delta("p", "c1", "c2", {**empty, "created": [created]})
+    second = store.apply_delta("p", "c1", "c3", empty)
+
+    assert first == SnapshotStore(store.root).put_snapshot("p", "c4", elements + [created])
+    assert second == store.root_hash("p", "c1")
+
+
+def test_apply_delta_moves_orphans_below_new_owner(store, elements):
+    orphan = {"@id": "x1", "@type": "PartUsage", "name": "x1", "owner": {"@id": "x"}}
+    store.put_snapshot("p", "c1", elements + [orphan])
+    created = {"@id": "x", "@type": "PartDefinition", "name": "X", "owner": {"@id": "root"}}
+
+    root = store.apply_delta("p", "c1", "c2", {"created": [created], "updated": [], "deleted": []})
+
+    assert root == SnapshotStore(store.root).put_snapshot("p", "c3", elements + [orphan, created])
+
+
+def test_apply_delta_on_untracked_base_returns_none(store):
+    assert store.apply_delta("p", "unknown", "c2", {"created": [], "updated": [], "deleted": []}) is None
+
+
+# -------------------------------
+# Tests for diff
+# -------------------------------
+
+
+def test_diff_reports_created_updated_and_deleted(store, elements):
+    store.put_snapshot("p", "c1", elements)
+    store.put_snapshot("p", "c2", [
+        {**elements[0], "name": "System2"},
+        elements[1],
+        elements[3],
+        {"@id": "c", "@type": "PartDefinition", "name": "C", "owner": {"@id": "root"}},
+    ])
+
+    diff = store.diff("p", "c1", "c2")
+
+    assert ids(diff["created"]) == ["c"]
+    assert ids(diff["updated"]) == ["root"]
+    assert diff["updated"][0]["name"] == "System2"
+    assert ids(diff["deleted"]) == ["b"]
+
+
+def test_diff_reports_moved_subtree_root_as_updated(store, elements):
+    store.put_snapshot("p", "c1", elements)
+    moved = {**elements[1], "owner": {"@id": "b"}}
+    store.put_snapshot("p", "c2", [elements[0], moved, elements[2], elements[3]])
+
+    diff = store.diff("p", "c1", "c2")
+
+    assert diff["created"] == [] and diff["deleted"] == []
+    assert ids(diff["updated"]) == ["a"]
+
+
+def test_diff_of_equal_commits_is_empty(store, elements):
+    store.put_snapshot("p", "c1", elements)
+    store.put_snapshot("p", "c2", elements)
+
+    assert store.diff("p", "c1", "c2") == {"created": [], "updated": [], "deleted": []}
+
+
+def test_diff_of_unknown_commit_raises(store, elements):
+    store.put_snapshot("p", "c1", elements)
+
+    with pytest.raises(LookupError):
+        store.diff("p", "c1", "missing")
@@ -0,0 +1,146 @@
+from unittest.mock import MagicMock, call, patch
+
+from src.sysml2 import tooling
+from src.sysml2.snapshot import ModelSnapshot
+from src.sysml2.tooling import TOOLS, TOOLS_BY_NAME, execute_tool
+from src.sysml2.validation import ChangeValidationError
+
+
+# -------------------------------
+# Tests for the tool definitions
+# -------------------------------
+
+
+def test_tool_schemas_do_not_expose_the_client():
+    assert [t.name for t in TOOLS] == ["create", "update", "delete", "create_many", "update_many", "delete_many"]
+    assert set(TOOLS_BY_NAME["delete"].args) == {"element_id", "type"}
+    assert set(TOOLS_BY_NAME["create"].args) == {"attrs"}
+    assert set(TOOLS_BY_NAME["update_many"].args) == {"selector", "attrs"}
+
+
+def test_unknown_types_share_one_handler():
+    assert tooling._choose_handler("Unknown") is tooling._choose_handler("Other")
+
+
+# -------------------------------
+# Tests for execute_tool
+# -------------------------------
+
+
+def test_execute_tool_passes_client_to_handler():
+    client = MagicMock()
+    handler = MagicMock()
+
+    with patch.object(tooling, "_choose_handler", return_value=handler):
+        msg = execute_tool(TOOLS_BY_NAME, {"name": "update", "args": {"element_id": "a", "name": "A2"}}, client)
+
+    handler.update.assert_called_once_with(client, "a", name="A2")
+    assert msg.startswith("update")
+
+
+def test_execute_tool_does_not_modify_the_logged_arguments():
+    client = MagicMock()
+    tool_args = {"attrs": {"element_id": "a", "@type": "PartUsage", "name": "A2"}}
+
+    with patch.object(tooling, "_choose_handler", return_value=MagicMock()) as choose:
+        execute_tool(TOOLS_BY_NAME, {"name": "update", "args": tool_args}, client)
+
+    choose.return_value.update.assert_called_once_with(client, "a", **{"@type": "PartUsage", "name": "A2"})
+    assert tool_args == {"attrs": {"element_id": "a", "@type": "PartUsage", "name": "A2"}}
+
+
+def test_execute_tool_reports_unknown_tool():
+    assert execute_tool(TOOLS_BY_NAME, {"name": "rename", "args": {}}, MagicMock()) == "Error: Tool rename not found."
+
+
+def test_unknown_tools_and_malformed_calls_fail_the_plan():
+    client = MagicMock()
+    client.validator.errors = []
+
+    assert execute_tool(TOOLS_BY_NAME, {"name": "__error__", "args": {"message": "unclear"}}, client).startswith("Error")
+    assert execute_tool(TOOLS_BY_NAME, {"name": "delete", "args": {"element_id": "a"}}, client).startswith("Error")
+
+    assert len(client.validator.errors) == 2
+    client.delete.assert_not_called()
+
+
+def test_execute_tool_reports_validation_errors():
+    handler = MagicMock()
+    handler.delete.side_effect = ChangeValidationError("Element a does not exist.")
+
+    with patch.object(tooling, "_choose_handler", return_value=handler):
+        msg = execute_tool(TOOLS_BY_NAME, {"name": "delete", "args": {"element_id": "a", "type": "PartUsage"}}, MagicMock())
+
+    assert msg == "Error: Element a does not exist."
+
+
+def test_delete_checks_the_given_type_for_unregistered_types():
+    client = MagicMock()
+
+    execute_tool(TOOLS_BY_NAME, {"name": "delete", "args": {"element_id": "a", "type": "ItemUsage"}}, client)
+
+    client.validator.check_delete.assert_called_once_with("a", "ItemUsage")
+    client.delete.assert_called_once_with("a")
+
+
+# -------------------------------
+# Tests for the bulk tools
+# -------------------------------
+
+
+def bulk_client():
+    client = MagicMock()
+    client.snapshot = ModelSnapshot("c1", [
+        {"@id": "s", "@type": "PartDefinition", "name": "Sensors"},
+        {"@id": "t", "@type": "PartUsage", "name": "Temp", "owner": {"@id": "s"}},
+        {"@id": "p", "@type": "PartUsage", "name": "Pressure", "owner": {"@id": "s"}},
+    ])
+    client.validator.errors = []
+    return client
+
+
+def test_update_many_renames_selected_elements():
+    client = bulk_client()
+
+    execute_tool(TOOLS_BY_NAME, {"name": "update_many", "args": {
+        "selector": {"type": "PartUsage"}, "attrs": {"name": "{name}Sensor"},
+    }}, client)
+
+    assert client.update.call_args_list == [
+        call("t", **{"@type": "PartUsage", "name": "TempSensor"}),
+        call("p", **{"@type": "PartUsage", "name": "PressureSensor"}),
+    ]
+
+
+def test_delete_many_removes_owned_elements_first():
+    client = bulk_client()
+
+    execute_tool(TOOLS_BY_NAME, {"name": "delete_many", "args": {"selector": {"subtree": "s"}}}, client)
+
+    assert [c.args[0] for c in client.delete.call_args_list] == ["p", "t", "s"]
+    assert client.validator.check_delete.call_args_list == [
+        call("p", "PartUsage"), call("t", "PartUsage"), call("s", "PartDefinition"),
+    ]
+
+
+def test_create_many_below_each_selected_owner():
+    client = bulk_client()
+
+    execute_tool(TOOLS_BY_NAME, {"name": "create_many", "args": {
+        "items": [{"@type": "PortUsage", "name": "{name}Out"}],
+        "owners": {"type": "PartUsage"},
+    }}, client)
+
+    assert client.create.call_args_list == [
+        call(**{"@type": "PortUsage", "name": "TempOut", "owner": {"@id": "t"}}),
+        call(**{"@type": "PortUsage", "name": "PressureOut", "owner": {"@id": "p"}}),
+    ]
+
+
+def test_bad_selector_is_recorded_as_validation_error():
+    client = bulk_client()
+
+    msg = execute_tool(TOOLS_BY_NAME, {"name": "delete_many", "args": {"selector": {"ids": ["x"]}}}, client)
+
+    assert msg.startswith("Error:")
+    assert len(client.validator.errors) == 1
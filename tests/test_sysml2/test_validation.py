@@ -0,0 +1,132 @@
+import pytest
+from unittest.mock import Mock
+
+from src.sysml2.snapshot import ModelSnapshot
+from src.sysml2.validation import ChangeValidationError, ChangeValidator, SchemaValidator
+
+
+# -------------------------------
+# Fixtures and helpers
+# -------------------------------
+
+
+BASE = "https://example.org/sysml"
+
+DATATYPES = {
+    "$id": f"{BASE}/schema",
+    "$defs": {
+        "Identified": {
+            "$id": f"{BASE}/Identified",
+            "title": "Identified",
+            "type": "object",
+            "properties": {"@id": {"type": "string"}},
+            "required": ["@id"],
+            "additionalProperties": False,
+        },
+        "PartUsage": {
+            "$id": f"{BASE}/PartUsage",
+            "title": "PartUsage",
+            "type": "object",
+            "properties": {
+                "@id": {"type": "string"},
+                "@type": {"const": "PartUsage"},
+                "name": {"oneOf": [{"type": "string"}, {"type": "null"}]},
+                "owner": {"oneOf": [{"$ref": f"{BASE}/Identified"}, {"type": "null"}]},
+            },
+            "required": ["@id", "@type", "name", "owner"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+
+@pytest.fixture
+def schema():
+    return SchemaValidator(DATATYPES)
+
+
+@pytest.fixture
+def client():
+    client = Mock()
+    client.change = []
+    client.snapshot = ModelSnapshot("c1", [
+        {"@id": "sys", "@type": "PartUsage", "name": "System"},
+    ])
+    return client
+
+
+@pytest.fixture
+def validator(client, schema):
+    return ChangeValidator(client, schema)
+
+
+# -------------------------------
+# Tests for SchemaValidator
+# -------------------------------
+
+
+def test_schema_types_are_titles(schema):
+    assert set(schema.types) == {"Identified", "PartUsage"}
+
+
+def test_partial_payload_is_valid(schema):
+    assert schema.check_payload({"@type": "PartUsage", "name": "Pump", "owner": {"@id": "sys"}}) == []
+
+
+def test_unknown_attribute_and_bad_reference_are_rejected(schema):
+    problems = schema.check_payload({"@type": "PartUsage", "color": "red", "owner": {"id": "sys"}})
+
+    assert len(problems) == 2
+
+
+def test_unknown_type_is_rejected(schema):
+    assert schema.check_payload({"@type": "Spaceship"}) == ["Unknown type 'Spaceship'."]
+
+
+# -------------------------------
+# Tests for ChangeValidator
+# -------------------------------
+
+
+def test_create_with_unknown_owner_raises(validator):
+    with pytest.raises(ChangeValidationError, match="Unknown owner"):
+        validator.check_create({"@type": "PartUsage", "name": "Pump", "owner": {"@id": "missing"}})
+
+    assert len(validator.errors) == 1
+
+
+def test_owner_created_in_same_change_is_accepted(validator, client):
+    client.change.append({"@type": "DataVersion", "payload": {"@type": "PartUsage"}, "identity": {"@id": "new"}})
+
+    validator.check_create({"@type": "PartUsage", "name": "Pump", "owner": {"@id": "new"}})
+    assert validator.errors == []
+
+
+def test_update_of_deleted_element_raises(validator, client):
+    client.change.append({"@type": "DataVersion", "payload": None, "identity": {"@id": "sys"}})
+
+    with pytest.raises(ChangeValidationError, match="Unknown element"):
+        validator.check_update("sys", {"@type": "PartUsage", "name": "X"})
+
+
+def test_delete_with_wrong_type_raises(validator):
+    with pytest.raises(ChangeValidationError, match="not a PartDefinition"):
+        validator.check_delete("sys", "PartDefinition")
+
+
+def test_discard_change_resets_staging_and_errors(client, schema):
+    from src.sysml2.sysml_client import SysMLClient
+
+    sysml_client = SysMLClient()
+    sysml_client.change = [{"identity": {"@id": "sys"}, "payload": None}]
+    sysml_client._snapshot = client.snapshot
+    sysml_client.commit_id = "c1"
+    sysml_client.validator = ChangeValidator(sysml_client, schema)
+    with pytest.raises(ChangeValidationError):
+        sysml_client.validator.check_delete("unknown")
+
+    sysml_client.discard_change()
+
+    assert sysml_client.change == []
+    assert sysml_client.validator.errors == []
+    assert sysml_client.validator.schema is schema
@@ -0,0 +1,38 @@
+import pytest
+
+from src.utils import json_codec
+
+
+# -------------------------------
+# Fixtures
+# -------------------------------
+
+
+@pytest.fixture(params=["orjson", "json"])
+def backend(request, monkeypatch):
+    if request.param == "json":
+        monkeypatch.setattr(json_codec, "orjson", None)
+    elif json_codec.orjson is None:
+        pytest.skip("orjson is not installed")
+    return request.param
+
+
+ELEMENT = {"@id": "a", "name": "Größe", "owner": {"@id": "root"}, "values": [1, 2.5, None, True]}
+
+
+# -------------------------------
+# Tests
+# -------------------------------
+
+
+def test_round_trip(backend):
+    assert json_codec.loads(json_codec.dumps(ELEMENT)) == ELEMENT
+    assert json_codec.loads(json_codec.dumpb(ELEMENT)) == ELEMENT
+
+
+def test_output_is_compact_utf8_for_both_backends(backend):
+    assert json_codec.dumpb({"b": 1, "a": "ü"}, sort_keys=True) == '{"a":"ü","b":1}'.encode("utf-8")
+
+
+def test_unsupported_types_fall_back_to_stdlib(backend):
+    assert json_codec.loads(json_codec.dumps({1: 2**70})) == {"1": 2**70}
@@ -0,0 +1,78 @@
+import logging
+import queue
+import threading
+
+import pytest
+
+from src.utils import logger as log_setup
+
+
+# -------------------------------
+# Fixtures
+# -------------------------------
+
+
+@pytest.fixture
+def limits(monkeypatch):
+    monkeypatch.setattr(log_setup, "MAX_PAYLOAD_LENGTH", 20)
+    monkeypatch.setattr(log_setup, "PAYLOAD_SAMPLE_RATE", 1.0)
+
+
+class Exploding:
+    def __repr__(self):
+        raise AssertionError("payload rendered although the record was not emitted")
+
+
+# -------------------------------
+# Tests
+# -------------------------------
+
+
+def test_short_payload_is_unchanged(limits):
+    assert str(log_setup.payload("engine")) == "engine"
+    assert str(log_setup.payload({"a": 1})) == "{'a': 1}"
+
+
+def test_long_payload_is_truncated(limits):
+    text = str(log_setup.payload("x" * 100))
+    assert text == "x" * 20 + "... [100 chars]"
+
+
+def test_large_structures_are_bounded(monkeypatch):
+    elements = [{"@id": str(i), "name": "n" * 1000} for i in range(10_000)]
+    text = str(log_setup.payload(elements))
+    assert len(text) <= log_setup.MAX_PAYLOAD_LENGTH + 20
+
+
+def test_unsampled_payload_is_not_rendered(limits, monkeypatch):
+    monkeypatch.setattr(log_setup, "PAYLOAD_SAMPLE_RATE", 0.0)
+    assert str(log_setup.payload(Exploding())) == "<payload not sampled>"
+
+
+def test_payload_is_not_rendered_below_level(limits):
+    log = logging.getLogger("test_logger.disabled")
+    log.setLevel(logging.INFO)
+    log.debug("Prompt: %s", log_setup.payload(Exploding()))
+
+
+def test_queued_records_are_formatted_by_the_listener(limits):
+    rendered_on = []
+
+    class Recording:
+        def __repr__(self):
+            rendered_on.append(threading.current_thread().name)
+            return "payload"
+
+    log_queue = queue.SimpleQueue()
+    handler = log_setup._DeferredQueueHandler(log_queue)
+    log = logging.getLogger("test_logger.queued")
+    log.addHandler(handler)
+    log.setLevel(logging.DEBUG)
+    log.propagate = False
+    try:
+        log.debug("Prompt: %s", log_setup.payload(Recording()))
+    finally:
+        log.removeHandler(handler)
+
+    assert rendered_on == []
+    assert log_queue.get_nowait().getMessage() == "Prompt: payload"
@@ -1,9 +1,17 @@
+import io
 import os
 import tempfile
 import pytest
 from unittest.mock import Mock, patch
 
-from src.utils.sysml_file_io import FileImporter, FileExporter
+from src.utils.sysml_file_io import (
+    FileExporter,
+    FileImporter,
+    parse_sysml,
+    stream_sysml_text,
+    tokenize_sysml,
+    write_sysml,
+)
 
 
 # -------------------------------
@@ -15,8 +23,8 @@ from src.utils.sysml_file_io import FileImporter, FileExporter
 def mock_project_handler():
     handler = Mock()
     handler.change = []
-    handler.create_element = Mock(
-        side_effect=lambda typ, name: handler.change.append({"type": typ, "name": name})
+    handler.create = Mock(
+        side_effect=lambda **attrs: handler.change.append({"@type": "DataVersion", "payload": attrs})
     )
     return handler
 
@@ -46,17 +54,17 @@ def test_interpret_reads_and_stages_changes(mock_project_handler, sample_sysml_f
     importer = FileImporter()
     importer.interpret(mock_project_handler, sample_sysml_file)
 
-    assert len(mock_project_handler.create_element.call_args_list) == 2
-    assert mock_project_handler.create_element.call_args_list[0][0] == (
-        "PartDefinition",
-        "Engine",
-    )
-    assert mock_project_handler.create_element.call_args_list[1][0] == (
-        "PartUsage",
-        "Wheel",
-    )
-    assert isinstance(importer.file_content, list)
-    assert all(isinstance(line, str) for line in importer.file_content)
+    created = [c.kwargs for c in mock_project_handler.create.call_args_list]
+    assert [(c["@type"], c["name"]) for c in created] == [
+        ("Package", "Model"),
+        ("PartDefinition", "Engine"),
+        ("PartUsage", "Wheel"),
+    ]
+    assert "owner" not in created[0]
+    assert created[1]["owner"] == {"@id": created[0]["@id"]}
+    assert created[2]["owner"] == {"@id": created[1]["@id"]}
+    assert importer.element_count == 3
+    assert len(importer.changes) == 3
 
 
 def test_interpret_invalid_extension_raises(tmp_path, mock_project_handler):
@@ -74,6 +82,15 @@ def test_interpret_file_not_found(mock_project_handler):
         importer.interpret(mock_project_handler, "nonexistent.sysml")
 
 
+def test_interpret_empty_file_raises(tmp_path, mock_project_handler):
+    file_path = tmp_path / "empty.sysml"
+    file_path.write_text("  // only a comment\n")
+
+    importer = FileImporter()
+    with pytest.raises(IOError):
+        importer.interpret(mock_project_handler, str(file_path))
+
+
 def test_interpret_ignores_malformed_lines(tmp_path, mock_project_handler):
     file_path = tmp_path / "bad_lines.sysml"
     file_path.write_text("par def MissingKeyword\nrandom gibberish\n")
@@ -82,7 +99,7 @@ def test_interpret_ignores_malformed_lines(tmp_path, mock_project_handler):
     importer.interpret(mock_project_handler, str(file_path))
 
     # Should not raise and should not create any elements
-    assert mock_project_handler.create_element.call_count == 0
+    assert mock_project_handler.create.call_count == 0
 
 
 def test_interpret_handler_raises_exception(tmp_path):
@@ -91,13 +108,100 @@ def test_interpret_handler_raises_exception(tmp_path):
 
     handler = Mock()
     handler.change = []
-    handler.create_element.side_effect = RuntimeError("Handler error")
+    handler.create.side_effect = RuntimeError("Handler error")
 
     importer = FileImporter()
     with pytest.raises(RuntimeError, match="Handler error"):
         importer.interpret(handler, str(file_path))
 
 
+def test_interpret_commits_in_chunks(tmp_path, mock_project_handler):
+    file_path = tmp_path / "many.sysml"
+    file_path.write_text("package P {\n" + "".join(f"    part p{i};\n" for i in range(5)) + "}\n")
+
+    def commit_and_push(with_delta=True):
+        mock_project_handler.change = []
+        mock_project_handler.commit_id = f"c{len(importer.commit_ids) + 1}"
+
+    mock_project_handler.commit_and_push = Mock(side_effect=commit_and_push)
+
+    importer = FileImporter()
+    importer.interpret(mock_project_handler, str(file_path), chunk_size=4)
+
+    assert importer.element_count == 6
+    assert importer.commit_ids == ["c1", "c2"]
+    assert importer.changes == []
+
+
+# -------------------------------
+# Tests for the SysML parser
+# -------------------------------
+
+
+def parse(text, chunk_size=65536):
+    return list(parse_sysml(tokenize_sysml(io.StringIO(text), chunk_size=chunk_size)))
+
+
+def test_tokenizer_handles_tokens_across_chunks():
+    text = "package 'My Model' { /* a { comment } */ part def Engine; // trailing }\n}"
+
+    assert list(tokenize_sysml(io.StringIO(text), chunk_size=3)) == list(tokenize_sysml(io.StringIO(text)))
+    assert ("name", "My Model") in list(tokenize_sysml(io.StringIO(text), chunk_size=3))
+
+
+def test_parser_tracks_nested_scopes():
+    elements = parse(
+        "package Model {\n"
+        "    abstract part def Engine :> Base {\n"
+        "        part cylinders : Cylinder[4];\n"
+        "        port fuelIn;\n"
+        "    }\n"
+        "    part engine : Engine;\n"
+        "}\n",
+        chunk_size=5,
+    )
+    by_name = {e["name"]: e for e in elements}
+
+    assert [e["@type"] for e in elements] == ["Package", "PartDefinition", "PartUsage", "PortUsage", "PartUsage"]
+    assert by_name["cylinders"]["owner"] == {"@id": by_name["Engine"]["@id"]}
+    assert by_name["fuelIn"]["owner"] == {"@id": by_name["Engine"]["@id"]}
+    assert by_name["engine"]["owner"] == {"@id": by_name["Model"]["@id"]}
+
+
+def test_parser_skips_unsupported_statements_and_blocks():
+    elements = parse(
+        "package Model {\n"
+        "    import ISQ::*;\n"
+        "    action def Run { part inner; }\n"
+        "    attribute mass = 4;\n"
+        "    connection def Link;\n"
+        "}\n"
+        "part def Root;\n"
+    )
+
+    assert [(e["@type"], e["name"]) for e in elements] == [
+        ("Package", "Model"),
+        ("ConnectionDefinition", "Link"),
+        ("PartDefinition", "Root"),
+    ]
+    assert "owner" not in elements[-1]
+
+
+
+def test_parser_ends_doc_and_comment_annotations_at_their_body():
+    elements = parse(
+        "package P { doc /*x*/ part def Engine; comment /*c*/ part x; "
+        "comment Note about Engine /* with ; and { */ port p; }"
+    )
+
+    assert [(e["@type"], e["name"]) for e in elements] == [
+        ("Package", "P"),
+        ("PartDefinition", "Engine"),
+        ("PartUsage", "x"),
+        ("PortUsage", "p"),
+    ]
+    assert all(e["owner"] == {"@id": elements[0]["@id"]} for e in elements[1:])
+
 # -------------------------------
 # Tests for FileExporter
 # -------------------------------
@@ -197,6 +301,82 @@ def test_export_to_file_nonexistent_directory(mock_input):
         assert os.path.exists(full_path)
 
 
+# -------------------------------
+# Tests for the streaming exporter
+# -------------------------------
+
+
+@pytest.fixture
+def hierarchical_elements():
+    return [
+        {"@id": "m", "@type": "Package", "name": "Model"},
+        {"@id": "e", "@type": "PartDefinition", "name": "Engine", "owner": {"@id": "m"}},
+        {"@id": "w", "@type": "PartUsage", "name": "front wheel", "owner": {"@id": "e"}},
+        {"@id": "c", "@type": "Comment", "name": None, "owner": {"@id": "m"}},
+        {"@id": "x", "@type": "PartUsage", "name": "hidden", "owner": {"@id": "c"}},
+        {"@id": "o", "@type": "PortUsage", "name": "orphan", "owner": {"@id": "unknown"}},
+    ]
+
+
+def test_stream_sysml_text_follows_ownership(hierarchical_elements):
+    lines = list(stream_sysml_text(iter(hierarchical_elements)))
+
+    assert lines == [
+        "package Model {\n",
+        "    part def Engine {\n",
+        "        part 'front wheel';\n",
+        "    }\n",
+        "    // skipped Comment '' with 1 owned element(s)\n",
+        "}\n",
+        "port orphan;\n",
+    ]
+
+
+def test_stream_sysml_text_roundtrips_through_parser(hierarchical_elements):
+    text = "".join(stream_sysml_text(hierarchical_elements))
+    parsed = parse(text)
+
+    assert [(e["@type"], e["name"]) for e in parsed] == [
+        ("Package", "Model"),
+        ("PartDefinition", "Engine"),
+        ("PartUsage", "front wheel"),
+        ("PortUsage", "orphan"),
+    ]
+
+
+def test_write_sysml_writes_incrementally(hierarchical_elements):
+    handle = io.StringIO()
+
+    assert write_sysml(hierarchical_elements, handle) == 7
+    assert handle.getvalue().startswith("package Model {")
+
+
+@pytest.mark.parametrize("policy, expected", [("skip", "Old content"), ("overwrite", "package Model {")])
+def test_export_elements_overwrite_policy(tmp_path, hierarchical_elements, policy, expected):
+    path = tmp_path / "existing.sysml"
+    path.write_text("Old content")
+
+    FileExporter().export_elements(hierarchical_elements, str(path), overwrite=policy)
+
+    assert path.read_text().startswith(expected)
+    assert not os.path.exists(str(path) + ".part")
+
+
+def test_export_elements_existing_file_raises_by_default(tmp_path, hierarchical_elements):
+    path = tmp_path / "existing.sysml"
+    path.write_text("Old content")
+
+    with patch("builtins.input") as mock_input:
+        with pytest.raises(FileExistsError):
+            FileExporter().export_elements(hierarchical_elements, str(path))
+        mock_input.assert_not_called()
+
+
+def test_export_elements_invalid_policy(tmp_path, hierarchical_elements):
+    with pytest.raises(ValueError):
+        FileExporter().export_elements(hierarchical_elements, str(tmp_path / "out"), overwrite="maybe")
+
+
 # Notation Conformance Tests
 def test_balanced_brackets(exporter_with_generated_content):
     text = "".join(exporter_with_generated_content)
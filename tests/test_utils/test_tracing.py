@@ -0,0 +1,102 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.utils import tracing
+from src.utils.tracing import bind_context, collect_spans, span, span_tree, trace_from_headers, traced
+
+
+# -------------------------------
+# Fixtures
+# -------------------------------
+
+
+@pytest.fixture
+def sink(tmp_path, monkeypatch):
+    path = tmp_path / "traces.jsonl"
+    monkeypatch.setattr(tracing, "TRACE_FILE", str(path))
+    monkeypatch.setattr(tracing, "_sink_listener", None)
+    monkeypatch.setattr(tracing.atexit, "register", lambda func: None)
+    listener = tracing.initialize_tracing()
+    yield path
+    if listener._thread is not None:
+        listener.stop()
+    for handler in list(tracing._sink.handlers):
+        tracing._sink.removeHandler(handler)
+
+
+# -------------------------------
+# Tests
+# -------------------------------
+
+
+def test_spans_nest_and_share_the_trace_id():
+    with collect_spans() as spans:
+        with span("outer", trace_id="t1") as outer:
+            with span("inner", k=5):
+                pass
+
+    inner = spans[0]
+    assert [s.name for s in spans] == ["inner", "outer"]
+    assert inner.trace_id == outer.trace_id == "t1"
+    assert inner.parent_id == outer.span_id
+    assert inner.attributes == {"k": 5}
+    assert inner.duration_ms >= 0
+
+
+def test_span_records_errors():
+    with collect_spans() as spans:
+        with pytest.raises(ValueError):
+            with span("failing"):
+                raise ValueError("boom")
+    assert spans[0].error == "ValueError: boom"
+
+
+def test_traced_decorator_and_bound_pool_threads_join_the_trace():
+    @traced("work")
+    def work(i):
+        return i * 2
+
+    with collect_spans() as spans:
+        with span("root") as root:
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                assert list(pool.map(bind_context(work), [1, 2, 3])) == [2, 4, 6]
+
+    workers = [s for s in spans if s.name == "work"]
+    assert len(workers) == 3
+    assert all(s.parent_id == root.span_id and s.trace_id == root.trace_id for s in workers)
+
+
+def test_span_tree_nests_children():
+    with collect_spans() as spans:
+        with span("engine.run"):
+            with span("llm.request", input_tokens=10):
+                pass
+            with span("tool.execute"):
+                pass
+
+    tree = span_tree(spans)
+    assert [node["name"] for node in tree] == ["engine.run"]
+    assert [child["name"] for child in tree[0]["children"]] == ["llm.request", "tool.execute"]
+    assert tree[0]["children"][0]["attributes"] == {"input_tokens": 10}
+
+
+def test_trace_from_headers():
+    traceparent = "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+    assert trace_from_headers({"traceparent": traceparent}) == ("4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7")
+    assert trace_from_headers({"X-Trace-Id": "req-42"}) == ("req-42", None)
+    assert trace_from_headers({"X-Trace-Id": "not valid!"}) == (None, None)
+    assert trace_from_headers({}) == (None, None)
+
+
+def test_finished_spans_are_written_to_the_sink(sink):
+    with span("sysml.request", trace_id="t2", method="GET"):
+        pass
+    tracing._sink_listener.stop()
+
+    records = [json.loads(line) for line in sink.read_text().splitlines()]
+    assert len(records) == 1
+    assert records[0]["trace_id"] == "t2"
+    assert records[0]["name"] == "sysml.request"
+    assert records[0]["attributes"] == {"method": "GET"}